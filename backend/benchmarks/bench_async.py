@@ -0,0 +1,140 @@
+"""
+Read routes under a burst: sync handlers in Starlette's threadpool (psycopg2
+pool) against the async handlers on the psycopg 3 pool (db_async). Both apps
+get the same mix of /datasets, /datasets/{id} and JSON /dataset-rows pages,
+`--concurrency` requests in flight at a time, called in-process over ASGI (no
+HTTP client or socket noise). The rows LRU is disabled so every page hits the database.
+
+    python -m benchmarks.bench_async --dataset-id 1 --requests 2000 --concurrency 200
+
+--threads sets the threadpool size for the sync run (Starlette's default is 40).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import anyio.to_thread
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from benchmarks.common import summarize
+from db import PoolTimeout, close_pool, init_pool, pooled_connection
+from db_async import close_async_pool, init_async_pool
+from routes import dataset_rows, datasets, stats
+from services.http_cache import rows_cache
+
+
+def build_app(use_async: bool) -> FastAPI:
+    app = FastAPI()
+    for module in (stats, datasets, dataset_rows):
+        app.include_router(module.async_router if use_async else module.router, prefix="/api")
+
+    @app.exception_handler(PoolTimeout)
+    async def pool_timeout(request, exc):
+        return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+    return app
+
+
+async def call(app: FastAPI, path: str, query: str = "") -> int:
+    """One GET through the ASGI app; returns the status code (body is discarded)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": query.encode(), "headers": [],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def request_mix(dataset_id: int, first_time: int, last_time: int, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    mix = []
+    for _ in range(count):
+        pick = rng.random()
+        if pick < 0.6:
+            after_time = rng.randint(first_time, max(first_time, last_time - 1))
+            mix.append((f"/api/dataset-rows/{dataset_id}", f"limit=200&after_time={after_time}"))
+        elif pick < 0.85:
+            mix.append((f"/api/datasets/{dataset_id}", ""))
+        else:
+            mix.append(("/api/datasets", "limit=50"))
+    return mix
+
+
+async def burst(app: FastAPI, mix: list, concurrency: int):
+    """Run the mix with at most `concurrency` requests in flight. Returns (latencies_ms, wall_s, errors)."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(path, query):
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            status = await call(app, path, query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(path, query) for path, query in mix))
+    return latencies, time.perf_counter() - started, errors
+
+
+async def run(args):
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT MIN(time) AS first, MAX(time) AS last FROM signals WHERE dataset_id = %s;",
+                (args.dataset_id,),
+            )
+            bounds = cursor.fetchone()
+        conn.rollback()
+    if bounds["first"] is None:
+        raise SystemExit(f"Dataset {args.dataset_id} has no signals")
+    mix = request_mix(args.dataset_id, bounds["first"], bounds["last"], args.requests)
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+    await init_async_pool()
+
+    for label, use_async in (("sync (threadpool)", False), ("async (psycopg 3)", True)):
+        app = build_app(use_async)
+        await burst(app, mix[: args.concurrency], args.concurrency)  # warm both pools
+        latencies, wall, errors = await burst(app, mix, args.concurrency)
+        summarize(f"{label} c={args.concurrency}", latencies, wall)
+        if errors:
+            print(f"   {errors} non-200 responses (pool timeouts?)")
+
+    await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+
+    rows_cache.max_entry_bytes = 0  # measure the database path, not the LRU
+    init_pool()
+    try:
+        asyncio.run(run(args))
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
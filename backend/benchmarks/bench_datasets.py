@@ -0,0 +1,112 @@
+"""
+Catalogue search at scale: the old unpaginated /api/datasets against filtered keyset pages.
+
+    python -m benchmarks.bench_datasets --seed 100000      # add synthetic datasets rows
+    python -m benchmarks.bench_datasets                    # measure
+    python -m benchmarks.bench_datasets --cleanup          # remove them again
+
+Synthetic rows are named "bench_catalogue_*.csv" and have no signals.
+"""
+import argparse
+from datetime import date
+
+from db import pooled_connection, close_pool
+from routes.datasets import list_datasets
+from benchmarks.common import timed, summarize
+
+BENCH_PREFIX = "bench_catalogue_"
+
+# Shape of a real campaign: few flights/boxes/colours, many people
+SEED_SQL = """
+    INSERT INTO datasets (file_name, file_date, flight_code, box_name, box_color, role, person_name)
+    SELECT
+        %(prefix)s || i || '.csv',
+        DATE '2024-01-01' + (i %% 700),
+        'F' || (i %% 40),
+        'BBox' || (i %% 8),
+        (ARRAY['Pink', 'Orange', 'Blue', 'Green'])[1 + i %% 4],
+        (ARRAY['Operator', 'Subject'])[1 + i %% 2],
+        'Person ' || (i %% 2000)
+    FROM generate_series(1, %(count)s) AS i;
+"""
+
+
+def old_list_all(conn):
+    """What /api/datasets used to do: every row, every time."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT dataset_id, file_name, person_name, role, flight_code, box_name, box_color, file_date
+            FROM datasets
+            ORDER BY dataset_id DESC;
+        """)
+        return cursor.fetchall()
+
+
+def deepest_cursor(conn, **filters):
+    """Follow next_before_id to (almost) the last page, to time the deepest seek."""
+    page = list_datasets(**filters, limit=500, conn=conn)
+    cursor = None
+    while page["next_before_id"] is not None:
+        cursor = page["next_before_id"]
+        page = list_datasets(**filters, before_id=cursor, limit=500, conn=conn)
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic datasets first")
+    parser.add_argument("--cleanup", action="store_true", help="delete the synthetic datasets and exit")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            if args.cleanup:
+                cursor.execute("DELETE FROM datasets WHERE file_name LIKE %s;", (BENCH_PREFIX + "%",))
+                print(f"🧹 removed {cursor.rowcount} synthetic datasets")
+                conn.commit()
+                close_pool()
+                return
+            if args.seed:
+                cursor.execute(SEED_SQL, {"prefix": BENCH_PREFIX, "count": args.seed})
+                print(f"🌱 inserted {cursor.rowcount} synthetic datasets")
+            cursor.execute("ANALYZE datasets;")
+            cursor.execute("SELECT COUNT(*) FROM datasets;")
+            print(f"datasets rows: {cursor.fetchone()['count']}")
+        conn.commit()
+
+        samples = [timed(old_list_all, conn) for _ in range(max(1, args.repeat // 10))]
+        summarize("unpaginated (old)", samples)
+
+        cases = {
+            "first page": {},
+            "flight_code": {"flight_code": "F7"},
+            "person_name": {"person_name": "Person 42"},
+            "box + colour": {"box_name": "BBox2", "box_color": "Blue"},  # i % 8 == 2 ⇒ i % 4 == 2: Blue
+            "role + date range": {
+                "role": "Subject",
+                "file_date_from": date(2024, 3, 1),
+                "file_date_to": date(2024, 3, 31),
+            },
+        }
+        for label, filters in cases.items():
+            samples = [
+                timed(list_datasets, **filters, limit=args.limit, conn=conn)
+                for _ in range(args.repeat)
+            ]
+            summarize(label, samples)
+
+        before_id = deepest_cursor(conn, flight_code="F7")
+        if before_id is not None:
+            samples = [
+                timed(list_datasets, flight_code="F7", before_id=before_id, limit=args.limit, conn=conn)
+                for _ in range(args.repeat)
+            ]
+            summarize("flight_code, last page", samples)
+
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Sustained live ingest: N simulated boxes each stream recorder rows at a fixed
+rate into POST /api/live/{id}/stream (chunked body, one piece per --piece-ms),
+called in-process over ASGI. Default: 20 boxes × 1 kHz (18 IMU axes + ecg) for 30 s.
+
+    python -m benchmarks.bench_live --boxes 20 --rate 1000 --seconds 30
+    python -m benchmarks.bench_live --boxes 20 --as-fast   # no pacing: find the ceiling
+
+Reports target vs achieved rows/s, how far the senders fell behind their schedule
+(sender lag grows only when backpressure kicks in), event-loop lag (how late a
+10 ms timer fires while the boxes stream; what every other request on the loop
+waits), COPY batches and times, and Python's peak memory (--trace-memory).
+The datasets are removed afterwards unless --keep.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+
+from benchmarks.common import percentile
+from benchmarks.load_uploads import make_csv
+from db import close_pool, pooled_connection
+from routes.live import router as live_router
+from services import live_ingest
+from services.storage import drop_dataset_chunks
+
+
+def box_pieces(index: int, rows: int, rows_per_piece: int) -> list:
+    """Recorder rows of one box (no header line), split into pieces of rows_per_piece lines."""
+    lines = make_csv(index, rows).split(b"\n", 1)[1].splitlines(keepends=True)
+    return [b"".join(lines[k:k + rows_per_piece]) for k in range(0, len(lines), rows_per_piece)]
+
+
+async def stream_box(app, dataset_id: int, pieces: list, piece_seconds: float, paced: bool):
+    """One box: POST the pieces as a chunked body. Returns (response summary, lags in ms)."""
+    lags = []
+    state = {"next": 0, "started": None}
+    status, body = 0, b""
+
+    async def receive():
+        k = state["next"]
+        if state["started"] is None:
+            state["started"] = time.perf_counter()
+        due = state["started"] + k * piece_seconds
+        if paced:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            lags.append(max(0.0, time.perf_counter() - due) * 1000)
+        state["next"] += 1
+        if k >= len(pieces):
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": pieces[k], "more_body": True}
+
+    async def send(message):
+        nonlocal status, body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body += message.get("body", b"")
+
+    path = f"/api/live/{dataset_id}/stream"
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"transfer-encoding", b"chunked")],
+        "client": ("box", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"dataset {dataset_id}: HTTP {status} {body[:200]!r}")
+    return json.loads(body), lags
+
+
+async def watch_loop(lags: list, stop: asyncio.Event, interval: float = 0.01):
+    """Sleep `interval` over and over; how late each wake-up is = event-loop lag in ms."""
+    while not stop.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - due) * 1000)
+
+
+async def run(args, dataset_ids: list, pieces: dict):
+    app = FastAPI()
+    app.include_router(live_router, prefix="/api")
+    piece_seconds = args.piece_ms / 1000
+    loop_lags, stop = [], asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(loop_lags, stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        stream_box(app, dataset_id, pieces[dataset_id], piece_seconds, not args.as_fast)
+        for dataset_id in dataset_ids
+    ))
+    wall = time.perf_counter() - started
+    stop.set()
+    await watcher
+    return results, wall, loop_lags
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--rate", type=int, default=1000, help="rows per second per box")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--piece-ms", type=int, default=100, help="how often a box sends")
+    parser.add_argument("--as-fast", action="store_true", help="send without pacing")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    rows = int(args.rate * args.seconds)
+    rows_per_piece = max(1, args.rate * args.piece_ms // 1000)
+    run_id = int(time.time())
+
+    dataset_ids, pieces = [], {}
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            for i in range(args.boxes):
+                dataset_id = live_ingest.register_live_dataset(cursor, f"Live_LB{run_id}_BBox{i}.csv", {
+                    "flight_code": f"LB{run_id}", "box_name": f"BBox{i}", "box_color": "Load",
+                })
+                dataset_ids.append(dataset_id)
+                pieces[dataset_id] = box_pieces(i, rows, rows_per_piece)
+        conn.commit()
+    total_mb = sum(len(p) for ps in pieces.values() for p in ps) / 1e6
+    print(f"{args.boxes} boxes × {args.rate} rows/s × {args.seconds:.0f} s "
+          f"({rows_per_piece} rows per {args.piece_ms} ms piece, {total_mb:.1f} MB total)")
+
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        results, wall, loop_lags = asyncio.run(run(args, dataset_ids, pieces))
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        tracemalloc.stop()
+
+    summaries = [summary for summary, _ in results]
+    lags = [lag for _, box_lags in results for lag in box_lags]
+    written = sum(s["rows"] for s in summaries)
+    batches = sum(s["batches"] for s in summaries)
+    copy_seconds = sum(s["copy_seconds"] for s in summaries)
+    print(f"target   {args.boxes * args.rate:>10,} rows/s")
+    print(f"achieved {written / wall:>10,.0f} rows/s ({written:,} rows in {wall:.1f} s)")
+    print(f"batches  {batches} ({written / max(batches, 1):,.0f} rows each), "
+          f"COPY mean {copy_seconds / max(batches, 1) * 1000:.1f} ms, "
+          f"max {max(s['max_copy_ms'] for s in summaries):.1f} ms")
+    if lags:
+        print(f"sender lag p50={percentile(lags, 50):.1f} ms p99={percentile(lags, 99):.1f} ms max={max(lags):.1f} ms")
+    if loop_lags:
+        print(f"loop lag   p50={percentile(loop_lags, 50):.1f} ms p99={percentile(loop_lags, 99):.1f} ms "
+              f"max={max(loop_lags):.1f} ms")
+    if peak is not None:
+        print(f"peak Python memory {peak / 1e6:.1f} MB (server side; the generated rows are not counted)")
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FILTER (WHERE row_count <> %s) AS short FROM datasets WHERE dataset_id = ANY(%s);",
+                (rows, dataset_ids),
+            )
+            short = cursor.fetchone()["short"]
+            print("✅ every box stored all its rows" if short == 0 else f"❌ {short} box(es) short of rows")
+            if not args.keep:
+                for dataset_id in dataset_ids:
+                    drop_dataset_chunks(cursor, dataset_id)
+                cursor.execute("DELETE FROM datasets WHERE dataset_id = ANY(%s);", (dataset_ids,))
+        conn.commit()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Page latency at shallow vs deep positions: LIMIT/OFFSET against keyset (after_time).
+
+    python -m benchmarks.bench_pagination --dataset-id 1 --deep-offset 5000000
+"""
+import argparse
+
+from db import pooled_connection, close_pool
+from routes.dataset_rows import get_dataset_rows
+from services.http_cache import rows_cache
+from benchmarks.common import PLAIN_GET, timed, summarize
+
+
+def time_at_offset(dataset_id: int, offset: int):
+    """Find the time value just before `offset` (the cursor keyset mode would hold)."""
+    if offset == 0:
+        return None
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT time FROM signals WHERE dataset_id = %s ORDER BY time LIMIT 1 OFFSET %s;",
+            (dataset_id, offset - 1),
+        )
+        row = cursor.fetchone()
+    if row is None:
+        raise SystemExit(f"Dataset {dataset_id} has fewer than {offset} rows")
+    return row["time"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-id", type=int, default=1)
+    parser.add_argument("--deep-offset", type=int, default=5_000_000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # Measure the database, not the response cache: nothing is ever stored
+    rows_cache.max_entry_bytes = 0
+
+    for offset in (0, args.deep_offset):
+        after_time = time_at_offset(args.dataset_id, offset)
+
+        with pooled_connection() as conn:
+            samples = [
+                timed(get_dataset_rows, args.dataset_id, PLAIN_GET, offset=offset, limit=args.limit, conn=conn)
+                for _ in range(args.repeat)
+            ]
+        summarize(f"offset={offset}", samples)
+
+        with pooled_connection() as conn:
+            samples = [
+                timed(get_dataset_rows, args.dataset_id, PLAIN_GET, limit=args.limit, after_time=after_time, conn=conn)
+                for _ in range(args.repeat)
+            ]
+        summarize(f"after_time@{offset}", samples)
+
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
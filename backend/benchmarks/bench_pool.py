@@ -0,0 +1,48 @@
+"""
+Compare /api/dataset-rows latency with a fresh connection per request
+(the old db.get_connection() behaviour) against the shared pool.
+
+    python -m benchmarks.bench_pool --dataset-id 1 --requests 500 --concurrency 16
+"""
+import argparse
+
+from db import get_connection, pooled_connection, get_pool, close_pool
+from routes.dataset_rows import get_dataset_rows
+from services.http_cache import rows_cache
+from benchmarks.common import PLAIN_GET, run_concurrent, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+
+    # Every request must reach the database; the response cache would hide the pool
+    rows_cache.max_entry_bytes = 0
+
+    def without_pool():
+        conn = get_connection()
+        try:
+            get_dataset_rows(args.dataset_id, PLAIN_GET, offset=0, limit=args.limit, conn=conn)
+        finally:
+            conn.close()
+
+    def with_pool():
+        with pooled_connection() as conn:
+            get_dataset_rows(args.dataset_id, PLAIN_GET, offset=0, limit=args.limit, conn=conn)
+
+    latencies, wall = run_concurrent(without_pool, args.requests, args.concurrency)
+    summarize("connect-per-request", latencies, wall)
+
+    get_pool()  # warm up outside the measurement
+    latencies, wall = run_concurrent(with_pool, args.requests, args.concurrency)
+    summarize("pooled", latencies, wall)
+    print("pool stats:", get_pool().snapshot())
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Disk footprint and range-read latency of one dataset's signals, uncompressed vs compressed.
+The dataset is decompressed first, measured, compressed and measured again
+(it is left compressed, as ingest would leave it).
+
+    python -m benchmarks.bench_storage --dataset-id 1 --window-seconds 10
+"""
+import argparse
+
+from db import pooled_connection, close_pool
+from services.columnar import fetch_columns
+from services.storage import compress_dataset, dataset_size, decompress_dataset
+from benchmarks.common import timed, summarize
+
+
+def recording_span(cursor, dataset_id: int):
+    cursor.execute(
+        "SELECT MIN(time) AS first, MAX(time) AS last, COUNT(*) AS rows FROM signals WHERE dataset_id = %s;",
+        (dataset_id,),
+    )
+    row = cursor.fetchone()
+    if row["rows"] == 0:
+        raise SystemExit(f"Dataset {dataset_id} has no signals")
+    return row["first"], row["last"], row["rows"]
+
+
+def keyset_page(cursor, dataset_id: int, after_time: int, limit: int):
+    cursor.execute(
+        "SELECT * FROM signals WHERE dataset_id = %s AND time > %s ORDER BY time LIMIT %s;",
+        (dataset_id, after_time, limit),
+    )
+    cursor.fetchall()
+
+
+def full_scan(cursor, dataset_id: int):
+    cursor.execute("SELECT AVG(ecg) FROM signals WHERE dataset_id = %s;", (dataset_id,))
+    cursor.fetchone()
+
+
+def measure(label: str, dataset_id: int, first: int, last: int, args):
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        size = dataset_size(cursor, dataset_id)
+        print(f"\n{label}: {size['total_bytes'] / 1e6:10.1f} MB"
+              f" in {size['chunks']} chunk(s), {size['compressed_chunks']} compressed")
+
+        middle = first + (last - first) // 2
+        window = args.window_seconds * 1_000_000
+        summarize(f"{label} page@middle", [
+            timed(keyset_page, cursor, dataset_id, middle, args.limit) for _ in range(args.repeat)
+        ])
+        summarize(f"{label} {args.window_seconds}s window", [
+            timed(fetch_columns, cursor, dataset_id, ["ecg", "az_alpha", "ax_alpha"],
+                  start=middle, end=middle + window)
+            for _ in range(args.repeat)
+        ])
+        summarize(f"{label} full ecg scan", [
+            timed(full_scan, cursor, dataset_id) for _ in range(max(1, args.repeat // 10))
+        ])
+        conn.rollback()
+    return size["total_bytes"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-id", type=int, default=1)
+    parser.add_argument("--window-seconds", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        first, last, rows = recording_span(cursor, args.dataset_id)
+        decompress_dataset(cursor, args.dataset_id)
+        conn.commit()
+    print(f"dataset_id={args.dataset_id}: {rows} rows, {(last - first) / 1e6:.1f} s")
+
+    plain = measure("uncompressed", args.dataset_id, first, last, args)
+
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        compress_dataset(cursor, args.dataset_id)
+        conn.commit()
+
+    packed = measure("compressed", args.dataset_id, first, last, args)
+
+    print(f"\nbytes/row: {plain / rows:.1f} → {packed / rows:.1f}")
+    if packed:
+        print(f"compression ratio: x{plain / packed:.1f}")
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
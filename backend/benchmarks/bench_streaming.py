@@ -0,0 +1,56 @@
+"""
+Peak memory and time for reading a whole dataset: fetchall() into dicts (what a
+huge JSON page did) against the streamed exports (NDJSON server-side cursor,
+CSV COPY passthrough, Parquet). Memory is Python's peak allocation (tracemalloc)
+while the body is consumed and thrown away.
+
+    python -m benchmarks.bench_streaming --dataset-id 1
+"""
+import argparse
+import time
+import tracemalloc
+
+from db import pooled_connection, close_pool
+from services.export import stream_parquet
+from services.row_stream import ROW_COLUMNS, iter_copy_csv, iter_ndjson
+
+
+def fetchall_rows(conn, dataset_id: int):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(ROW_COLUMNS)} FROM signals WHERE dataset_id = %s ORDER BY time;",
+            (dataset_id,),
+        )
+        rows = cursor.fetchall()
+    conn.rollback()
+    yield str(len(rows)).encode()
+
+
+def measure(label: str, make_stream):
+    with pooled_connection() as conn:
+        tracemalloc.start()
+        started = time.perf_counter()
+        total = sum(len(chunk) for chunk in make_stream(conn))
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"{label:<22} {seconds:8.2f} s  peak={peak / 1e6:9.1f} MB  body={total / 1e6:9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-id", type=int, default=1)
+    parser.add_argument("--skip-fetchall", action="store_true", help="the fetchall run can exhaust memory")
+    args = parser.parse_args()
+    dataset_id = args.dataset_id
+
+    if not args.skip_fetchall:
+        measure("fetchall (dicts)", lambda conn: fetchall_rows(conn, dataset_id))
+    measure("ndjson (named cursor)", lambda conn: iter_ndjson(conn, dataset_id))
+    measure("csv (COPY)", lambda conn: iter_copy_csv(conn, dataset_id))
+    measure("parquet", lambda conn: stream_parquet(conn.cursor(), dataset_id, ROW_COLUMNS[3:-1], None, None))
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of the pre-COPY CSV checks (services/csv_validation.py) on a generated recorder file.
+
+    python -m benchmarks.bench_validation --rows 1000000
+    python -m benchmarks.bench_validation --rows 1000000 --db   # also the real COPY, rolled back
+
+Without --db only the client side is timed: the transformer alone, with the
+checks inline and with the checks on a worker thread (as uploads run them).
+With --db, ingest_signals() is timed with CSV_VALIDATE off and on, alternating,
+each run in a transaction that is rolled back. The target is < 5 % overhead;
+CSV_VALIDATE stays off by default until this run meets it.
+"""
+import argparse
+import io
+import statistics
+import time
+
+from benchmarks.load_uploads import make_csv
+from db import close_pool, pooled_connection
+from services import ingest
+from services.csv_validation import CsvBlockValidator
+
+
+def transform_only(data: bytes, validator) -> float:
+    transformer = ingest.SignalCsvTransformer(io.BytesIO(data), 0, validator=validator)
+    started = time.perf_counter()
+    while transformer.read(1 << 16):
+        pass
+    return time.perf_counter() - started
+
+
+def db_ingest(data: bytes, validate: bool) -> float:
+    ingest.CSV_VALIDATE = validate
+    with pooled_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                dataset_id = ingest.insert_dataset(cursor, f"Bench_Validation_{time.time_ns()}.csv", {})
+                started = time.perf_counter()
+                ingest.ingest_signals(cursor, dataset_id, io.BytesIO(data))
+                return time.perf_counter() - started
+        finally:
+            conn.rollback()
+
+
+def report(label: str, baseline: list, checked: list):
+    base, with_checks = statistics.median(baseline), statistics.median(checked)
+    overhead = (with_checks - base) / base * 100
+    print(f"{label:<22} {with_checks:7.3f} s vs {base:7.3f} s  overhead {overhead:+6.1f} %"
+          f"  {'✅' if overhead < 5 else '❌'} (target < 5 %)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="also time ingest_signals() against the database")
+    args = parser.parse_args()
+
+    data = make_csv(0, args.rows)
+    print(f"{args.rows:,} rows, {len(data) / 1e6:.1f} MB")
+
+    timings = {"off": [], "inline": [], "background": []}
+    for _ in range(args.repeat):
+        timings["off"].append(transform_only(data, None))
+        timings["inline"].append(transform_only(data, CsvBlockValidator()))
+        timings["background"].append(transform_only(data, CsvBlockValidator(background=True)))
+    base = statistics.median(timings["off"])
+    print(f"transform only         {base:7.3f} s  ({len(data) / 1e6 / base:.0f} MB/s)")
+    report("+ checks inline", timings["off"], timings["inline"])
+    report("+ checks background", timings["off"], timings["background"])
+
+    if args.db:
+        off, on = [], []
+        for _ in range(args.repeat):
+            off.append(db_ingest(data, False))
+            on.append(db_ingest(data, True))
+        print(f"COPY (no checks)       {statistics.median(off):7.3f} s")
+        report("COPY + checks", off, on)
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
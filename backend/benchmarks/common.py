@@ -0,0 +1,47 @@
+"""
+Small timing helpers shared by the benchmark scripts.
+Run benchmarks from the backend folder, e.g.:  python -m benchmarks.bench_pool
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.requests import Request
+
+# Plain GET without conditional headers, for calling route handlers directly
+PLAIN_GET = Request({"type": "http", "method": "GET", "headers": []})
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label: str, samples_ms, wall_seconds: float = None):
+    """Print p50/p99/mean (ms) for a list of per-call latencies."""
+    line = (
+        f"{label:<28} n={len(samples_ms):<6}"
+        f" p50={percentile(samples_ms, 50):8.2f} ms"
+        f" p99={percentile(samples_ms, 99):8.2f} ms"
+        f" mean={statistics.fmean(samples_ms) if samples_ms else 0:8.2f} ms"
+    )
+    if wall_seconds:
+        line += f" throughput={len(samples_ms) / wall_seconds:8.1f} req/s"
+    print(line)
+
+
+def timed(fn, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+
+def run_concurrent(fn, requests: int, concurrency: int):
+    """Call fn() `requests` times from `concurrency` threads. Returns (latencies_ms, wall_s)."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: timed(fn), range(requests)))
+    return latencies, time.perf_counter() - started
@@ -0,0 +1,106 @@
+"""
+Concurrent upload load test: ingest N synthetic recordings in parallel and check
+that every dataset got exactly its own rows, then report aggregate throughput.
+
+    python -m benchmarks.load_uploads --files 8 --rows 200000 --concurrency 8
+
+Each file i carries ecg == i on every row, so any cross-talk between uploads
+shows up as rows with the wrong ecg value. Created rows are removed afterwards
+unless --keep is given.
+"""
+import argparse
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from db import pooled_connection, close_pool, DB_POOL_MAX
+from services.csv_validation import CSV_COLUMNS
+from services.ingest import run_ingest
+from services.parser import parse_filename
+from services.storage import drop_dataset_chunks
+
+
+def make_csv(index: int, rows: int) -> bytes:
+    data = np.random.default_rng(index).normal(size=(rows, len(CSV_COLUMNS)))
+    data[:, 0] = np.arange(rows) / 1000.0          # time in seconds (1 kHz)
+    data[:, 1] = np.arange(rows)                   # header
+    data[:, CSV_COLUMNS.index("ecg")] = index      # marker for the isolation check
+    data[:, -1] = 0                                # frame_seperator
+    out = io.BytesIO()
+    out.write((",".join(CSV_COLUMNS) + "\n").encode())
+    fmt = ["%.6f", "%d"] + ["%.6f"] * (len(CSV_COLUMNS) - 3) + ["%d"]
+    np.savetxt(out, data, delimiter=",", fmt=fmt)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    if args.concurrency > DB_POOL_MAX:
+        print(f"⚠️ concurrency {args.concurrency} > DB_POOL_MAX {DB_POOL_MAX}; uploads will queue on the pool")
+
+    run = int(time.time())
+    files = {}
+    for i in range(args.files):
+        name = f"Artifacts_LT{run}_BBox{i}_Load_Subject_Load{run}x{i}_01.01.2025.csv"
+        files[name] = (i, make_csv(i, args.rows))
+    total_mb = sum(len(body) for _, body in files.values()) / 1_000_000
+    print(f"Generated {args.files} files, {total_mb:.1f} MB total")
+
+    def upload(name):
+        started = time.perf_counter()
+        result = run_ingest(io.BytesIO(files[name][1]), name, parse_filename(name))
+        result["seconds"] = time.perf_counter() - started
+        return name, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = dict(pool.map(upload, files))
+    wall = time.perf_counter() - started
+
+    for name, result in results.items():
+        print(f"  {name}: {result['rows_inserted']} rows in {result['seconds']:.2f}s ({result['throughput_mb_s']} MB/s)")
+    total_rows = sum(r["rows_inserted"] for r in results.values())
+    print(f"Aggregate: {total_rows} rows in {wall:.2f}s → {total_rows / wall:,.0f} rows/s, {total_mb / wall:.1f} MB/s")
+
+    dataset_ids = [r["dataset_id"] for r in results.values()]
+    failures = 0
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            for name, result in results.items():
+                marker = files[name][0]
+                cursor.execute(
+                    """
+                    SELECT COUNT(*) AS total,
+                           COUNT(*) FILTER (WHERE ecg <> %s) AS foreign_rows
+                    FROM signals WHERE dataset_id = %s;
+                    """,
+                    (marker, result["dataset_id"]),
+                )
+                row = cursor.fetchone()
+                if row["total"] != args.rows or row["foreign_rows"] != 0:
+                    failures += 1
+                    print(f"❌ {name}: {row['total']} rows, {row['foreign_rows']} from other uploads")
+
+            if not args.keep:
+                cursor.execute("DELETE FROM signal_pyramid WHERE dataset_id = ANY(%s);", (dataset_ids,))
+                for dataset_id in dataset_ids:
+                    drop_dataset_chunks(cursor, dataset_id)
+                cursor.execute("DELETE FROM datasets WHERE dataset_id = ANY(%s);", (dataset_ids,))
+                cursor.execute("DELETE FROM persons WHERE person_name LIKE %s;", (f"Load{run}x%",))
+                cursor.execute("DELETE FROM flights WHERE flight_code = %s;", (f"LT{run}",))
+                cursor.execute("DELETE FROM boxes WHERE color = 'Load';")
+        conn.commit()
+
+    print("✅ Row isolation OK" if failures == 0 else f"❌ {failures} dataset(s) failed isolation check")
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
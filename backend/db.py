@@ -1,21 +1,44 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions, pool
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 # Load .env file
 load_dotenv()
 
+# Pool sizing (per process). Keep DB_POOL_MAX * workers below max_connections.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# Seconds a request waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# A connection idle in the pool longer than this is pinged (SELECT 1) before reuse,
+# so sessions the server terminated meanwhile are replaced instead of failing a request
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+
+
+def _connect_kwargs() -> dict:
+    return dict(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        cursor_factory=RealDictCursor,
+    )
+
+
 def get_connection():
+    """
+    Open a dedicated (unpooled) connection.
+    Only meant for scripts and one-off tools; request handlers use the pool.
+    """
     try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT"),
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            cursor_factory=RealDictCursor
-        )
+        conn = psycopg2.connect(**_connect_kwargs())
         print("✅ Connected to PostgreSQL!")
         return conn
 
@@ -23,12 +46,208 @@ def get_connection():
         print("❌ Database connection error:", e)
         raise
 
+
+# ============================================================
+# Process-wide connection pool
+# ============================================================
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class ConnectionPool:
+    """
+    Thin wrapper around psycopg2's ThreadedConnectionPool that:
+    - blocks (up to a timeout) instead of failing when all connections are busy
+    - checks connections before handing them out (SELECT 1 after a long idle)
+      and replaces dead ones
+    - keeps simple counters so pool exhaustion is visible in /api/health
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **_connect_kwargs())
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._returned_at = {}  # connection -> time.monotonic() it went back to the pool
+        self.stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "waits": 0,          # checkouts that found the pool exhausted
+            "timeouts": 0,       # checkouts that gave up after DB_POOL_TIMEOUT
+            "wait_seconds": 0.0,
+            "replaced": 0,       # broken connections discarded on checkout/return
+        }
+
+    def getconn(self):
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            with self._lock:
+                self.stats["waits"] += 1
+            acquired = self._slots.acquire(timeout=self.timeout)
+            with self._lock:
+                self.stats["wait_seconds"] += time.perf_counter() - started
+                if not acquired:
+                    self.stats["timeouts"] += 1
+            if not acquired:
+                raise PoolTimeout(
+                    f"No database connection available within {self.timeout}s "
+                    f"(pool size {self.maxconn})"
+                )
+
+        try:
+            conn = self._pool.getconn()
+            if conn.closed or not self._alive(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["in_use"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.stats["in_use"])
+        return conn
+
+    def putconn(self, conn):
+        try:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    # End any transaction a read left open and restore defaults
+                    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    if conn.autocommit:
+                        conn.autocommit = False
+                except psycopg2.Error:
+                    broken = True
+            if broken:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._returned_at[conn] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self.stats["in_use"] -= 1
+            self._slots.release()
+
+    def _alive(self, conn) -> bool:
+        """Ping a connection that sat idle longer than DB_POOL_PING_AFTER (the server may have ended it)."""
+        with self._lock:
+            returned = self._returned_at.pop(conn, None)
+        if returned is None or time.monotonic() - returned < DB_POOL_PING_AFTER:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._pool.putconn(conn, close=True)
+        with self._lock:
+            self._returned_at.pop(conn, None)
+            self.stats["replaced"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = dict(self.stats)
+        data["max_size"] = self.maxconn
+        data["idle"] = len(self._pool._pool)
+        return data
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool():
+    """Create the shared pool (called from the FastAPI lifespan)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT)
+            print(f"✅ PostgreSQL pool ready (min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+            print("🔌 PostgreSQL pool closed.")
+
+
+def pool_snapshot():
+    """Counters of the shared pool, or None if it was never created (never connects)."""
+    return _pool.snapshot() if _pool is not None else None
+
+
+def get_pool() -> ConnectionPool:
+    # Lazily initialise so scripts/dev helpers work without the app lifespan
+    return _pool or init_pool()
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a connection from the shared pool and always return it."""
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
+
+def get_db():
+    """FastAPI dependency: one pooled connection per request."""
+    with pooled_connection() as conn:
+        yield conn
+
+
+def check_health() -> dict:
+    """Round-trip a trivial query through the pool and report pool counters."""
+    started = time.perf_counter()
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 AS ok;")
+            cursor.fetchone()
+    return {
+        "database": "ok",
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "pool": get_pool().snapshot(),
+    }
+
+
 # Utility function to check if a file with the same name already exists in the database
 def file_exists(file_name: str):
-    conn = get_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT dataset_id FROM datasets WHERE file_name = %s", (file_name,))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("SELECT dataset_id FROM datasets WHERE file_name = %s", (file_name,))
+        result = cursor.fetchone()
+        cursor.close()
     return result is not None
+
+
+def existing_file_names(file_names) -> set:
+    """Which of these file names already have a datasets row (one query for the whole batch)."""
+    file_names = list(file_names)
+    if not file_names:
+        return set()
+    with pooled_connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("SELECT file_name FROM datasets WHERE file_name = ANY(%s)", (file_names,))
+        result = {row["file_name"] for row in cursor.fetchall()}
+        cursor.close()
+    return result
@@ -0,0 +1,107 @@
+"""
+Async connection pool (psycopg 3) for the read endpoints.
+
+Sync `def` handlers each hold one of Starlette's worker threads (~40) for the
+whole time they wait on psycopg2, so under bursts requests queue for a thread
+long before the database is busy. The async read routes (datasets, dataset_rows,
+stats) await their queries on the event loop instead, and only wait for a
+database connection from this pool. psycopg 3 keeps the %s placeholder SQL of the
+psycopg2 code, so both paths share their queries.
+
+Windows: psycopg's async mode needs a selector event loop, which uvicorn uses
+with --reload / --workers; otherwise set DB_ASYNC_READS=0 to serve the sync routes.
+"""
+import os
+from contextlib import asynccontextmanager
+
+import psycopg_pool
+from psycopg.rows import dict_row
+
+from db import DB_POOL_MAX, DB_POOL_MIN, DB_POOL_TIMEOUT, PoolTimeout
+
+# Serve the read routes from the async pool (main.py picks the routers)
+DB_ASYNC_READS = os.getenv("DB_ASYNC_READS", "1") == "1"
+# Counted separately from the psycopg2 pool: keep both maxima * workers below max_connections
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", str(DB_POOL_MIN)))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", str(DB_POOL_MAX)))
+
+_pool = None
+
+
+def _connect_kwargs() -> dict:
+    return dict(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        row_factory=dict_row,  # rows as dicts, like RealDictCursor
+        autocommit=True,       # reads need no transaction (no BEGIN/ROLLBACK round trips)
+    )
+
+
+async def init_async_pool():
+    """Create and open the async pool (called from the FastAPI lifespan)."""
+    global _pool
+    if _pool is None:
+        _pool = psycopg_pool.AsyncConnectionPool(
+            kwargs=_connect_kwargs(),
+            min_size=DB_ASYNC_POOL_MIN,
+            max_size=DB_ASYNC_POOL_MAX,
+            timeout=DB_POOL_TIMEOUT,
+            open=False,
+        )
+        await _pool.open()
+        print(f"✅ PostgreSQL async pool ready (min={DB_ASYNC_POOL_MIN}, max={DB_ASYNC_POOL_MAX})")
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        print("🔌 PostgreSQL async pool closed.")
+
+
+async def get_async_pool() -> psycopg_pool.AsyncConnectionPool:
+    # Lazily initialise so benchmarks work without the app lifespan
+    return _pool or await init_async_pool()
+
+
+@asynccontextmanager
+async def async_pooled_connection():
+    """Borrow a connection from the async pool and always return it."""
+    db_pool = await get_async_pool()
+    try:
+        conn = await db_pool.getconn()
+    except psycopg_pool.PoolTimeout as e:
+        # Same 503 + Retry-After as the sync pool (handler in main.py)
+        raise PoolTimeout(str(e))
+    try:
+        yield conn
+    finally:
+        await db_pool.putconn(conn)
+
+
+async def get_async_db():
+    """FastAPI dependency: one async pooled connection per request."""
+    async with async_pooled_connection() as conn:
+        yield conn
+
+
+def async_pool_snapshot() -> dict:
+    if _pool is None:
+        return {"open": False}
+    stats = _pool.get_stats()
+    return {
+        "open": True,
+        "max_size": _pool.max_size,
+        "size": stats.get("pool_size", 0),
+        "idle": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": stats.get("requests_num", 0),
+        "waits": stats.get("requests_queued", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+    }
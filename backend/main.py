@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from routes.uploads import router as upload_router
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from routes.stats import router as stats_router
-from routes.datasets import router as datasets_router
-from routes.dataset_rows import router as dataset_rows_router
+from db import init_pool, close_pool, PoolTimeout
+from db_async import DB_ASYNC_READS, init_async_pool, close_async_pool
+from routes import stats, datasets, dataset_rows
+from routes.health import router as health_router
+from routes.signal import router as signal_router
+from routes.jobs import router as jobs_router
+from routes.queries import router as queries_router
+from routes.live import router as live_router
+from services import jobs
 
 
 print("="*50)
@@ -12,15 +20,48 @@ print("🔥🔥🔥 MAIN.PY IS RUNNING! THIS FILE IS BEING LOADED. 🔥🔥🔥"
 print(f"Current Working Directory: {os.getcwd()}")
 print("="*50)
 
-app = FastAPI(title="Sensor Data API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One connection pool per worker process, shared by all requests
+    init_pool()
+    if DB_ASYNC_READS:
+        await init_async_pool()
+    yield
+    jobs.shutdown()
+    if DB_ASYNC_READS:
+        await close_async_pool()
+    close_pool()
+
+
+app = FastAPI(title="Sensor Data API", lifespan=lifespan)
 
 app.include_router(upload_router, prefix="/api", tags=["Uploads"])
 
-app.include_router(stats_router, prefix="/api", tags=["Stats"])
+# Read routes: async handlers on the psycopg 3 pool, or the sync ones in the threadpool
+def read_router(module):
+    return module.async_router if DB_ASYNC_READS else module.router
+
+app.include_router(read_router(stats), prefix="/api", tags=["Stats"])
+
+app.include_router(read_router(datasets), prefix="/api", tags=["Datasets"])
+
+app.include_router(read_router(dataset_rows), prefix="/api", tags=["Dataset Rows"])
+
+app.include_router(signal_router, prefix="/api", tags=["Signals"])
+
+app.include_router(queries_router, prefix="/api", tags=["Queries"])
+
+app.include_router(jobs_router, prefix="/api", tags=["Jobs"])
+
+app.include_router(live_router, prefix="/api", tags=["Live"])
+
+app.include_router(health_router, prefix="/api", tags=["Health"])
 
-app.include_router(datasets_router, prefix="/api", tags=["Datasets"])
 
-app.include_router(dataset_rows_router, prefix="/api", tags=["Dataset Rows"])
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # Pool exhausted: tell clients to back off instead of hanging
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 
 allow_origins=[
@@ -1,21 +1,148 @@
-from fastapi import APIRouter
-from db import get_connection
+import io
+import os
+from typing import Annotated, Optional
+
+import pyarrow as pa
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from db import get_db
+from db_async import get_async_db
+from services import archive
+from services.columnar import (
+    SIGNAL_CHANNELS, fetch_columns, fetch_columns_async, iter_column_batches,
+    iter_column_batches_async, pack_columns, parse_channels,
+)
+from services.export import stream_parquet
+from services.row_stream import iter_copy_csv, iter_ndjson, json_safe
+from services.http_cache import cache_headers, dataset_version, is_not_modified, make_etag, rows_cache
 
 router = APIRouter()
+# Same endpoints with the rows page awaited on the async pool (db_async); main.py picks one
+async_router = APIRouter()
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+# Export formats: media type and file extension
+EXPORT_FORMATS = {
+    "parquet": (PARQUET_MEDIA_TYPE, ".parquet"),
+    "csv": ("text/csv", ".csv"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+}
+# JSON pages build every row as a dict; bigger reads belong to /export
+JSON_MAX_LIMIT = int(os.getenv("JSON_MAX_LIMIT", "10000"))
+DEFAULT_JSON_LIMIT = 200
+
+DATASET_INFO_SQL = "SELECT row_count, uploaded_at FROM datasets WHERE dataset_id = %s;"
+COUNT_ROWS_SQL = "SELECT COUNT(*) FROM signals WHERE dataset_id = %s;"
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """?format= wins; otherwise look at the Accept header; JSON is the default."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in ("json", "arrow", "binary"):
+            raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'.")
+        return fmt
+    if accept:
+        if ARROW_MEDIA_TYPE in accept:
+            return "arrow"
+        if BINARY_MEDIA_TYPE in accept:
+            return "binary"
+    return "json"
+
+
+def resolve_rows_request(dataset_id: int, fmt: Optional[str], accept: Optional[str],
+                         limit: Optional[int], channels: Optional[str]):
+    """(response format, limit, selected channels) of a rows request; 400 on bad input."""
+    response_format = negotiate_format(fmt, accept)
+    if response_format == "json" and limit is None:
+        limit = DEFAULT_JSON_LIMIT
+    if response_format == "json" and limit > JSON_MAX_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit above {JSON_MAX_LIMIT} for JSON; stream /api/datasets/{dataset_id}/export?format=ndjson instead.",
+        )
+    selected = None
+    if response_format != "json":
+        try:
+            selected = parse_channels(channels)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return response_format, limit, selected
 
-@router.get("/dataset-rows/{dataset_id}")
-def get_dataset_rows(dataset_id: int, offset: int = 0, limit: int = 200):
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    # Get total row count for this dataset
-    cursor.execute(
-        "SELECT COUNT(*) FROM signals WHERE dataset_id = %s;",
-        (dataset_id,)
+def get_dataset_info(cursor, dataset_id: int) -> Optional[dict]:
+    """
+    Row count and upload time of a dataset (None if it does not exist).
+    The row count is cached on the datasets row at ingest time (older datasets are
+    backfilled by the migration in sqlpool-query/sql-query); a NULL left by a database
+    that skipped it is counted on the fly, read-only.
+    """
+    cursor.execute(DATASET_INFO_SQL, (dataset_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    if row["row_count"] is not None:
+        return row
+
+    cursor.execute(COUNT_ROWS_SQL, (dataset_id,))
+    return {"row_count": cursor.fetchone()["count"], "uploaded_at": row["uploaded_at"]}
+
+
+async def get_dataset_info_async(conn, dataset_id: int) -> Optional[dict]:
+    """get_dataset_info() on an async (autocommit) connection."""
+    async with conn.cursor() as cursor:
+        await cursor.execute(DATASET_INFO_SQL, (dataset_id,))
+        row = await cursor.fetchone()
+        if row is None or row["row_count"] is not None:
+            return row
+
+        await cursor.execute(COUNT_ROWS_SQL, (dataset_id,))
+        total_rows = (await cursor.fetchone())["count"]
+    return {"row_count": total_rows, "uploaded_at": row["uploaded_at"]}
+
+
+def check_rows_cache(request: Request, dataset_id: int, info: Optional[dict], response_format: str,
+                     after_time, offset: int, limit, selected, v):
+    """
+    ETag / LRU lookup for a rows page: (response to send right away or None, LRU key, cache headers).
+    The response is a 304 or a page from rows_cache; arrow streams are never kept in the LRU.
+    """
+    if info is None or info["uploaded_at"] is None:
+        return None, None, {}
+
+    version = dataset_version(dataset_id, info["uploaded_at"])
+    etag = make_etag(
+        version, response_format,
+        f"a{after_time}" if after_time is not None else f"o{offset}",
+        f"l{limit}" if limit is not None else "all",
+        ",".join(selected) if selected else None,
     )
-    total_rows = cursor.fetchone()["count"]
+    headers = cache_headers(etag, info["uploaded_at"], immutable=(v == version))
+    if is_not_modified(request.headers, etag, info["uploaded_at"]):
+        return Response(status_code=304, headers=headers), None, headers
+
+    if response_format == "arrow":
+        return None, None, headers
+    cached = rows_cache.get(etag)
+    if cached is not None:
+        body, media_type, stored_headers = cached
+        return Response(content=body, media_type=media_type, headers={**stored_headers, **headers}), etag, headers
+    return None, etag, headers
+
 
-    cursor.execute("""
+def json_rows_sql(dataset_id: int, after_time, offset: int, limit: int):
+    """SELECT of one JSON page (keyset when after_time is given, else OFFSET) and its params."""
+    if after_time is not None:
+        where_clause = "WHERE dataset_id = %s AND time > %s"
+        params = (dataset_id, after_time, limit, 0)
+    else:
+        where_clause = "WHERE dataset_id = %s"
+        params = (dataset_id, limit, offset)
+
+    sql = f"""
         SELECT
             dataset_id,
             time,
@@ -29,21 +156,175 @@ def get_dataset_rows(dataset_id: int, offset: int = 0, limit: int = 200):
             ecg,
             frame_separator
         FROM signals
-        WHERE dataset_id = %s
+        {where_clause}
         ORDER BY time ASC
         LIMIT %s OFFSET %s;
-    """, (dataset_id, limit, offset))
+    """
+    return sql, params
+
+
+def archived_json_rows(dataset_id: int, after_time, offset: int, limit: int) -> list:
+    """One JSON page of an archived dataset, read from its Parquet file."""
+    table = archive.read_table(
+        dataset_id, ["header"] + SIGNAL_CHANNELS + ["frame_separator"],
+        after_time=after_time, limit=limit, offset=0 if after_time is not None else offset,
+    )
+    return table.to_pylist()
+
+
+@router.get("/dataset-rows/{dataset_id}")
+def get_dataset_rows(
+    dataset_id: int,
+    request: Request,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    after_time: Optional[int] = None,
+    fmt: Annotated[Optional[str], Query(alias="format")] = None,
+    channels: Optional[str] = None,
+    accept: Annotated[Optional[str], Header()] = None,
+    v: Optional[str] = None,
+    conn=Depends(get_db),
+):
+    """
+    Page through a dataset ordered by time.
+
+    - after_time (preferred): keyset/seek mode. Returns rows with time > after_time,
+      using the (dataset_id, time) index, so every page costs the same.
+      Pass back `next_after_time` from the previous response to get the next page.
+    - offset: legacy mode, gets slower the deeper you page.
+
+    Response format (format= or Accept header, JSON by default):
+    - json:   rows as objects, limit defaults to 200 (at most JSON_MAX_LIMIT).
+    - arrow:  Arrow IPC stream (time int64 + channel float64 columns),
+              streamed in record batches; limit defaults to the whole dataset.
+    - binary: raw little-endian columns back to back (time int64, then each
+              channel float64). Layout is described in the X-Columns / X-Row-Count headers.
+    `channels=ecg,az_alpha` picks a subset of the 18 IMU axes + ecg for arrow/binary.
+
+    Caching: signals never change after ingest, so every response carries a strong
+    ETag (dataset id + uploaded_at + page parameters) and Last-Modified, and
+    conditional requests get 304 without touching signals. JSON and binary pages
+    are also kept in a byte-bounded in-process LRU. With `v=<version>` (from
+    /api/datasets/{id}) the URL is pinned to one recording and marked immutable.
+    """
+    response_format, limit, selected = resolve_rows_request(dataset_id, fmt, accept, limit, channels)
+
+    cursor = conn.cursor()
+    info = get_dataset_info(cursor, dataset_id)
+    total_rows = info["row_count"] if info else 0
+
+    early, cache_key, headers = check_rows_cache(
+        request, dataset_id, info, response_format, after_time, offset, limit, selected, v
+    )
+    if early is not None:
+        cursor.close()
+        return early
+
+    if response_format == "arrow":
+        headers["X-Total-Rows"] = str(total_rows)
+        return StreamingResponse(
+            stream_arrow(cursor, dataset_id, selected, after_time, offset, limit),
+            media_type=ARROW_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    if response_format == "binary":
+        columns = fetch_columns(
+            cursor, dataset_id, selected,
+            after_time=after_time, limit=limit, offset=offset,
+        )
+        cursor.close()
+        return binary_page(cache_key, columns, total_rows, limit, headers)
+
+    if archive.is_archived(dataset_id):
+        cursor.close()
+        rows = archived_json_rows(dataset_id, after_time, offset, limit)
+        return json_page(cache_key, dataset_id, total_rows, limit, rows, headers)
 
+    cursor.execute(*json_rows_sql(dataset_id, after_time, offset, limit))
     rows = cursor.fetchall()
 
     cursor.close()
-    conn.close()
+    return json_page(cache_key, dataset_id, total_rows, limit, rows, headers)
 
-    return {
+
+@async_router.get("/dataset-rows/{dataset_id}")
+async def get_dataset_rows_async(
+    dataset_id: int,
+    request: Request,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    after_time: Optional[int] = None,
+    fmt: Annotated[Optional[str], Query(alias="format")] = None,
+    channels: Optional[str] = None,
+    accept: Annotated[Optional[str], Header()] = None,
+    v: Optional[str] = None,
+    conn=Depends(get_async_db),
+):
+    """
+    Page through a dataset ordered by time (see get_dataset_rows for the parameters,
+    formats and caching). Queries are awaited on the async pool, so a slow page
+    holds no worker thread; archive reads and JSON encoding still run in the threadpool.
+    """
+    response_format, limit, selected = resolve_rows_request(dataset_id, fmt, accept, limit, channels)
+
+    info = await get_dataset_info_async(conn, dataset_id)
+    total_rows = info["row_count"] if info else 0
+
+    early, cache_key, headers = check_rows_cache(
+        request, dataset_id, info, response_format, after_time, offset, limit, selected, v
+    )
+    if early is not None:
+        return early
+
+    if response_format == "arrow":
+        headers["X-Total-Rows"] = str(total_rows)
+        return StreamingResponse(
+            stream_arrow_async(conn, dataset_id, selected, after_time, offset, limit),
+            media_type=ARROW_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    if response_format == "binary":
+        columns = await fetch_columns_async(
+            conn, dataset_id, selected,
+            after_time=after_time, limit=limit, offset=offset,
+        )
+        return binary_page(cache_key, columns, total_rows, limit, headers)
+
+    if archive.is_archived(dataset_id):
+        rows = await run_in_threadpool(archived_json_rows, dataset_id, after_time, offset, limit)
+    else:
+        async with conn.cursor() as cursor:
+            await cursor.execute(*json_rows_sql(dataset_id, after_time, offset, limit))
+            rows = await cursor.fetchall()
+
+    return await run_in_threadpool(json_page, cache_key, dataset_id, total_rows, limit, rows, headers)
+
+
+def binary_page(cache_key, columns: dict, total_rows: int, limit, headers: dict) -> Response:
+    """Pack a binary rows page, describe its layout in headers and remember it in the LRU."""
+    headers["X-Total-Rows"] = str(total_rows)
+    row_count = len(columns["time"])
+    layout = {
+        "X-Total-Rows": str(total_rows),
+        "X-Columns": ",".join(columns),
+        "X-Row-Count": str(row_count),
+    }
+    if limit is not None and row_count == limit:
+        layout["X-Next-After-Time"] = str(int(columns["time"][-1]))
+    return cached_response(cache_key, pack_columns(columns), BINARY_MEDIA_TYPE, layout, headers)
+
+
+def json_page(cache_key, dataset_id: int, total_rows: int, limit: int, rows: list, headers: dict) -> Response:
+    """Encode a JSON rows page (from signals or from the archive) and remember it in the LRU."""
+    rows = [json_safe(r) for r in rows]
+    payload = {
         "total_rows": total_rows, 
+        "next_after_time": rows[-1]["time"] if rows and len(rows) == limit else None,
         "rows": [
             {
-                "dataset_id": r["dataset_id"],
+                "dataset_id": dataset_id,
                 "time": r["time"],
                 "header": r["header"],
 
@@ -77,3 +358,134 @@ def get_dataset_rows(dataset_id: int, offset: int = 0, limit: int = 200):
             for r in rows
         ]
     }
+    body = JSONResponse(payload).body
+    return cached_response(cache_key, body, "application/json", {}, headers)
+
+
+def cached_response(cache_key, body: bytes, media_type: str, stored_headers: dict, headers: dict) -> Response:
+    """Remember an encoded page in the LRU (when cacheable) and send it."""
+    if cache_key is not None:
+        rows_cache.put(cache_key, body, media_type, stored_headers)
+    return Response(content=body, media_type=media_type, headers={**stored_headers, **headers})
+
+
+class ArrowStreamEncoder:
+    """Arrow IPC stream writer that hands back the encoded bytes after each record batch."""
+
+    def __init__(self, channels: list):
+        self.schema = pa.schema([("time", pa.int64())] + [(name, pa.float64()) for name in channels])
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def write(self, batch: dict) -> bytes:
+        self._writer.write_batch(pa.record_batch(
+            [pa.array(batch[name]) for name in self.schema.names], schema=self.schema
+        ))
+        return self._drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+def stream_arrow(cursor, dataset_id: int, channels: list, after_time, offset: int, limit):
+    """Yield an Arrow IPC stream one record batch at a time (constant memory)."""
+    encoder = ArrowStreamEncoder(channels)
+    try:
+        for batch in iter_column_batches(
+            cursor, dataset_id, channels,
+            after_time=after_time, offset=offset, limit=limit,
+        ):
+            yield encoder.write(batch)
+        yield encoder.close()
+    finally:
+        cursor.close()
+
+
+async def stream_arrow_async(conn, dataset_id: int, channels: list, after_time, offset: int, limit):
+    """stream_arrow() over an async connection."""
+    encoder = ArrowStreamEncoder(channels)
+    async for batch in iter_column_batches_async(
+        conn, dataset_id, channels,
+        after_time=after_time, offset=offset, limit=limit,
+    ):
+        yield encoder.write(batch)
+    yield encoder.close()
+
+
+# Exports stream through psycopg2 (named cursor, COPY) with either router
+@router.get("/datasets/{dataset_id}/export")
+@async_router.get("/datasets/{dataset_id}/export")
+def export_dataset(
+    dataset_id: int,
+    request: Request,
+    fmt: Annotated[str, Query(alias="format")] = "parquet",
+    channels: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    conn=Depends(get_db),
+):
+    """
+    Download a whole recording (or a [start, end) window, microseconds) as one file.
+    Example: /api/datasets/1/export?format=parquet&channels=ecg,az_alpha
+
+    - parquet: zstd-compressed, time, header, the selected channels and frame_separator,
+               written one row group per EXPORT_BATCH_ROWS rows as it streams.
+               Archived datasets requested whole are sent straight from their archive file.
+    - ndjson:  every column, one JSON object per line, from a server-side cursor.
+    - csv:     every column with a header line, PostgreSQL's COPY ... TO STDOUT passed through.
+    All formats stream, so memory stays flat however long the recording is.
+    `channels` applies to parquet only.
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{fmt}'.")
+    media_type, extension = EXPORT_FORMATS[fmt]
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT file_name, uploaded_at FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.close()
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    file_name = os.path.splitext(row["file_name"])[0] + extension
+    headers = {"Content-Disposition": f'attachment; filename="{file_name}"'}
+    if row["uploaded_at"] is not None:
+        version = dataset_version(dataset_id, row["uploaded_at"])
+        etag = make_etag(
+            version, fmt, ",".join(selected) if fmt == "parquet" else None,
+            f"s{start}" if start is not None else None,
+            f"e{end}" if end is not None else None,
+        )
+        headers.update(cache_headers(etag, row["uploaded_at"]))
+        if is_not_modified(request.headers, etag, row["uploaded_at"]):
+            cursor.close()
+            return Response(status_code=304, headers=headers)
+
+    if fmt != "parquet":
+        cursor.close()
+        stream = iter_ndjson if fmt == "ndjson" else iter_copy_csv
+        return StreamingResponse(stream(conn, dataset_id, start, end), media_type=media_type, headers=headers)
+
+    if archive.is_archived(dataset_id) and channels is None and start is None and end is None:
+        cursor.close()
+        return FileResponse(archive.archive_path(dataset_id), media_type=media_type, headers=headers)
+
+    return StreamingResponse(
+        stream_parquet(cursor, dataset_id, selected, start, end),
+        media_type=media_type,
+        headers=headers,
+    )
@@ -1,14 +1,60 @@
-from fastapi import APIRouter, HTTPException
-from db import get_connection
+from datetime import date
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from db import get_db
+from db_async import get_async_db
+from services.http_cache import cache_headers, dataset_version, is_not_modified, make_etag
 
 router = APIRouter()   
+# Same endpoints awaited on the async pool (db_async); main.py picks one
+async_router = APIRouter()
 
-@router.get("/datasets")
-def list_datasets():
-    conn = get_connection()
-    cursor = conn.cursor()
+# Equality filters accepted by /datasets (query parameter == column name)
+DATASET_FILTERS = ["flight_code", "box_name", "box_color", "role", "person_name"]
+MAX_PAGE_SIZE = 500
+
+
+DATASET_META_SQL = """
+    SELECT
+        dataset_id,
+        file_name,
+        person_name,
+        role,
+        flight_code,
+        box_name,
+        box_color,
+        file_date,
+        uploaded_at,
+        row_count,
+        archived_at,
+        live_since
+    FROM datasets
+    WHERE dataset_id = %s;
+"""
 
-    cursor.execute("""
+
+def catalogue_sql(values: dict, file_date_from, file_date_to, before_id, limit: int):
+    """Catalogue SELECT for the given filters (None = not filtered) and its params."""
+    conditions, params = [], []
+    for column in DATASET_FILTERS:
+        if values[column] is not None:
+            conditions.append(f"{column} = %s")
+            params.append(values[column])
+    if file_date_from is not None:
+        conditions.append("file_date >= %s")
+        params.append(file_date_from)
+    if file_date_to is not None:
+        conditions.append("file_date <= %s")
+        params.append(file_date_to)
+    if before_id is not None:
+        conditions.append("dataset_id < %s")
+        params.append(before_id)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    sql = f"""
         SELECT 
             dataset_id,
             file_name,
@@ -19,40 +65,130 @@ def list_datasets():
             box_color,
             file_date
         FROM datasets
-        ORDER BY dataset_id DESC;
-    """)
+        {where_clause}
+        ORDER BY dataset_id DESC
+        LIMIT %s;
+    """
+    return sql, (*params, limit)
+
+
+def catalogue_page(rows: list, limit: int) -> dict:
+    return {
+        "datasets": rows,
+        "limit": limit,
+        "next_before_id": rows[-1]["dataset_id"] if len(rows) == limit else None,
+    }
+
+
+def dataset_response(dataset_id: int, row: Optional[dict], request: Request):
+    """
+    Metadata response with version and ETag (304 when the client is current).
+    No Last-Modified: archiving and restoring change the metadata without moving
+    uploaded_at (and restore clears archived_at), so only the ETag can tell.
+    """
+    if row is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if row["uploaded_at"] is None:
+        return row
+
+    row["version"] = dataset_version(dataset_id, row["uploaded_at"])
+    archived = f"archived{row['archived_at'].timestamp():.0f}" if row["archived_at"] else None
+    headers = cache_headers(make_etag(row["version"], "meta", row["row_count"], archived), None)
+    if is_not_modified(request.headers, headers["ETag"], None):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(row), headers=headers)
+
+
+@router.get("/datasets")
+def list_datasets(
+    flight_code: Optional[str] = None,
+    box_name: Optional[str] = None,
+    box_color: Optional[str] = None,
+    role: Optional[str] = None,
+    person_name: Optional[str] = None,
+    file_date_from: Optional[date] = None,
+    file_date_to: Optional[date] = None,
+    before_id: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 50,
+    conn=Depends(get_db),
+):
+    """
+    Catalogue search, newest first.
+    Example: /api/datasets?flight_code=F4&role=Subject&file_date_from=2025-10-01&limit=50
+
+    - flight_code / box_name / box_color / role / person_name: exact match
+    - file_date_from / file_date_to: inclusive date range
+    - before_id: keyset cursor; pass back `next_before_id` for the next page
+      (each page is an index seek, no OFFSET, no COUNT(*))
+    """
+    values = {
+        "flight_code": flight_code,
+        "box_name": box_name,
+        "box_color": box_color,
+        "role": role,
+        "person_name": person_name,
+    }
+    cursor = conn.cursor()
+
+    cursor.execute(*catalogue_sql(values, file_date_from, file_date_to, before_id, limit))
 
     rows = cursor.fetchall()
     cursor.close()
-    conn.close()
 
-    return rows
+    return catalogue_page(rows, limit)
+
+
+@async_router.get("/datasets")
+async def list_datasets_async(
+    flight_code: Optional[str] = None,
+    box_name: Optional[str] = None,
+    box_color: Optional[str] = None,
+    role: Optional[str] = None,
+    person_name: Optional[str] = None,
+    file_date_from: Optional[date] = None,
+    file_date_to: Optional[date] = None,
+    before_id: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 50,
+    conn=Depends(get_async_db),
+):
+    """Catalogue search, newest first (see list_datasets), awaited on the async pool."""
+    values = {
+        "flight_code": flight_code,
+        "box_name": box_name,
+        "box_color": box_color,
+        "role": role,
+        "person_name": person_name,
+    }
+    async with conn.cursor() as cursor:
+        await cursor.execute(*catalogue_sql(values, file_date_from, file_date_to, before_id, limit))
+        rows = await cursor.fetchall()
+
+    return catalogue_page(rows, limit)
 
 
 @router.get("/datasets/{dataset_id}")
-def get_dataset(dataset_id: int):
-    conn = get_connection()
+def get_dataset(dataset_id: int, request: Request, conn=Depends(get_db)):
+    """
+    Dataset metadata. `version` identifies this exact recording; pass it as
+    `v=` to /api/dataset-rows/{id} to get immutable (browser-cacheable) pages.
+    Conditional requests (If-None-Match / If-Modified-Since) get 304.
+    """
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT
-            dataset_id,
-            file_name,
-            person_name,
-            role,
-            flight_code,
-            box_name,
-            box_color,
-            file_date
-        FROM datasets
-        WHERE dataset_id = %s;
-    """, (dataset_id,))
+    cursor.execute(DATASET_META_SQL, (dataset_id,))
 
     row = cursor.fetchone()
     cursor.close()
-    conn.close()
 
-    if row is None:
-        raise HTTPException(status_code=404, detail="Dataset not found")
+    return dataset_response(dataset_id, row, request)
+
+
+@async_router.get("/datasets/{dataset_id}")
+async def get_dataset_async(dataset_id: int, request: Request, conn=Depends(get_async_db)):
+    """Dataset metadata (see get_dataset), awaited on the async pool."""
+    async with conn.cursor() as cursor:
+        await cursor.execute(DATASET_META_SQL, (dataset_id,))
+        row = await cursor.fetchone()
 
-    return row
\ No newline at end of file
+    return dataset_response(dataset_id, row, request)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from db import check_health, pool_snapshot
+from db_async import async_pool_snapshot
+from services.http_cache import rows_cache
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    """
+    Liveness + DB readiness.
+    Runs SELECT 1 through the shared pool and returns pool counters
+    (in_use, waits, timeouts, ...) so exhaustion shows up on dashboards,
+    plus hit/eviction counters of the dataset-rows response cache and of the
+    async read pool.
+    """
+    try:
+        return {**check_health(), "async_pool": async_pool_snapshot(), "response_cache": rows_cache.snapshot()}
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"database": "unavailable", "error": str(e), "pool": pool_snapshot()},
+        )
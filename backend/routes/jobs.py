@@ -0,0 +1,73 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from services import jobs, live_tail
+from services.columnar import parse_channels
+
+router = APIRouter()
+
+@router.get("/jobs")
+def list_jobs():
+    """Recent background jobs, newest first."""
+    return [job.to_dict() for job in jobs.list_jobs()]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Phase, bytes/rows processed and throughput of one job; `result` once done."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Stop a queued or running job; its transaction is rolled back."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.cancel():
+        raise HTTPException(status_code=409, detail=f"Job already {job.phase}")
+    return job.to_dict()
+
+
+@router.websocket("/jobs/{job_id}/live")
+async def live_job(
+    websocket: WebSocket,
+    job_id: str,
+    channels: Optional[str] = None,
+    points: Annotated[int, Query(ge=1, le=100_000)] = live_tail.LIVE_TAIL_POINTS,
+):
+    """
+    Watch an upload while its COPY runs (nothing is visible in the database before commit).
+    Example: ws://host/api/jobs/{job_id}/live?channels=ecg,az_alpha&points=500
+
+    - first a text frame {"event": "start", "columns": [...], "phase": ...}
+    - then one binary frame per ingested block: at most `points` rows (every n-th
+      sample), time int64 µs then each channel float64, little-endian, column after
+      column (same layout as /dataset-rows?format=binary)
+    - text frames {"event": "phase", ...} as the job moves on, and a last
+      {"event": "end", "phase": "done" | "failed" | "cancelled", "rows": ..., "dropped": ...}
+    A viewer that falls behind skips batches (`dropped`); the ingest is never slowed down.
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        await websocket.close(code=1008, reason="Job not found")
+        return
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    try:
+        await live_tail.serve_tail(
+            websocket, job.id, selected, points,
+            status=lambda: {"phase": job.phase, "rows": job.rows, "error": job.error, "finished": job.finished},
+            start={"job_id": job.id, "file_name": job.file_name},
+        )
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
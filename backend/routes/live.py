@@ -0,0 +1,228 @@
+from datetime import date, datetime, timezone
+from typing import Annotated, Optional
+
+import psycopg2
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from db import PoolTimeout, get_db, pooled_connection
+from services import jobs, live_ingest, live_tail, stats
+from services.columnar import parse_channels
+
+router = APIRouter()
+
+# What can stop a live stream: a malformed row (ValueError), the dataset being
+# finished meanwhile (HTTPException 409), the pool or the database
+STREAM_ERRORS = (ValueError, HTTPException, PoolTimeout, psycopg2.Error)
+
+
+def live_urls(dataset_id: int) -> dict:
+    return {
+        "stream_url": f"/api/live/{dataset_id}/stream",
+        "ws_url": f"/api/live/{dataset_id}/ws",
+        "tail_url": f"/api/live/{dataset_id}/tail",
+        "finish_url": f"/api/live/{dataset_id}/finish",
+    }
+
+
+def stream_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    if isinstance(e, PoolTimeout):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return HTTPException(status_code=500, detail=f"Live ingest failed: {e}")
+
+
+def stream_close_code(e: Exception) -> int:
+    """WebSocket close code for a STREAM_ERRORS error: bad data, policy, try again later, server error."""
+    if isinstance(e, ValueError):
+        return 1007
+    if isinstance(e, HTTPException):
+        return 1008
+    if isinstance(e, PoolTimeout):
+        return 1013
+    return 1011
+
+
+def ensure_live(dataset_id: int):
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            live_ingest.check_live(cursor, dataset_id)
+        conn.rollback()
+
+
+@router.post("/live/datasets", status_code=201)
+def register_live_dataset(
+    box_name: str,
+    box_color: str,
+    flight_code: Optional[str] = None,
+    role: Optional[str] = None,
+    person_name: Optional[str] = None,
+    file_date: Optional[date] = None,
+    file_name: Optional[str] = None,
+    conn=Depends(get_db),
+):
+    """
+    Register a dataset a box will stream into (before the first row is sent).
+    Example: POST /api/live/datasets?box_name=BBox2&box_color=Pink&flight_code=F4&role=Subject&person_name=Laura
+
+    Returns the dataset_id and the stream / ws / tail / finish URLs.
+    `file_name` defaults to Live_<flight>_<box>_<color>_<role>_<person>_<UTC timestamp>.csv.
+    """
+    started = datetime.now(timezone.utc)
+    metadata = {
+        "flight_code": flight_code,
+        "box_name": box_name,
+        "box_color": box_color,
+        "role": role,
+        "person_name": person_name,
+        "file_date": file_date or started.date(),
+    }
+    if file_name is None:
+        parts = [flight_code, box_name, box_color, role, person_name]
+        file_name = "_".join(["Live"] + [p for p in parts if p] + [started.strftime("%Y%m%dT%H%M%S%f")]) + ".csv"
+
+    cursor = conn.cursor()
+    try:
+        dataset_id = live_ingest.register_live_dataset(cursor, file_name, metadata)
+        conn.commit()
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail=f"File '{file_name}' already exists in database.")
+    finally:
+        cursor.close()
+    stats.invalidate()
+
+    return {"dataset_id": dataset_id, "file_name": file_name, "metadata": metadata, **live_urls(dataset_id)}
+
+
+@router.post("/live/{dataset_id}/stream")
+async def stream_live_rows(dataset_id: int, request: Request):
+    """
+    Append rows to a live dataset from a (chunked) request body.
+    Body: recorder CSV rows without a header line
+    (time in seconds, header, the 18 IMU axes, ecg, frame_seperator), sent as they are recorded.
+
+    Rows become visible in micro-batches (LIVE_BATCH_BYTES / LIVE_BATCH_SECONDS).
+    A request chunk with a malformed row is rejected (400); earlier chunks are kept.
+    When the server falls behind it stops reading the body, so the sender blocks
+    instead of the server buffering. Returns the rows and batches written.
+    """
+    await run_in_threadpool(ensure_live, dataset_id)
+
+    batcher = live_ingest.LiveBatcher(dataset_id).start()
+    complete, error = False, None
+    try:
+        async for chunk in request.stream():
+            await batcher.feed(chunk)
+        complete = True
+    except STREAM_ERRORS as e:
+        error = e
+    finally:
+        # Also after a bad line or a disconnect: keep the rows received before it
+        try:
+            summary = await batcher.close(complete)
+        except STREAM_ERRORS as e:
+            error = error or e
+    if error is not None:
+        raise stream_http_error(error)
+    return summary
+
+
+@router.websocket("/live/{dataset_id}/ws")
+async def stream_live_rows_ws(websocket: WebSocket, dataset_id: int):
+    """
+    Same as POST /live/{id}/stream over a WebSocket: every text or binary message
+    carries one or more CSV rows. Send an empty message to end; the server flushes,
+    answers {"event": "end", "rows": ..., "batches": ...} and closes.
+    Closing without the empty message keeps every complete row received.
+    On failure the server closes with 1007 (malformed row), 1008 (dataset not
+    streaming any more), 1013 (pool exhausted) or 1011 (database error).
+    """
+    try:
+        await run_in_threadpool(ensure_live, dataset_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    batcher = live_ingest.LiveBatcher(dataset_id).start()
+    ended, disconnected, error = False, False, None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                break
+            data = message.get("bytes")
+            if data is None:
+                data = (message.get("text") or "").encode()
+            if not data:
+                ended = True
+                break
+            await batcher.feed(data)
+    except STREAM_ERRORS as e:
+        error = e
+    finally:
+        try:
+            summary = await batcher.close(ended)
+        except STREAM_ERRORS as e:
+            error = error or e
+
+    if error is not None:
+        reason = stream_http_error(error).detail
+        if disconnected:
+            print(f"⚠️ Live stream {dataset_id} closed by the client, then failed: {reason}")
+        else:
+            # A close reason is at most 123 bytes
+            await websocket.close(code=stream_close_code(error), reason=reason.encode()[:123].decode(errors="ignore"))
+    elif ended:
+        await websocket.send_json({"event": "end", **summary})
+        await websocket.close()
+
+
+@router.websocket("/live/{dataset_id}/tail")
+async def tail_live_dataset(
+    websocket: WebSocket,
+    dataset_id: int,
+    channels: Optional[str] = None,
+    points: Annotated[int, Query(ge=1, le=100_000)] = live_tail.LIVE_TAIL_POINTS,
+):
+    """
+    Watch a live dataset: the frames of /api/jobs/{job_id}/live (start / phase /
+    end text frames, decimated binary batches) for the rows boxes are streaming into
+    this server process. Phases: waiting, streaming, finished.
+    """
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    try:
+        await live_tail.serve_tail(
+            websocket, live_ingest.tail_key(dataset_id), selected, points,
+            status=lambda: live_ingest.stream_status(dataset_id),
+            start={"dataset_id": dataset_id},
+        )
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.post("/live/{dataset_id}/finish", status_code=202)
+def finish_live_dataset(dataset_id: int):
+    """
+    Stop accepting rows and post-process the dataset like an upload
+    (pyramid, beats, parabolas, compression) in a background job.
+    Poll /api/jobs/{job_id}; later stream requests get 409.
+    """
+    ensure_live(dataset_id)
+    job = jobs.submit(
+        jobs.Job("live_finish", file_name=str(dataset_id)),
+        live_ingest.finish_live_dataset, dataset_id,
+    )
+    return {"job_id": job.id, "status_url": f"/api/jobs/{job.id}", "dataset_id": dataset_id}
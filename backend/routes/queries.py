@@ -0,0 +1,162 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from db import get_db
+from services.beats import heart_rate
+from services.columnar import parse_channels
+from services.ensemble import cached_ensemble_average
+from services.flights import flight_window
+from services.parabolas import list_parabolas, parabola_window
+from services.signals import parse_percentiles, signal_stats
+
+router = APIRouter()
+
+@router.get("/datasets/{dataset_id}/stats")
+def get_signal_stats(
+    dataset_id: int,
+    channels: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    percentiles: Optional[str] = None,
+    parabola: Optional[int] = None,
+    conn=Depends(get_db),
+):
+    """
+    Per-channel summary statistics: count, mean, std, min, max, RMS and percentiles.
+    Example: /api/datasets/1/stats?channels=ecg,az_alpha&start=0&end=60000000&percentiles=5,50,95
+    start/end are in microseconds (end exclusive); omit both for the whole
+    recording, whose results are memoized since signals never change after ingest.
+    parabola=N limits the window to parabola N.
+    """
+    try:
+        selected = parse_channels(channels)
+        fractions = parse_percentiles(percentiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    cursor = conn.cursor()
+    if parabola is not None:
+        start, end = parabola_window(cursor, dataset_id, parabola, start, end)
+    stats = signal_stats(cursor, dataset_id, selected, start, end, fractions)
+    cursor.close()
+
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return stats
+
+
+@router.get("/datasets/{dataset_id}/beats")
+def get_beats(
+    dataset_id: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    parabola: Optional[int] = None,
+    conn=Depends(get_db),
+):
+    """
+    R-peak times detected on the ecg channel at ingest, with RR intervals and heart rate.
+    Example: /api/datasets/1/beats?start=0&end=60000000
+    start/end are in microseconds (end exclusive); each range is an index seek on beats.
+    parabola=N limits the window to parabola N.
+    """
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+    if cursor.fetchone() is None:
+        cursor.close()
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if parabola is not None:
+        start, end = parabola_window(cursor, dataset_id, parabola, start, end)
+
+    result = heart_rate(cursor, dataset_id, start, end)
+    cursor.close()
+    return result
+
+
+@router.get("/datasets/{dataset_id}/ensemble")
+def get_ensemble(
+    dataset_id: int,
+    channels: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pre_ms: Annotated[float, Query(ge=0, le=2000)] = 200,
+    post_ms: Annotated[float, Query(gt=0, le=3000)] = 600,
+    parabola: Optional[int] = None,
+    conn=Depends(get_db),
+):
+    """
+    Beat-aligned SCG ensemble: every channel is cut from pre_ms before to post_ms
+    after each R peak in [start, end) and averaged across beats (mean and std per offset).
+    Example: /api/datasets/1/ensemble?channels=az_alpha,ax_alpha&pre_ms=200&post_ms=600
+    Results are cached per (dataset, channels, window, pre/post).
+    parabola=N limits the window to parabola N.
+    """
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    cursor = conn.cursor()
+    if parabola is not None:
+        start, end = parabola_window(cursor, dataset_id, parabola, start, end)
+    result, found = cached_ensemble_average(cursor, dataset_id, selected, start, end, pre_ms, post_ms)
+    cursor.close()
+
+    if not found:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if result is None:
+        raise HTTPException(status_code=404, detail="No usable beats in this window")
+    return result
+
+
+@router.get("/datasets/{dataset_id}/parabolas")
+def get_parabolas(dataset_id: int, conn=Depends(get_db)):
+    """
+    Parabolas found at ingest: start_time/end_time span pull-up to pull-out,
+    zero_g_start/zero_g_end the micro-gravity phase (microseconds, end exclusive).
+    Use parabola_no as `parabola=N` on the signal, stats, beats and ensemble endpoints.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+    if cursor.fetchone() is None:
+        cursor.close()
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    parabolas = list_parabolas(cursor, dataset_id)
+    cursor.close()
+    return {"dataset_id": dataset_id, "parabolas": parabolas}
+
+
+@router.get("/flights/{flight_code}/window")
+def get_flight_window(
+    flight_code: str,
+    start: int,
+    end: int,
+    channels: Optional[str] = None,
+    points: Annotated[int, Query(ge=2, le=20000)] = 2000,
+    align_parabola: Optional[int] = None,
+):
+    """
+    All datasets of one flight (every box / person) in one response, on a common time grid.
+    Example: /api/flights/F4/window?start=0&end=60000000&channels=az_alpha,ecg&points=2000
+    start/end are microseconds on the shared timebase (end exclusive). With
+    align_parabola=N, t = 0 is the zero-g start of parabola N in every recording.
+    Datasets are fetched concurrently over pooled connections.
+    """
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    result = flight_window(flight_code, selected, start, end, points, align_parabola)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No datasets for flight '{flight_code}'")
+    return result
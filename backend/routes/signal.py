@@ -0,0 +1,54 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from db import get_db
+from services.columnar import parse_channels
+from services.downsample import downsample, resolve_window
+from services.parabolas import parabola_window
+
+router = APIRouter()
+
+@router.get("/datasets/{dataset_id}/signal")
+def get_signal(
+    dataset_id: int,
+    channels: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    points: int = Query(2000, ge=2, le=20000),
+    parabola: Optional[int] = None,
+    conn=Depends(get_db),
+):
+    """
+    Downsampled series for plotting.
+    Example: /api/datasets/1/signal?channels=ecg,az_alpha&start=0&end=60000000&points=2000
+    start/end are in microseconds (same unit as signals.time, end exclusive);
+    omit them to get the whole recording.
+    parabola=N limits the window to parabola N (see /api/datasets/{id}/parabolas).
+    """
+    try:
+        selected = parse_channels(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cursor = conn.cursor()
+    if parabola is not None:
+        start, end = parabola_window(cursor, dataset_id, parabola, start, end)
+    start, end = resolve_window(cursor, dataset_id, start, end)
+    if start is None:
+        cursor.close()
+        raise HTTPException(status_code=404, detail="Dataset not found or has no signals")
+    if end <= start:
+        cursor.close()
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    series = downsample(cursor, dataset_id, selected, start, end, points)
+    cursor.close()
+
+    return {
+        "dataset_id": dataset_id,
+        "start": start,
+        "end": end,
+        "points": points,
+        "parabola": parabola,
+        **series,
+    }
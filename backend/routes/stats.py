@@ -1,35 +1,21 @@
 from fastapi import APIRouter
-from db import get_connection
+from services import stats
 
 router = APIRouter()
+# Same endpoint with the cache miss awaited on the async pool (db_async); main.py picks one
+async_router = APIRouter()
 
 @router.get("/stats")
 def get_stats():
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM datasets")
-    datasets = cursor.fetchone()["count"]
-
-    cursor.execute("SELECT COUNT(*) FROM persons")
-    persons = cursor.fetchone()["count"]
-
-    cursor.execute("SELECT COUNT(*) FROM flights")
-    flights = cursor.fetchone()["count"]
-
-    cursor.execute("SELECT COUNT(*) FROM boxes")
-    boxes = cursor.fetchone()["count"]
-
-    #cursor.execute("SELECT COUNT(*) FROM parabolas")
-    parabolas = 0
-
-    cursor.close()
-    conn.close()
-
-    return {
-        "datasets": datasets,
-        "persons": persons,
-        "flights": flights,
-        "boxes": boxes,
-        "parabolas": parabolas
-    }
\ No newline at end of file
+    """
+    Counts for the upload page cards.
+    Served from an in-process cache (one query on a miss, no connection on a hit);
+    ingest and dev reset invalidate it.
+    """
+    return stats.get_stats()
+
+
+@async_router.get("/stats")
+async def get_stats_async():
+    """Counts for the upload page cards (see get_stats), a cache miss awaited on the async pool."""
+    return await stats.get_stats_async()
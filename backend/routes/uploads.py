@@ -1,46 +1,30 @@
 import os
-import shutil
 import time
 from io import BytesIO
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 
-from db import get_connection, file_exists
+from db import file_exists, get_pool
+from services import archive, chunked_upload, ensemble, jobs, signals, stats
+from services.bulk_import import BULK_IMPORT_DIR, BULK_IMPORT_MAX_WORKERS, BULK_IMPORT_WORKERS, run_bulk_import
+from services.csv_validation import CSV_VALIDATE, CsvValidationError, check_file_header
+from services.http_cache import rows_cache
+from services.ingest import run_ingest
 from services.parser import parse_filename
 
 router = APIRouter()
 
 
-# Where we temporarily store uploaded CSVs
-UPLOAD_DIRECTORY = "./uploads"
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+# Folder scanned by /bulk-import (uploads themselves are streamed, not saved)
+os.makedirs(BULK_IMPORT_DIR, exist_ok=True)
 
 
 # ============================================================
 # Helper Functions
 # ============================================================
 
-def save_temp_file(file: UploadFile) -> str:
-    """
-    Save the uploaded CSV to the local ./uploads folder.
-    Returns the full file path.
-    """
-    out_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
-    print(f"💾 [Temp Save] Saving file to {out_path} ...")
-
-    try:
-        with open(out_path, "wb+") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            print(f"✔ [Temp Save] File saved: {out_path}")
-    except Exception as e:
-        print(f"❌ [Temp Save] Error while saving: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
-    finally:
-        file.file.close()
-
-    return out_path
-
-
 def check_duplicate_or_raise(filename: str):
     """
     If the given filename already exists in the datasets table,
@@ -56,277 +40,194 @@ def check_duplicate_or_raise(filename: str):
     print(f"✅ [Duplicate Check] No duplicate found for: {filename}",flush=True)
 
 
-def insert_metadata_and_related(cursor, filename: str, metadata: dict) -> int:
-    print("🗂 [Dataset Insert] Inserting dataset row...")
-    """
-    Insert into datasets, and upsert into persons + flights.
-    Returns the new dataset_id.
+def validate_upload(filename: str) -> dict:
     """
-    # 1) Insert dataset row
-    sql_dataset = """
-        INSERT INTO datasets (
-            file_name,
-            file_date,
-            flight_code,
-            box_name,
-            box_color,
-            role,
-            person_name
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        RETURNING dataset_id;
+    Checks shared by every upload entry point.
+    Returns the metadata parsed from the filename or raises 400/409.
     """
-    
-    cursor.execute(
-        sql_dataset,
-        (
-            filename,
-            metadata.get("file_date"),
-            metadata.get("flight_code"),
-            metadata.get("box_name"),
-            metadata.get("box_color"),
-            metadata.get("role"),
-            metadata.get("person_name"),
-        ),
-    )
-    row = cursor.fetchone()
-    if not row:
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to create dataset entry in database."
-        )
-
-    dataset_id = row["dataset_id"]
-
-    # 2) Upsert into persons
-    person_name = metadata.get("person_name")
-    role = metadata.get("role")
-    if person_name:
-        cursor.execute(
-            """
-            INSERT INTO persons (person_name, role)
-            VALUES (%s, %s)
-            ON CONFLICT (person_name)
-            DO UPDATE SET role = EXCLUDED.role;
-            """,
-            (person_name, role),
-        )
-
-    # 3) Upsert into flights
-    flight_code = metadata.get("flight_code")
-    file_date = metadata.get("file_date")
-    if flight_code and file_date:
-        cursor.execute(
-            """
-            INSERT INTO flights (flight_code, flight_date)
-            VALUES (%s, %s)
-            ON CONFLICT (flight_code)
-            DO UPDATE SET flight_date = EXCLUDED.flight_date;
-            """,
-            (flight_code, file_date),
-        )
-#zaeem
-    box_name = metadata.get("box_name")
-    color = metadata.get("box_color")
-    if color and box_name:
-        cursor.execute(
-            """
-            INSERT INTO boxes (box_name, color)
-            VALUES (%s, %s)
-            ON CONFLICT (box_name,color)
-            DO NOTHING;
-            """,
-            (box_name,color),
-        )
-
-    return dataset_id
+    if not filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only .csv files are allowed.")
 
+    check_duplicate_or_raise(filename)
 
-def ingest_signals(cursor, dataset_id: int, csv_path: str) -> int:
-    print("🧹 [Staging] TRUNCATE signals_staging before COPY...")
-    """
-    Load the CSV from disk into signals_staging, then insert into signals table.
-    Returns the number of rows inserted into signals.
-    """
-    print(f"📤 [COPY] Copying CSV → signals_staging from {csv_path}...")
-    # A) Clear staging
-    cursor.execute("TRUNCATE TABLE signals_staging;")
-
-    # B) COPY from CSV into staging
-    with open(csv_path, "r") as f:
-        cursor.copy_expert(
-            "COPY signals_staging FROM STDIN WITH (FORMAT CSV, HEADER TRUE)", f
-        )
-    print(f"📥 [Insert Signals] Moving rows to signals for dataset_id={dataset_id}...")
-    # C) Move from staging -> signals hypertable
-    sql_transfer = """
-        INSERT INTO signals (
-            dataset_id, time, header,
-            ax_alpha, ax_beta, ax_gamma,
-            ay_alpha, ay_beta, ay_gamma,
-            az_alpha, az_beta, az_gamma,
-            gx_alpha, gx_beta, gx_gamma,
-            gy_alpha, gy_beta, gy_gamma,
-            gz_alpha, gz_beta, gz_gamma,
-            ecg, frame_separator
+    metadata = parse_filename(filename)
+    if "file_name_error" in metadata:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Filename parse error: {metadata['file_name_error']}",
         )
-        SELECT
-            %s AS dataset_id,
-            CAST(time * 1000000 AS BIGINT) AS time, -- seconds -> microseconds
-            header,
-            ax_alpha, ax_beta, ax_gamma,
-            ay_alpha, ay_beta, ay_gamma,
-            az_alpha, az_beta, az_gamma,
-            gx_alpha, gx_beta, gx_gamma,
-            gy_alpha, gy_beta, gy_gamma,
-            gz_alpha, gz_beta, gz_gamma,
-            ecg,
-            frame_seperator  -- CSV typo -> DB column
-        FROM signals_staging;
-    """
-    cursor.execute(sql_transfer, (dataset_id,))
-    row_count = cursor.rowcount
+    return metadata
 
-    # D) Cleanup staging
-    cursor.execute("TRUNCATE TABLE signals_staging;")
 
-    return row_count
+def run_upload_job(source, filename: str, metadata: dict, job) -> dict:
+    """Background body of /upload-csv: ingest, then release the spooled upload."""
+    try:
+        result = run_ingest(source, filename, metadata, job=job)
+    finally:
+        source.close()
+    return {
+        "message": "Dataset and signals uploaded successfully.",
+        "file_name": filename,
+        "metadata": metadata,
+        "duration_seconds": round(time.time() - job.started_at, 2),
+        **result,
+    }
 
 
 # ============================================================
 # MAIN ALL-IN-ONE ENDPOINT
 # ============================================================
 
-@router.post("/upload-csv")
+@router.post("/upload-csv", status_code=202)
 async def upload_csv(file: UploadFile = File(...)):
     print("🔥🔥🔥 upload_csv() STARTED — CODE IS RUNNING FROM THIS FILE 🔥🔥🔥")
     """
-    ALL-IN-ONE PIPELINE (Disk-based, stable):
+    ALL-IN-ONE PIPELINE (streaming, background):
 
     1) Check duplicate filename in datasets.
-    2) Save CSV to ./uploads.
-    3) Parse metadata from filename.
-    4) In ONE DB transaction:
-        - insert into datasets, persons, flights
-        - load CSV into signals_staging via COPY
-        - insert from staging into signals hypertable
-    5) Return dataset_id, metadata, row counts, and duration.
+    2) Parse metadata from filename and check the CSV header.
+    3) Queue a background job that, in one DB transaction:
+        - inserts into datasets, persons, flights
+        - streams the CSV into signals via COPY (no temp file, no staging table)
+        - stores the row count + builds the downsampling pyramid
+    4) Return the job id right away; poll /api/jobs/{job_id} for progress
+       and the final dataset_id / row counts, or cancel it there.
     """
 
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Only .csv files are allowed.")
-
-    # 1) Check duplicates early
-    check_duplicate_or_raise(file.filename)
+    # 1) + 2) Extension, duplicate and filename checks
+    metadata = await run_in_threadpool(validate_upload, file.filename)
 
-    # 2) Save file temporarily
-    start_time = time.time()
-    csv_path = save_temp_file(file)
-
-    # 3) Parse filename → metadata
-    metadata = parse_filename(file.filename)
-    if "file_name_error" in metadata:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Filename parse error: {metadata['file_name_error']}",
-        )
-
-    conn = get_connection()
-    try:
-        conn.autocommit = False  # manual transaction
-        with conn.cursor() as cursor:
-            # 4A) Insert into datasets + persons + flights
-            dataset_id = insert_metadata_and_related(
-                cursor=cursor,
-                filename=file.filename,
-                metadata=metadata,
-            )
-
-            # 4B) Ingest signals from CSV into TimescaleDB
-            rows_inserted = ingest_signals(
-                cursor=cursor,
-                dataset_id=dataset_id,
-                csv_path=csv_path,
-            )
-
-        conn.commit()
-    except HTTPException:
-        conn.rollback()
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
-    finally:
-        conn.close()
-        # Optional: delete CSV to save disk space
-        # try:
-        #     os.remove(csv_path)
-        # except OSError:
-        #     pass
-
-    duration = round(time.time() - start_time, 2)
+    # 3) Take ownership of the spooled upload so it outlives this request
+    #    (FastAPI closes UploadFile.file once the response is sent).
+    source, file.file = file.file, BytesIO()
+    source.seek(0)
+    if CSV_VALIDATE:
+        # A wrong header fails here instead of in the job; the rows are checked during the COPY
+        try:
+            await run_in_threadpool(check_file_header, source)
+        except CsvValidationError as e:
+            source.close()
+            raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    job = jobs.submit(
+        jobs.Job("upload", file_name=file.filename, bytes_total=file.size),
+        run_upload_job, source, file.filename, metadata,
+    )
 
     return {
-        "message": "Dataset and signals uploaded successfully.",
-        "dataset_id": dataset_id,
+        "message": "Upload accepted; ingest running in background.",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
         "file_name": file.filename,
         "metadata": metadata,
-        "rows_inserted": rows_inserted,
-        "duration_seconds": duration,
-        "temp_path": csv_path,  # for debugging; can remove later
     }
 
 
 # ============================================================
-# DEV ENDPOINT: auto-upload all CSVs from ./uploads
+# RESUMABLE CHUNKED UPLOADS: init → PUT parts → finalize
 # ============================================================
 
-@router.get("/dev/upload-sample")
-async def dev_upload_sample():
+@router.post("/uploads", status_code=201)
+def init_upload(file_name: str, total_size: Optional[int] = None):
     """
-    DEV:
-    - Scan ./uploads for .csv files
-    - Skip files already in datasets
-    - For each new file, call the same /upload-csv logic.
+    Start a resumable upload. The ingest COPY starts right away and consumes
+    parts as they arrive. Send parts in order with
+    PUT /uploads/{upload_id}/parts/{n} (raw bytes, n = 1, 2, ...).
+    Any part can be re-sent; GET /uploads/{upload_id} gives `next_part` to resume from.
+    503 (Retry-After) while UPLOAD_SESSIONS uploads are already open.
     """
-    if not os.path.exists(UPLOAD_DIRECTORY):
-        return {"error": "Uploads folder does not exist"}
+    metadata = validate_upload(file_name)
+    session = chunked_upload.create_session(file_name, metadata, total_size)
+    return session.status()
 
-    files = [f for f in os.listdir(UPLOAD_DIRECTORY) if f.lower().endswith(".csv")]
 
-    if not files:
-        return {"message": "No CSV files found in uploads folder"}
+@router.put("/uploads/{upload_id}/parts/{part_number}")
+async def put_upload_part(upload_id: str, part_number: int, request: Request):
+    session = chunked_upload.get_session(upload_id)
+    data = await read_part(request)
+    return await run_in_threadpool(session.append, part_number, data)
 
-    uploaded = []
-    skipped = []
 
-    for file_name in files:
-        file_path = os.path.join(UPLOAD_DIRECTORY, file_name)
+async def read_part(request: Request) -> bytes:
+    """The request body, refused (413) as soon as it is known to exceed MAX_PART_BYTES."""
+    too_large = HTTPException(status_code=413, detail=f"Part larger than {chunked_upload.MAX_PART_BYTES} bytes")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > chunked_upload.MAX_PART_BYTES:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > chunked_upload.MAX_PART_BYTES:
+            raise too_large  # chunked body without Content-Length: stop reading here
+        chunks.append(chunk)
+    return b"".join(chunks)
 
-        if file_exists(file_name):
-            skipped.append(f"{file_name} (already exists in DB)")
-            continue
 
-        try:
-            with open(file_path, "rb") as f:
-                data = f.read()
+@router.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    return chunked_upload.get_session(upload_id).status()
 
-            upload = UploadFile(
-                filename=file_name,
-                file=BytesIO(data),
-            )
 
-            result = await upload_csv(upload)
-            uploaded.append(result)
-        except Exception as e:
-            skipped.append(f"{file_name} (error: {str(e)})")
+@router.post("/uploads/{upload_id}/finalize")
+def finalize_upload(upload_id: str, wait_seconds: float = 120):
+    """
+    End the stream and commit the datasets row. Only the tail of the COPY,
+    the pyramid and the commit are left at this point, so this is quick.
+    If it takes longer than wait_seconds, `job.phase` is not yet "done";
+    poll /api/jobs/{upload_id} (or call finalize again).
+    """
+    session = chunked_upload.get_session(upload_id)
+    status = session.finalize(timeout=wait_seconds)
+    job = session.job
+    if job.phase == "failed":
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    if job.phase == "cancelled":
+        raise HTTPException(status_code=409, detail="Upload was cancelled")
+    return status
+
+
+@router.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str):
+    """Abort the upload; nothing of it is committed."""
+    session = chunked_upload.get_session(upload_id)
+    session.abort()
+    return session.status()
+
 
+# ============================================================
+# BULK IMPORT: ingest every new CSV in a server-side folder
+# ============================================================
+
+@router.post("/bulk-import", status_code=202)
+def bulk_import(workers: Annotated[int, Query(ge=1, le=BULK_IMPORT_MAX_WORKERS)] = BULK_IMPORT_WORKERS):
+    """
+    Import all new CSVs from BULK_IMPORT_DIR as a background job:
+    - duplicates are filtered with one set-based query
+    - files are ingested in parallel over a bounded process pool,
+      each worker with its own connection
+      (`workers` at most BULK_IMPORT_MAX_WORKERS, else 422)
+    Poll /api/jobs/{job_id}; the result lists per-file and total rows/s.
+    """
+    if not os.path.isdir(BULK_IMPORT_DIR):
+        raise HTTPException(status_code=404, detail=f"Folder does not exist: {BULK_IMPORT_DIR}")
+
+    job = jobs.submit(
+        jobs.Job("bulk_import", file_name=BULK_IMPORT_DIR),
+        run_bulk_import, BULK_IMPORT_DIR, workers,
+    )
     return {
-        "uploaded": uploaded,
-        "skipped": skipped,
-        "total_files": len(files),
+        "message": "Bulk import started.",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
     }
 
+
+@router.get("/dev/upload-sample")
+def dev_upload_sample():
+    """
+    DEV: same as POST /bulk-import, kept for the old bookmark.
+    """
+    return bulk_import()
+
 @router.post("/dev/reset-db")
 def dev_reset_db():
     """
@@ -338,15 +239,24 @@ def dev_reset_db():
     print("🧹 DEV RESET STARTED — Clearing tables")
     print("======================================\n")
 
-    conn = get_connection()
+    db_pool = get_pool()
+    conn = db_pool.getconn()
 
     try:
         conn.autocommit = False
         with conn.cursor() as cursor:
 
-            print("→ TRUNCATE signals_staging ...")
-            cursor.execute("TRUNCATE TABLE signals_staging;")
-            print("✔ signals_staging cleared\n")
+            print("→ TRUNCATE parabolas ...")
+            cursor.execute("TRUNCATE TABLE parabolas;")
+            print("✔ parabolas cleared\n")
+
+            print("→ TRUNCATE beats ...")
+            cursor.execute("TRUNCATE TABLE beats;")
+            print("✔ beats cleared\n")
+
+            print("→ TRUNCATE signal_pyramid ...")
+            cursor.execute("TRUNCATE TABLE signal_pyramid;")
+            print("✔ signal_pyramid cleared\n")
 
             print("→ TRUNCATE signals (CASCADE) ...")
             cursor.execute("TRUNCATE TABLE signals CASCADE;")
@@ -369,7 +279,12 @@ def dev_reset_db():
             print("✔ boxes cleared\n")
 
         conn.commit()
+        stats.invalidate()
+        rows_cache.clear()
+        signals.clear_memo()
+        ensemble.clear_cache()
         print("💾 Transaction committed successfully!")
+        print(f"✔ {archive.remove_all()} archive file(s) removed\n")
         print("✅ DEV RESET COMPLETED ✔\n")
 
         return {
@@ -383,5 +298,5 @@ def dev_reset_db():
         raise HTTPException(status_code=500, detail=f"Reset failed: {e}")
 
     finally:
-        conn.close()
-        print("🔌 DB connection closed.")
+        db_pool.putconn(conn)
+        print("🔌 DB connection returned to pool.")
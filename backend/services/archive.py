@@ -0,0 +1,228 @@
+"""
+Archive tier: cold datasets kept as local Parquet files instead of hypertable chunks.
+
+services/export.archive_dataset() writes a dataset's signals to
+ARCHIVE_DIR/<dataset_id>.parquet and drops its chunks. From then on raw reads
+(columnar.fetch_columns, the JSON row pages, window bounds, bucket fallbacks and
+stats) are answered from the memory-mapped file. Rows are sorted by time and split
+into row groups with min/max time statistics, so a window only decodes the row groups
+that overlap it. Pyramid, beats and parabolas stay in PostgreSQL.
+"""
+import functools
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Archive files kept open (memory-mapped) between requests
+ARCHIVE_OPEN_FILES = int(os.getenv("ARCHIVE_OPEN_FILES", "32"))
+
+
+def archive_path(dataset_id: int) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{dataset_id}.parquet")
+
+
+def is_archived(dataset_id: int) -> bool:
+    return os.path.exists(archive_path(dataset_id))
+
+
+class ArchiveFile:
+    """One memory-mapped archive with the time range of every row group."""
+
+    def __init__(self, path: str):
+        self.parquet = pq.ParquetFile(pa.memory_map(path, "r"))
+        self.schema = self.parquet.schema_arrow
+        metadata = self.parquet.metadata
+        time_index = self.schema.get_field_index("time")
+        groups = [metadata.row_group(i).column(time_index).statistics for i in range(metadata.num_row_groups)]
+        self.first = np.array([g.min for g in groups], dtype=np.int64)
+        self.last = np.array([g.max for g in groups], dtype=np.int64)
+        self._lock = threading.Lock()  # one decoder per file at a time
+
+    def read_row_group(self, index: int, columns: list) -> pa.Table:
+        with self._lock:
+            return self.parquet.read_row_group(index, columns=columns)
+
+
+@functools.lru_cache(maxsize=ARCHIVE_OPEN_FILES)
+def _open(path: str, mtime_ns: int) -> ArchiveFile:
+    # mtime in the key: a rewritten file (dev reset reuses ids) is opened afresh
+    return ArchiveFile(path)
+
+
+def open_archive(dataset_id: int) -> ArchiveFile:
+    path = archive_path(dataset_id)
+    return _open(path, os.stat(path).st_mtime_ns)
+
+
+def clear_cache():
+    """Close cached memory maps (dev reset deletes the files)."""
+    _open.cache_clear()
+
+
+def remove_all() -> int:
+    """Delete every archive file (dev reset restarts dataset ids). Returns how many were removed."""
+    clear_cache()
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+    names = [name for name in os.listdir(ARCHIVE_DIR) if name.endswith(".parquet")]
+    for name in names:
+        os.remove(os.path.join(ARCHIVE_DIR, name))
+    return len(names)
+
+
+def time_span(dataset_id: int):
+    """(first, last) sample time of an archived dataset from row-group statistics."""
+    archive = open_archive(dataset_id)
+    if len(archive.first) == 0:
+        return None, None
+    return int(archive.first.min()), int(archive.last.max())
+
+
+def iter_row_groups(
+    dataset_id: int,
+    columns: list,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+):
+    """
+    Yield time + `columns` for [start, end) / time > after_time, one row group
+    (trimmed to the window) at a time. Row groups outside the window are never decoded.
+    """
+    archive = open_archive(dataset_id)
+    names = ["time"] + [name for name in columns if name != "time"]
+    low = start
+    if after_time is not None:
+        low = after_time + 1 if low is None else max(low, after_time + 1)
+
+    overlapping = np.ones(len(archive.first), dtype=bool)
+    if low is not None:
+        overlapping &= archive.last >= low
+    if end is not None:
+        overlapping &= archive.first < end
+
+    for index in np.flatnonzero(overlapping).tolist():
+        table = archive.read_row_group(index, names)
+        times = table.column("time").to_numpy()
+        first = 0 if low is None else int(np.searchsorted(times, low, side="left"))
+        stop = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+        if stop > first:
+            yield table.slice(first, stop - first)
+
+
+def read_table(
+    dataset_id: int,
+    columns: list,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> pa.Table:
+    """
+    iter_row_groups() with LIMIT/OFFSET semantics, as one table ordered by time.
+    Reading stops as soon as offset + limit rows are collected.
+    """
+    wanted = None if limit is None else offset + limit
+    pieces, collected = [], 0
+    for table in iter_row_groups(dataset_id, columns, start, end, after_time):
+        pieces.append(table)
+        collected += table.num_rows
+        if wanted is not None and collected >= wanted:
+            break
+
+    if not pieces:
+        schema = open_archive(dataset_id).schema
+        names = ["time"] + [name for name in columns if name != "time"]
+        return pa.schema([schema.field(name) for name in names]).empty_table()
+    return pa.concat_tables(pieces).slice(offset, limit)
+
+
+def read_columns(
+    dataset_id: int,
+    channels: list,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> dict:
+    """Same result as columnar.fetch_columns() (int64 time, float64 channels, NULL as NaN)."""
+    table = read_table(dataset_id, channels, start, end, after_time, limit, offset)
+    columns = {"time": table.column("time").to_numpy().astype(np.int64, copy=False)}
+    for name in channels:
+        columns[name] = table.column(name).to_numpy().astype(np.float64, copy=False)
+    return columns
+
+
+def bucket_aggregates(dataset_id: int, channels: list, start: int, end: int, width: int, aggregates: list) -> dict:
+    """
+    time_bucket(width, time, start % width) + MIN / MAX / AVG over an archived window,
+    same layout as the SQL versions: {"time": bucket starts, "<channel>_<agg>": ...},
+    one entry per non-empty bucket, NaN where a bucket has no value.
+    """
+    columns = read_columns(dataset_id, channels, start, end)
+    times = columns["time"]
+    origin = start % width
+    buckets = (times - origin) // width * width + origin
+    # Index of the first sample of every non-empty bucket (times are sorted)
+    firsts = np.flatnonzero(np.diff(buckets, prepend=buckets[:1] - 1))
+    result = {"time": buckets[firsts]}
+    for name in channels:
+        values = columns[name]
+        valid = ~np.isnan(values)
+        for aggregate in aggregates:
+            key = f"{name}_{aggregate}"
+            if len(firsts) == 0:
+                result[key] = np.array([], dtype=np.float64)
+            elif aggregate == "min":
+                result[key] = np.fmin.reduceat(values, firsts)
+            elif aggregate == "max":
+                result[key] = np.fmax.reduceat(values, firsts)
+            else:
+                counts = np.add.reduceat(valid.astype(np.int64), firsts)
+                sums = np.add.reduceat(np.where(valid, values, 0.0), firsts)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    result[key] = np.where(counts > 0, sums / counts, np.nan)
+    return result
+
+
+def channel_stats(dataset_id: int, channels: list, start: Optional[int], end: Optional[int], percentiles: list) -> dict:
+    """
+    signals.compute_channel_stats() for an archived dataset, one channel in memory
+    at a time. Percentiles interpolate linearly, like PERCENTILE_CONT.
+    """
+    times = read_columns(dataset_id, [], start, end)["time"]
+    result = {}
+    for name in channels:
+        values = read_columns(dataset_id, [name], start, end)[name]
+        values = values[~np.isnan(values)]
+        count = len(values)
+        if count == 0:
+            result[name] = {
+                "count": 0, "mean": None, "std": None, "min": None, "max": None, "rms": None,
+                "percentiles": {f"p{p:g}": None for p in percentiles},
+            }
+            continue
+        result[name] = {
+            "count": count,
+            "mean": float(values.mean()),
+            "std": float(values.std(ddof=1)) if count > 1 else None,
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "rms": float(np.sqrt(np.mean(values * values))),
+            "percentiles": {
+                f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))
+            },
+        }
+    return {
+        "samples": len(times),
+        "first_time": int(times[0]) if len(times) else None,
+        "last_time": int(times[-1]) if len(times) else None,
+        "channels": result,
+    }
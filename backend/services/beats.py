@@ -0,0 +1,209 @@
+"""
+R-peak (heartbeat) detection on the ecg channel.
+
+Runs as an ingest stage (services/ingest.run_ingest) and can be re-run for
+datasets ingested earlier:
+
+    python -m services.beats 3 7 12     # specific datasets
+    python -m services.beats --all      # every dataset
+"""
+import argparse
+import io
+import os
+from typing import Optional
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import butter, find_peaks, sosfiltfilt
+
+from services.columnar import iter_column_batches
+
+# Rows of ecg read per detection window (keyset batches over the hypertable)
+BEAT_WINDOW_ROWS = int(os.getenv("BEAT_WINDOW_ROWS", "200000"))
+# Samples shared by consecutive windows so filter edges and boundary beats are handled
+BEAT_OVERLAP_SECONDS = 2.0
+
+QRS_BAND_HZ = (5.0, 20.0)        # passes the QRS complex, drops baseline wander and T waves
+INTEGRATION_SECONDS = 0.15       # moving-window integration length (one QRS)
+REFRACTORY_SECONDS = 0.25        # no two beats closer than this (= 240 bpm)
+REFINE_SECONDS = 0.075           # R peak searched this far around the energy peak
+MIN_SAMPLE_RATE_HZ = 2.5 * QRS_BAND_HZ[1]
+
+
+def estimate_sample_rate(times_us: np.ndarray) -> Optional[float]:
+    """Sampling rate from the median spacing of the time column (microseconds)."""
+    if len(times_us) < 2:
+        return None
+    step = np.median(np.diff(times_us))
+    return 1_000_000 / step if step > 0 else None
+
+
+def detect_r_peaks(ecg: np.ndarray, fs: float) -> np.ndarray:
+    """
+    Indices of R peaks in one window (Pan-Tompkins style, fully vectorized):
+    band-pass → derivative² → moving-window integration → peak picking with a
+    refractory distance and an amplitude threshold relative to the window,
+    then each peak is moved to the ecg maximum within ±REFINE_SECONDS.
+    """
+    valid = ~np.isnan(ecg)
+    if valid.sum() < 2 * fs:
+        return np.empty(0, dtype=np.int64)
+    if not valid.all():
+        # Gaps (NULL samples) are bridged linearly so the filters stay stable
+        positions = np.arange(len(ecg))
+        ecg = np.interp(positions, positions[valid], ecg[valid])
+
+    sos = butter(3, QRS_BAND_HZ, btype="bandpass", fs=fs, output="sos")
+    filtered = sosfiltfilt(sos, ecg)
+    energy = np.gradient(filtered) ** 2
+    integrated = uniform_filter1d(energy, size=max(1, int(INTEGRATION_SECONDS * fs)))
+
+    # Robust threshold: a fraction of the strong (99th percentile) QRS energy
+    threshold = 0.3 * np.percentile(integrated, 99)
+    if threshold <= 0:
+        return np.empty(0, dtype=np.int64)
+    peaks, _ = find_peaks(integrated, height=threshold, distance=max(1, int(REFRACTORY_SECONDS * fs)))
+    if len(peaks) == 0:
+        return peaks.astype(np.int64)
+
+    # Refine on the raw signal: argmax over a (peaks x window) index matrix
+    half = max(1, int(REFINE_SECONDS * fs))
+    offsets = np.arange(-half, half + 1)
+    index = np.clip(peaks[:, None] + offsets[None, :], 0, len(ecg) - 1)
+    refined = index[np.arange(len(peaks)), np.argmax(ecg[index], axis=1)]
+    return np.unique(refined)
+
+
+def detect_beats(cursor, dataset_id: int, window_rows: int = BEAT_WINDOW_ROWS) -> np.ndarray:
+    """
+    Stream the ecg column in fixed-size windows and return R-peak times (µs).
+
+    Each window is the new batch prefixed with the last BEAT_OVERLAP_SECONDS of
+    the previous one. A window only keeps peaks up to half an overlap before
+    its end; the rest are found again (with full context) by the next window,
+    so boundary beats are neither lost nor counted twice.
+    """
+    beats = []
+    pending = np.empty(0, dtype=np.int64)
+    carry_time = np.empty(0, dtype=np.int64)
+    carry_ecg = np.empty(0, dtype=np.float64)
+    fs = None
+
+    for batch in iter_column_batches(cursor, dataset_id, ["ecg"], batch_rows=window_rows):
+        times = np.concatenate([carry_time, batch["time"]])
+        ecg = np.concatenate([carry_ecg, batch["ecg"]])
+        if fs is None:
+            fs = estimate_sample_rate(times)
+            if fs is None or fs < MIN_SAMPLE_RATE_HZ:
+                print(f"⚠️ [Beats] dataset_id={dataset_id}: sample rate {fs} Hz too low, skipped")
+                return np.empty(0, dtype=np.int64)
+
+        overlap = max(2, int(BEAT_OVERLAP_SECONDS * fs))
+        cut = len(times) - overlap // 2
+        # The first half of the overlap was already decided by the previous window
+        start = len(carry_time) - overlap // 2 if len(carry_time) else 0
+
+        peaks = detect_r_peaks(ecg, fs)
+        beats.append(times[peaks[(peaks >= start) & (peaks < cut)]])
+        pending = times[peaks[peaks >= cut]]
+
+        carry_time, carry_ecg = times[-overlap:], ecg[-overlap:]
+
+    # The last window has no successor: its tail peaks are final
+    beats.append(pending)
+    times = np.concatenate(beats)
+    if len(times) < 2:
+        return times
+    # A beat right on a window boundary may still be refined to neighbouring samples twice
+    keep = np.concatenate([[True], np.diff(times) >= REFRACTORY_SECONDS * 1_000_000])
+    return times[keep]
+
+
+def store_beats(cursor, dataset_id: int, beat_times: np.ndarray) -> int:
+    """Replace the dataset's beats with `beat_times` (one COPY)."""
+    cursor.execute("DELETE FROM beats WHERE dataset_id = %s;", (dataset_id,))
+    if len(beat_times) == 0:
+        return 0
+    buffer = io.StringIO()
+    np.savetxt(
+        buffer,
+        np.column_stack([np.full(len(beat_times), dataset_id, dtype=np.int64), beat_times]),
+        fmt="%d",
+        delimiter=",",
+    )
+    buffer.seek(0)
+    cursor.copy_expert("COPY beats (dataset_id, time) FROM STDIN WITH (FORMAT CSV)", buffer)
+    return len(beat_times)
+
+
+def run_beat_detection(cursor, dataset_id: int) -> int:
+    """Detect and persist beats for one dataset (inside the caller's transaction)."""
+    print(f"💓 [Beats] Detecting R peaks for dataset_id={dataset_id}...")
+    count = store_beats(cursor, dataset_id, detect_beats(cursor, dataset_id))
+    print(f"✔ [Beats] {count} beats stored")
+    return count
+
+
+def heart_rate(cursor, dataset_id: int, start: Optional[int] = None, end: Optional[int] = None) -> dict:
+    """
+    Beat times in [start, end) with RR intervals and instantaneous heart rate.
+    The beat just before `start` is included in the query so the first RR is known.
+    """
+    cursor.execute("""
+        (SELECT time FROM beats
+         WHERE dataset_id = %(dataset_id)s AND %(start)s::bigint IS NOT NULL AND time < %(start)s
+         ORDER BY time DESC LIMIT 1)
+        UNION ALL
+        (SELECT time FROM beats
+         WHERE dataset_id = %(dataset_id)s
+           AND (%(start)s::bigint IS NULL OR time >= %(start)s)
+           AND (%(end)s::bigint IS NULL OR time < %(end)s)
+         ORDER BY time)
+        ORDER BY time;
+    """, {"dataset_id": dataset_id, "start": start, "end": end})
+    times = np.array([row["time"] for row in cursor.fetchall()], dtype=np.int64)
+
+    rr = np.diff(times)
+    has_previous = start is not None and len(times) > 0 and times[0] < start
+    if has_previous:
+        times = times[1:]
+    else:
+        rr = np.concatenate([[0], rr]) if len(times) else rr
+
+    bpm = np.where(rr > 0, 60_000_000 / np.maximum(rr, 1), np.nan)
+
+    return {
+        "dataset_id": dataset_id,
+        "start": start,
+        "end": end,
+        "beats": int(len(times)),
+        "time": times.tolist(),
+        "rr_ms": [None if v == 0 else v / 1000 for v in rr.tolist()],
+        "heart_rate_bpm": [None if v != v else round(v, 2) for v in bpm.tolist()],
+        "mean_heart_rate_bpm": round(float(np.nanmean(bpm)), 2) if np.isfinite(bpm).any() else None,
+    }
+
+
+def main():
+    from db import close_pool, pooled_connection
+
+    parser = argparse.ArgumentParser(description="(Re)detect R peaks for already ingested datasets.")
+    parser.add_argument("dataset_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            if args.all:
+                cursor.execute("SELECT dataset_id FROM datasets ORDER BY dataset_id;")
+                dataset_ids = [row["dataset_id"] for row in cursor.fetchall()]
+            else:
+                dataset_ids = args.dataset_ids
+            for dataset_id in dataset_ids:
+                run_beat_detection(cursor, dataset_id)
+                conn.commit()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Bulk import of a folder of recorder CSVs (e.g. re-importing a whole campaign).
+
+    python -m services.bulk_import ./uploads --workers 4
+
+Also exposed as a background job through POST /api/bulk-import.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import db
+from services import stats
+from services.ingest import run_ingest
+from services.parser import parse_filename
+
+BULK_IMPORT_DIR = os.getenv("BULK_IMPORT_DIR", "./uploads")
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Upper bound for any requested worker count (each worker process holds its own DB connection)
+BULK_IMPORT_MAX_WORKERS = int(os.getenv("BULK_IMPORT_MAX_WORKERS", str(max(BULK_IMPORT_WORKERS, os.cpu_count() or 1))))
+
+
+def find_new_files(directory: str):
+    """
+    List .csv files in `directory` and split them into (new paths, already imported names)
+    with a single set-based lookup against datasets.
+    """
+    names = sorted(f for f in os.listdir(directory) if f.lower().endswith(".csv"))
+    existing = db.existing_file_names(names)
+    new_paths = [os.path.join(directory, name) for name in names if name not in existing]
+    return new_paths, sorted(existing)
+
+
+def _init_worker():
+    # Each worker process ingests one file at a time, so one connection is enough
+    db.DB_POOL_MIN = 1
+    db.DB_POOL_MAX = 1
+
+
+def import_file(path: str) -> dict:
+    """Ingest one CSV from disk (runs inside a worker process)."""
+    file_name = os.path.basename(path)
+    started = time.perf_counter()
+    metadata = parse_filename(file_name)
+    if "file_name_error" in metadata:
+        return {"file_name": file_name, "error": f"Filename parse error: {metadata['file_name_error']}"}
+
+    try:
+        with open(path, "rb") as source:
+            result = run_ingest(source, file_name, metadata)
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        return {"file_name": file_name, "error": detail}
+
+    seconds = time.perf_counter() - started
+    return {
+        "file_name": file_name,
+        "dataset_id": result["dataset_id"],
+        "rows_inserted": result["rows_inserted"],
+        "bytes_read": result["bytes_read"],
+        "seconds": round(seconds, 2),
+        "rows_per_s": round(result["rows_inserted"] / seconds) if seconds > 0 else 0,
+        "throughput_mb_s": result["throughput_mb_s"],
+    }
+
+
+def run_bulk_import(directory: str = BULK_IMPORT_DIR, workers: int = BULK_IMPORT_WORKERS, job=None) -> dict:
+    """
+    Import every new CSV in `directory` in parallel over a bounded process pool
+    (`workers` is clamped to 1..BULK_IMPORT_MAX_WORKERS).
+    With a background `job`, progress is reported per finished file; cancelling
+    stops queued files while the ones already running finish and commit.
+    """
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"Folder does not exist: {directory}")
+    workers = max(1, min(workers, BULK_IMPORT_MAX_WORKERS))
+
+    paths, skipped = find_new_files(directory)
+    if job is not None:
+        job.bytes_total = sum(os.path.getsize(p) for p in paths)
+        job.set_phase("importing")
+    print(f"📦 [Bulk Import] {len(paths)} new file(s), {len(skipped)} already imported, {workers} worker(s)")
+
+    imported, failed = [], []
+    bytes_done = rows_done = 0
+    started = time.perf_counter()
+
+    # spawn: workers must not inherit the parent's open pool sockets
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = {pool.submit(import_file, path) for path in paths}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry = future.result()
+                    if "error" in entry:
+                        failed.append(entry)
+                        print(f"❌ [Bulk Import] {entry['file_name']}: {entry['error']}")
+                        continue
+                    imported.append(entry)
+                    # The commit happened in a worker process; refresh this process's cache
+                    stats.invalidate()
+                    bytes_done += entry["bytes_read"]
+                    rows_done += entry["rows_inserted"]
+                    print(f"✔ [Bulk Import] {entry['file_name']}: {entry['rows_inserted']} rows, {entry['rows_per_s']} rows/s")
+                if job is not None:
+                    job.update(bytes_done, rows_done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    seconds = time.perf_counter() - started
+    return {
+        "directory": directory,
+        "imported": imported,
+        "failed": failed,
+        "skipped": skipped,
+        "total_files": len(paths) + len(skipped),
+        "total_rows": rows_done,
+        "seconds": round(seconds, 2),
+        "rows_per_s": round(rows_done / seconds) if seconds > 0 else 0,
+        "throughput_mb_s": round(bytes_done / 1_000_000 / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import every new CSV in a folder in parallel.")
+    parser.add_argument("directory", nargs="?", default=BULK_IMPORT_DIR)
+    parser.add_argument(
+        "--workers", type=int, default=BULK_IMPORT_WORKERS,
+        help=f"worker processes (at most BULK_IMPORT_MAX_WORKERS={BULK_IMPORT_MAX_WORKERS})",
+    )
+    args = parser.parse_args()
+
+    report = run_bulk_import(args.directory, args.workers)
+    print(
+        f"\n✅ Imported {len(report['imported'])} file(s), {len(report['failed'])} failed, "
+        f"{len(report['skipped'])} skipped — {report['total_rows']} rows in {report['seconds']}s "
+        f"({report['rows_per_s']} rows/s, {report['throughput_mb_s']} MB/s)"
+    )
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
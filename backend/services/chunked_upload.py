@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+from services import jobs
+from services.ingest import run_ingest
+
+# Largest single part accepted by PUT /uploads/{id}/parts/{n}
+MAX_PART_BYTES = int(os.getenv("UPLOAD_MAX_PART_BYTES", str(64 * 1024 * 1024)))
+# Parts buffered ahead of the COPY; a part request waits when the buffer is full
+PART_BUFFER = int(os.getenv("UPLOAD_PART_BUFFER", "4"))
+# Seconds a part request waits for buffer space before asking the client to retry
+PART_PUT_TIMEOUT = float(os.getenv("UPLOAD_PART_PUT_TIMEOUT", "60"))
+# An open upload with no new part for this long (counted from init) is rolled back
+UPLOAD_IDLE_TIMEOUT = float(os.getenv("UPLOAD_IDLE_TIMEOUT", "600"))
+# Open sessions at the same time. Each holds a worker thread, a pooled connection and a
+# transaction until finalized or idle, so they get their own pool instead of the
+# UPLOAD_WORKERS one; POST /uploads answers 503 while all of them are taken.
+UPLOAD_SESSIONS = int(os.getenv("UPLOAD_SESSIONS", "4"))
+
+_session_executor = jobs.make_executor(UPLOAD_SESSIONS, "upload-session")
+
+
+class PartStream:
+    """
+    Blocking file-like object fed part by part from HTTP requests.
+    The ingest COPY reads from it in a job thread while parts are still arriving.
+    """
+
+    def __init__(self, job, idle_timeout: float = UPLOAD_IDLE_TIMEOUT):
+        self.job = job
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=PART_BUFFER)
+        self._current = b""
+        self._pos = 0
+        self._eof = False
+        self.last_part_at = time.monotonic()  # idle clock starts at init, not when a worker picks it up
+
+    def put(self, data: bytes, timeout: float = PART_PUT_TIMEOUT):
+        self._queue.put(data, timeout=timeout)
+        self.last_part_at = time.monotonic()
+
+    def close(self, timeout: float = PART_PUT_TIMEOUT):
+        self._queue.put(None, timeout=timeout)
+
+    def read(self, size: int = -1) -> bytes:
+        while self._pos >= len(self._current):
+            if self._eof:
+                return b""
+            part = self._next_part()
+            if part is None:
+                self._eof = True
+                return b""
+            self._current, self._pos = part, 0
+        end = len(self._current) if size < 0 else min(len(self._current), self._pos + size)
+        chunk = self._current[self._pos:end]
+        self._pos = end
+        return chunk
+
+    def _next_part(self):
+        while True:
+            self.job.check_cancelled()
+            try:
+                return self._queue.get(timeout=1.0)
+            except queue.Empty:
+                if time.monotonic() - self.last_part_at > self.idle_timeout:
+                    raise TimeoutError(f"No part received for {self.idle_timeout:.0f}s")
+
+    def drain(self):
+        """Drop buffered parts (after a failure) so their memory is released."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class UploadSession:
+    """
+    One resumable upload: init → PUT parts 1..N in order → finalize.
+    Parts are appended to the ingest COPY as they arrive, so finalize only has
+    to end the COPY, build the pyramid and commit the datasets row.
+    Re-sending an already received part (same size) is acknowledged without
+    appending it again, so a client can retry any part whose response it lost.
+    """
+
+    def __init__(self, file_name: str, metadata: dict, total_size: Optional[int] = None):
+        self.file_name = file_name
+        self.metadata = metadata
+        self.part_sizes = {}
+        self.bytes_received = 0
+        self.finalizing = False
+        self._lock = threading.Lock()
+        self.job = jobs.Job("chunked_upload", file_name=file_name, bytes_total=total_size)
+        self.stream = PartStream(self.job)
+
+    @property
+    def upload_id(self) -> str:
+        return self.job.id
+
+    @property
+    def next_part(self) -> int:
+        return len(self.part_sizes) + 1
+
+    def start(self):
+        jobs.submit_to(_session_executor, self.job, _run_session, self)
+
+    def append(self, part_number: int, data: bytes) -> dict:
+        if len(data) > MAX_PART_BYTES:
+            raise HTTPException(status_code=413, detail=f"Part larger than {MAX_PART_BYTES} bytes")
+        with self._lock:
+            self._raise_if_closed()
+            if part_number in self.part_sizes:
+                if self.part_sizes[part_number] != len(data):
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Part {part_number} was already received with a different size",
+                    )
+                return self.status()  # retry of a part we already have
+            if part_number != self.next_part:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Expected part {self.next_part}, got {part_number}",
+                )
+            try:
+                self.stream.put(data)
+            except queue.Full:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Ingest is behind; retry this part shortly",
+                    headers={"Retry-After": "5"},
+                )
+            self.part_sizes[part_number] = len(data)
+            self.bytes_received += len(data)
+            return self.status()
+
+    def finalize(self, timeout: Optional[float] = None) -> dict:
+        """End the stream and wait (up to `timeout`) for the commit; poll the job if it is still running."""
+        with self._lock:
+            # A repeated finalize (lost response) just waits for / reports the same job
+            if not self.finalizing:
+                self._raise_if_closed()
+                try:
+                    self.stream.close()
+                except queue.Full:
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Ingest is behind; retry finalize shortly",
+                        headers={"Retry-After": "5"},
+                    )
+                self.finalizing = True
+        self.job.wait(timeout)
+        return self.status()
+
+    def abort(self):
+        self.job.cancel()
+        self.stream.drain()
+
+    def _raise_if_closed(self):
+        if self.finalizing:
+            raise HTTPException(status_code=409, detail="Upload is already being finalized")
+        if self.job.finished:
+            raise HTTPException(status_code=409, detail=f"Upload already {self.job.phase}: {self.job.error or ''}".strip())
+
+    def status(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "file_name": self.file_name,
+            "next_part": self.next_part,
+            "parts_received": len(self.part_sizes),
+            "bytes_received": self.bytes_received,
+            "finalizing": self.finalizing,
+            "job": self.job.to_dict(),
+        }
+
+
+def _run_session(session: UploadSession, job) -> dict:
+    started = time.time()
+    try:
+        result = run_ingest(session.stream, session.file_name, session.metadata, job=job)
+    except Exception:
+        session.stream.drain()
+        raise
+    return {
+        "message": "Dataset and signals uploaded successfully.",
+        "file_name": session.file_name,
+        "metadata": session.metadata,
+        "duration_seconds": round(time.time() - started, 2),
+        **result,
+    }
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(file_name: str, metadata: dict, total_size: Optional[int] = None) -> UploadSession:
+    """Open and start a session; 503 when UPLOAD_SESSIONS are already open."""
+    session = UploadSession(file_name, metadata, total_size)
+    with _sessions_lock:
+        # Forget sessions whose job ended a while ago (their status stays in /api/jobs)
+        for upload_id, old in list(_sessions.items()):
+            if old.job.finished and time.time() - old.job.finished_at > UPLOAD_IDLE_TIMEOUT:
+                del _sessions[upload_id]
+        open_sessions = sum(1 for old in _sessions.values() if not old.job.finished)
+        if open_sessions >= UPLOAD_SESSIONS:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{open_sessions} uploads are already open; retry shortly",
+                headers={"Retry-After": "30"},
+            )
+        _sessions[session.upload_id] = session
+        session.start()
+    return session
+
+
+def get_session(upload_id: str) -> UploadSession:
+    with _sessions_lock:
+        session = _sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
@@ -0,0 +1,235 @@
+import io
+from typing import Optional
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from services import archive
+
+# The 18 IMU axes (3 sensors x 3 axes x accel/gyro) + ECG, in table order
+IMU_CHANNELS = [
+    "ax_alpha", "ax_beta", "ax_gamma",
+    "ay_alpha", "ay_beta", "ay_gamma",
+    "az_alpha", "az_beta", "az_gamma",
+    "gx_alpha", "gx_beta", "gx_gamma",
+    "gy_alpha", "gy_beta", "gy_gamma",
+    "gz_alpha", "gz_beta", "gz_gamma",
+]
+SIGNAL_CHANNELS = IMU_CHANNELS + ["ecg"]
+
+# PostgreSQL binary COPY framing
+_PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_PGCOPY_TRAILER = b"\xff\xff"
+
+
+def parse_channels(channels: Optional[str]) -> list:
+    """
+    Turn "ecg,az_alpha" into a validated list of column names.
+    Only whitelisted names are accepted since they end up in SQL.
+    """
+    if not channels:
+        return list(SIGNAL_CHANNELS)
+    names = [c.strip() for c in channels.split(",") if c.strip()]
+    if not names:
+        raise ValueError("No channels selected")  # "channels=,"; omit the parameter for all channels
+    unknown = [c for c in names if c not in SIGNAL_CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown channel(s): {', '.join(unknown)}")
+    return names
+
+
+def _row_dtype(columns: list, int_columns=()) -> np.dtype:
+    # Each binary COPY row: int16 field count, then (int32 length, value) per field.
+    # The leading key column is int8 and every other column float8 (int8 for
+    # int_columns), so rows are fixed width.
+    fields = [("nfields", ">i2"), ("key_len", ">i4"), ("key", ">i8")]
+    for name in columns:
+        fields.append((f"{name}_len", ">i4"))
+        fields.append((name, ">i8" if name in int_columns else ">f8"))
+    return np.dtype(fields)
+
+
+def decode_binary_copy(data, columns: list, key: str = "time", int_columns=()) -> dict:
+    """
+    Decode `COPY ... TO STDOUT (FORMAT binary)` output of (key int8, *columns float8)
+    into little-endian NumPy columns without building per-row Python objects.
+    Columns listed in int_columns are int8 instead of float8.
+    """
+    view = memoryview(data)
+    if bytes(view[:11]) != _PGCOPY_SIGNATURE:
+        raise ValueError("Not a PostgreSQL binary COPY stream")
+    ext_len = int.from_bytes(view[15:19], "big")
+    body_start = 19 + ext_len
+    body_end = len(view) - len(_PGCOPY_TRAILER)
+
+    rows = np.frombuffer(view[body_start:body_end], dtype=_row_dtype(columns, int_columns))
+    decoded = {key: rows["key"].astype("<i8")}
+    for name in columns:
+        decoded[name] = rows[name].astype("<i8" if name in int_columns else "<f8")
+    return decoded
+
+
+def copy_columns(cursor, sql: str, params, columns: list, key: str = "time", int_columns=()) -> dict:
+    """
+    Run a SELECT returning (int8 key, float8 columns...) through binary COPY
+    and return it as NumPy arrays. Columns must be NOT NULL (wrap in COALESCE);
+    the ones named in int_columns must be int8 (cast them).
+    """
+    query = cursor.mogrify(sql, params).decode()
+    buffer = io.BytesIO()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", buffer)
+    return decode_binary_copy(buffer.getbuffer(), columns, key=key, int_columns=int_columns)
+
+
+def columns_sql(
+    dataset_id: int,
+    channels: list,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+):
+    """SELECT of time + channels (NULL as NaN) for fetch_columns() and its async twin, with params."""
+    select_list = ", ".join(["time"] + [f"COALESCE({c}, 'NaN'::float8)" for c in channels])
+    conditions = ["dataset_id = %s"]
+    params = [dataset_id]
+    if start is not None:
+        conditions.append("time >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("time < %s")
+        params.append(end)
+    if after_time is not None:
+        conditions.append("time > %s")
+        params.append(after_time)
+
+    sql = f"SELECT {select_list} FROM signals WHERE {' AND '.join(conditions)} ORDER BY time ASC"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    if offset:
+        sql += " OFFSET %s"
+        params.append(offset)
+    return sql, params
+
+
+def fetch_columns(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> dict:
+    """
+    Fetch time + channels for one dataset as contiguous NumPy arrays.
+    start/end are inclusive/exclusive bounds in microseconds; after_time is a keyset cursor.
+    NULL samples come back as NaN so the binary rows stay fixed width.
+    Archived datasets are read from their Parquet file instead (services/archive.py).
+    """
+    if archive.is_archived(dataset_id):
+        return archive.read_columns(dataset_id, channels, start, end, after_time, limit, offset)
+
+    sql, params = columns_sql(dataset_id, channels, start, end, after_time, limit, offset)
+    return copy_columns(cursor, sql, params, channels)
+
+
+async def copy_columns_async(conn, sql: str, params, columns: list, key: str = "time") -> dict:
+    """copy_columns() over an async psycopg 3 connection (parameters are bound client-side)."""
+    buffer = io.BytesIO()
+    async with conn.cursor() as cursor:
+        async with cursor.copy(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", params) as copy:
+            async for data in copy:
+                buffer.write(data)
+    return decode_binary_copy(buffer.getbuffer(), columns, key=key)
+
+
+async def fetch_columns_async(
+    conn,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    after_time: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> dict:
+    """fetch_columns() for the async read routes (db_async); archive reads run in the threadpool."""
+    if archive.is_archived(dataset_id):
+        return await run_in_threadpool(
+            archive.read_columns, dataset_id, channels, start, end, after_time, limit, offset
+        )
+    sql, params = columns_sql(dataset_id, channels, start, end, after_time, limit, offset)
+    return await copy_columns_async(conn, sql, params, channels)
+
+
+def iter_column_batches(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    after_time: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    batch_rows: int = 100_000,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+):
+    """
+    Yield fetch_columns() batches, keyset-paging through the dataset so each
+    batch is an index seek. `limit=None` walks to the end of the dataset/window.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_rows if remaining is None else min(batch_rows, remaining)
+        batch = fetch_columns(
+            cursor, dataset_id, channels,
+            start=start, end=end,
+            after_time=after_time, limit=size, offset=offset,
+        )
+        count = len(batch["time"])
+        if count == 0:
+            return
+        yield batch
+        if count < size:
+            return
+        after_time = int(batch["time"][-1])
+        offset = 0
+        if remaining is not None:
+            remaining -= count
+
+
+async def iter_column_batches_async(
+    conn,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    after_time: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    batch_rows: int = 100_000,
+):
+    """iter_column_batches() over an async connection (same keyset paging)."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_rows if remaining is None else min(batch_rows, remaining)
+        batch = await fetch_columns_async(
+            conn, dataset_id, channels,
+            after_time=after_time, limit=size, offset=offset,
+        )
+        count = len(batch["time"])
+        if count == 0:
+            return
+        yield batch
+        if count < size:
+            return
+        after_time = int(batch["time"][-1])
+        offset = 0
+        if remaining is not None:
+            remaining -= count
+
+
+def pack_columns(columns: dict) -> bytes:
+    """Raw transport: each column back to back as little-endian (time int64, channels float64)."""
+    return b"".join(np.ascontiguousarray(col).tobytes() for col in columns.values())
@@ -0,0 +1,218 @@
+"""
+Recorder CSV checks, run block by block on the stream that feeds the ingest COPY.
+
+- header: the 22 recorder columns in order ("frame_seperator" as the recorder
+  spells it; "frame_separator" is accepted too)
+- every row: 22 values, time a finite number, header / frame_seperator integers,
+  channels numbers or empty (NULL)
+- time strictly increasing across the whole file (keyset paging relies on it)
+- per channel, at most CSV_MAX_NAN_RATIO of the samples empty or NaN (checked at the end)
+
+Each block is parsed once with pyarrow and checked with NumPy. Only when a
+block fails is it scanned line by line, to report the exact row and column;
+a bad file stops the COPY at that block instead of failing later inside PostgreSQL.
+Uploads check in the background (background=True): block N is parsed on a
+worker thread (pyarrow releases the GIL) while the COPY sends it, and its
+error is raised when block N+1 or the end of the file is reached, still
+before the transaction commits.
+Off unless CSV_VALIDATE=1 (see below).
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from services.columnar import SIGNAL_CHANNELS
+
+# Column order of the recorder CSVs ("frame_seperator" is spelled that way in the files)
+CSV_COLUMNS = ["time", "header"] + SIGNAL_CHANNELS + ["frame_seperator"]
+INTEGER_COLUMNS = ("header", "frame_seperator")
+HEADER_ALIASES = {"frame_separator": "frame_seperator"}
+
+# Set CSV_VALIDATE=1 to run the checks. Off by default until benchmarks/bench_validation --db
+# shows them under 5 % of the COPY time; without them COPY still rejects malformed rows, just later
+CSV_VALIDATE = os.getenv("CSV_VALIDATE", "0") == "1"
+# Largest share of empty/NaN samples a channel may have in one file
+CSV_MAX_NAN_RATIO = float(os.getenv("CSV_MAX_NAN_RATIO", "0.5"))
+# Worker threads shared by every background validator (one block in flight per file)
+CSV_VALIDATE_THREADS = int(os.getenv("CSV_VALIDATE_THREADS", "4"))
+
+_COLUMN_TYPES = {
+    name: pa.int64() if name in INTEGER_COLUMNS else pa.float64() for name in CSV_COLUMNS
+}
+# The recorder never quotes; a quoted value fails the fast parse and is checked by _scan()
+_READ_OPTIONS = pacsv.ReadOptions(column_names=CSV_COLUMNS, use_threads=False)
+_PARSE_OPTIONS = pacsv.ParseOptions(quote_char=False)
+# Only an empty value is NULL (as in COPY ... CSV); "NA", "null", "#N/A" are rejected.
+# NaN/inf spellings ("nan", "NaN", "inf", "Infinity") parse as floats, which PostgreSQL accepts too.
+_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types=_COLUMN_TYPES, null_values=[""], strings_can_be_null=False, quoted_strings_can_be_null=False,
+)
+
+_executor = None
+
+
+class CsvValidationError(ValueError):
+    """A malformed recorder CSV. `row` is the 1-based data row (header line not counted)."""
+
+    def __init__(self, message: str, row: Optional[int] = None, column: Optional[str] = None):
+        if row is not None:
+            message = f"Row {row}" + (f", column {column}" if column else "") + f": {message}"
+        super().__init__(message)
+        self.row = row
+        self.column = column
+
+
+def check_header(line: bytes):
+    """Raise CsvValidationError unless line is the recorder header."""
+    text = line.decode("utf-8-sig", errors="replace").strip()
+    names = [HEADER_ALIASES.get(name.strip(), name.strip()) for name in text.split(",")]
+    if names == CSV_COLUMNS:
+        return
+    missing = [name for name in CSV_COLUMNS if name not in names]
+    unexpected = [name for name in names if name not in CSV_COLUMNS]
+    if missing or unexpected:
+        details = []
+        if missing:
+            details.append(f"missing {', '.join(missing)}")
+        if unexpected:
+            details.append(f"unexpected {', '.join(repr(n) for n in unexpected)}")
+        raise CsvValidationError(f"Header does not match the recorder columns: {'; '.join(details)}")
+    if len(names) != len(CSV_COLUMNS):
+        raise CsvValidationError(f"Header has {len(names)} columns, expected {len(CSV_COLUMNS)}")
+    position = next(i for i, (got, want) in enumerate(zip(names, CSV_COLUMNS)) if got != want)
+    raise CsvValidationError(
+        f"Header column {position + 1} is '{names[position]}', expected '{CSV_COLUMNS[position]}'"
+    )
+
+
+def check_file_header(source):
+    """check_header() on the first line of a seekable upload, which is then rewound."""
+    first_line = source.readline(64 * 1024)
+    source.seek(0)
+    check_header(first_line)
+
+
+class CsvBlockValidator:
+    """
+    Checks consecutive blocks of complete data lines (SignalCsvTransformer calls
+    validate() before transforming a block and finish() at the end of the input).
+    Live streams never call finish(): they have no end of file to check at.
+    `max_nan_ratio=None` skips the NaN density check; `background=True` checks
+    each block on a worker thread and raises its error one call later.
+    """
+
+    def __init__(self, max_nan_ratio: Optional[float] = CSV_MAX_NAN_RATIO, background: bool = False):
+        self.max_nan_ratio = max_nan_ratio
+        self.background = background
+        self.rows = 0
+        self.last_time = -np.inf
+        self.nan_counts = np.zeros(len(SIGNAL_CHANNELS), dtype=np.int64)
+        self._pending = None
+
+    def validate(self, block: bytes):
+        """Check one block of complete lines (no header); raises CsvValidationError."""
+        if not self.background:
+            self._check(block)
+            return
+        global _executor
+        self.wait()
+        if _executor is None:
+            _executor = ThreadPoolExecutor(CSV_VALIDATE_THREADS, thread_name_prefix="csv-validate")
+        self._pending = _executor.submit(self._check, block)
+
+    def wait(self):
+        """Raise the error of the block still being checked in the background, if any."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.result()
+
+    def _check(self, block: bytes):
+        if not block.strip():
+            return
+        try:
+            table = pacsv.read_csv(
+                io.BytesIO(block),
+                read_options=_READ_OPTIONS, parse_options=_PARSE_OPTIONS, convert_options=_CONVERT_OPTIONS,
+            )
+        except pa.ArrowInvalid:
+            self._scan(block)  # finds the bad row (or accepts what pyarrow is stricter about)
+            return
+
+        times = table.column("time").to_numpy(zero_copy_only=False)
+        bad = ~np.isfinite(times)
+        if bad.any():
+            index = int(np.argmax(bad))
+            raise CsvValidationError("time is empty or not finite", row=self.rows + index + 1, column="time")
+        steps = np.diff(times, prepend=self.last_time)
+        if (steps <= 0).any():
+            index = int(np.argmax(steps <= 0))
+            previous = times[index - 1] if index else self.last_time
+            raise CsvValidationError(
+                f"time {float(times[index])!r} does not increase (previous row {float(previous)!r})",
+                row=self.rows + index + 1, column="time",
+            )
+
+        for position, name in enumerate(SIGNAL_CHANNELS):
+            values = table.column(name).to_numpy(zero_copy_only=False)  # NULL → NaN
+            self.nan_counts[position] += np.count_nonzero(np.isnan(values))
+        self.last_time = times[-1]
+        self.rows += table.num_rows
+
+    def finish(self) -> dict:
+        """End-of-file checks; returns the empty/NaN share per channel."""
+        self.wait()
+        if self.rows == 0:
+            raise CsvValidationError("The CSV has no data rows")
+        ratios = self.nan_counts / self.rows
+        if self.max_nan_ratio is not None:
+            for name, ratio in zip(SIGNAL_CHANNELS, ratios):
+                if ratio > self.max_nan_ratio:
+                    raise CsvValidationError(
+                        f"Column {name}: {ratio:.0%} of the samples are empty or NaN "
+                        f"(at most {self.max_nan_ratio:.0%} allowed, CSV_MAX_NAN_RATIO)"
+                    )
+        return {name: round(float(ratio), 4) for name, ratio in zip(SIGNAL_CHANNELS, ratios) if ratio > 0}
+
+    def _scan(self, block: bytes):
+        """Slow path for a block pyarrow rejected: the same checks line by line, naming the first bad row."""
+        nan_counts = np.zeros(len(SIGNAL_CHANNELS), dtype=np.int64)
+        row, last_time = self.rows, self.last_time
+        for line in block.split(b"\n"):
+            line = line.rstrip(b"\r")
+            if not line:
+                continue
+            row += 1
+            values = line.split(b",")
+            if len(values) != len(CSV_COLUMNS):
+                raise CsvValidationError(f"expected {len(CSV_COLUMNS)} values, got {len(values)}", row=row)
+            parsed = []
+            for name, value in zip(CSV_COLUMNS, values):
+                value = value.strip().strip(b'"')
+                if not value:
+                    parsed.append(np.nan)  # empty = NULL
+                    continue
+                try:
+                    if b"_" in value:  # Python reads "1_000", pyarrow and PostgreSQL floats do not
+                        raise ValueError(value)
+                    parsed.append(int(value) if name in INTEGER_COLUMNS else float(value))
+                except ValueError:
+                    kind = "an integer" if name in INTEGER_COLUMNS else "a number"
+                    raise CsvValidationError(
+                        f"{value.decode(errors='replace')!r} is not {kind}", row=row, column=name
+                    )
+            time_value = parsed[0]
+            if not np.isfinite(time_value):
+                raise CsvValidationError("time is empty or not finite", row=row, column="time")
+            if time_value <= last_time:
+                raise CsvValidationError(
+                    f"time {time_value!r} does not increase (previous row {float(last_time)!r})", row=row, column="time"
+                )
+            last_time = time_value
+            nan_counts += np.isnan(np.array(parsed[2:-1], dtype=np.float64))
+        self.nan_counts += nan_counts
+        self.rows, self.last_time = row, last_time
@@ -0,0 +1,117 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from services import archive
+from services.columnar import copy_columns, fetch_columns
+from services.pyramid import minmax_from_pyramid, pick_level
+
+
+def resolve_window(cursor, dataset_id: int, start: Optional[int], end: Optional[int]):
+    """
+    Fill missing start/end (microseconds) from the dataset's first/last sample.
+    end is exclusive. Returns (None, None) when the dataset has no signals.
+    """
+    if (start is None or end is None) and archive.is_archived(dataset_id):
+        first_time, last_time = archive.time_span(dataset_id)
+        if first_time is None:
+            return None, None
+        return (first_time if start is None else start), (last_time + 1 if end is None else end)
+    if start is None or end is None:
+        # Both aggregates are answered from the (dataset_id, time) index
+        cursor.execute(
+            "SELECT MIN(time) AS first_time, MAX(time) AS last_time FROM signals WHERE dataset_id = %s;",
+            (dataset_id,)
+        )
+        row = cursor.fetchone()
+        if row["first_time"] is None:
+            return None, None
+        if start is None:
+            start = row["first_time"]
+        if end is None:
+            end = row["last_time"] + 1
+    return start, end
+
+
+def to_json_list(values: np.ndarray) -> list:
+    """NumPy column -> JSON-safe list (NaN becomes null)."""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def minmax_buckets(cursor, dataset_id: int, channels: list, start: int, end: int, buckets: int) -> dict:
+    """
+    Per-bucket min/max of each channel, bucketed in SQL with time_bucket().
+    Buckets are aligned to `start` so the first one begins exactly at the window edge.
+    Returns {"time": bucket starts, "<ch>_min": ..., "<ch>_max": ..., "bucket_width": width}.
+    """
+    width = max(1, math.ceil((end - start) / buckets))
+    if archive.is_archived(dataset_id):
+        result = archive.bucket_aggregates(dataset_id, channels, start, end, width, ["min", "max"])
+        result["bucket_width"] = width
+        return result
+    aggregates = []
+    columns = []
+    for name in channels:
+        aggregates.append(f"COALESCE(MIN({name}), 'NaN'::float8)")
+        aggregates.append(f"COALESCE(MAX({name}), 'NaN'::float8)")
+        columns += [f"{name}_min", f"{name}_max"]
+
+    sql = f"""
+        SELECT time_bucket(%s::bigint, time, %s::bigint) AS bucket, {", ".join(aggregates)}
+        FROM signals
+        WHERE dataset_id = %s AND time >= %s AND time < %s
+        GROUP BY bucket
+        ORDER BY bucket
+    """
+    result = copy_columns(cursor, sql, (width, start % width, dataset_id, start, end), columns)
+    result["bucket_width"] = width
+    return result
+
+
+def downsample(cursor, dataset_id: int, channels: list, start: int, end: int, points: int) -> dict:
+    """
+    Visually faithful series of at most ~`points` samples per channel.
+
+    If the window holds no more than `points` raw samples they are returned as-is
+    (mode "raw"). Otherwise the window is cut into points/2 buckets and each
+    bucket contributes its min and max (mode "minmax"), which keeps spikes such
+    as R-peaks that averaging or plain decimation would drop.
+
+    Buckets are read from the precomputed pyramid (services/pyramid.py) when a
+    level fits the budget; `level` in the result says which one (None = raw signals).
+    """
+    raw = fetch_columns(cursor, dataset_id, channels, start=start, end=end, limit=points + 1)
+    if len(raw["time"]) <= points:
+        return {
+            "mode": "raw",
+            "level": None,
+            "bucket_width": None,
+            "time": raw["time"].tolist(),
+            "channels": {name: {"value": to_json_list(raw[name])} for name in channels},
+        }
+
+    bucket_count = max(1, points // 2)
+    level = pick_level(start, end, bucket_count)
+    buckets = None
+    if level is not None:
+        buckets = minmax_from_pyramid(cursor, dataset_id, channels, start, end, bucket_count, level)
+        if len(buckets["time"]) == 0:
+            # Dataset ingested before the pyramid existed
+            buckets, level = None, None
+    if buckets is None:
+        buckets = minmax_buckets(cursor, dataset_id, channels, start, end, bucket_count)
+
+    return {
+        "mode": "minmax",
+        "level": level,
+        "bucket_width": buckets["bucket_width"],
+        "time": buckets["time"].tolist(),
+        "channels": {
+            name: {
+                "min": to_json_list(buckets[f"{name}_min"]),
+                "max": to_json_list(buckets[f"{name}_max"]),
+            }
+            for name in channels
+        },
+    }
@@ -0,0 +1,177 @@
+import os
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.beats import estimate_sample_rate
+from services.columnar import SIGNAL_CHANNELS, copy_columns, fetch_columns
+from services.signals import LRUCache, get_dataset_version
+
+# Beats whose samples are fetched and averaged together (bounds memory per step)
+ENSEMBLE_CHUNK_BEATS = int(os.getenv("ENSEMBLE_CHUNK_BEATS", "200"))
+ENSEMBLE_CACHE_SIZE = int(os.getenv("ENSEMBLE_CACHE_SIZE", "128"))
+# A beat window spanning more than this multiple of its nominal length crosses a gap
+MAX_GAP_RATIO = 1.5
+
+_ensemble_cache = LRUCache(ENSEMBLE_CACHE_SIZE)
+
+
+def fetch_beat_times(cursor, dataset_id: int, start: Optional[int], end: Optional[int]) -> np.ndarray:
+    """R-peak times (µs) from the beats table as one int64 array (binary COPY, no row objects)."""
+    conditions = ["dataset_id = %s"]
+    params = [dataset_id]
+    if start is not None:
+        conditions.append("time >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("time < %s")
+        params.append(end)
+    sql = f"SELECT time FROM beats WHERE {' AND '.join(conditions)} ORDER BY time"
+    return copy_columns(cursor, sql, params, [])["time"]
+
+
+class _Accumulator:
+    """Running sum / sum of squares / count per channel and offset (NaN samples skipped)."""
+
+    def __init__(self, channels: list, length: int):
+        self.sum = {name: np.zeros(length) for name in channels}
+        self.sumsq = {name: np.zeros(length) for name in channels}
+        self.count = {name: np.zeros(length, dtype=np.int64) for name in channels}
+
+    def add(self, name: str, segments: np.ndarray):
+        valid = ~np.isnan(segments)
+        values = np.where(valid, segments, 0.0)
+        self.sum[name] += values.sum(axis=0)
+        self.sumsq[name] += (values * values).sum(axis=0)
+        self.count[name] += valid.sum(axis=0)
+
+    def result(self, name: str):
+        count = self.count[name]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum[name] / count
+            var = np.maximum(self.sumsq[name] / count - mean * mean, 0.0)
+        return mean, np.sqrt(var)
+
+
+def ensemble_average(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pre_ms: float = 200,
+    post_ms: float = 600,
+    chunk_beats: int = ENSEMBLE_CHUNK_BEATS,
+) -> Optional[dict]:
+    """
+    Beat-aligned ensemble mean/std of each channel around every R peak in [start, end).
+
+    Beats are processed in chunks: one index range read of the channels covering
+    the chunk, then per channel a sliding_window_view (a strided view, nothing
+    copied) of length pre+post samples, from which the beat rows are gathered
+    in a single vectorized take and reduced into running sums.
+    Beats too close to the recording edges or spanning a time gap are skipped.
+    """
+    beat_times = fetch_beat_times(cursor, dataset_id, start, end)
+    if len(beat_times) == 0:
+        return None
+
+    pre_us, post_us = int(pre_ms * 1000), int(post_ms * 1000)
+    accumulator = None
+    fs = pre = length = None
+    used = 0
+
+    for first in range(0, len(beat_times), chunk_beats):
+        chunk = beat_times[first:first + chunk_beats]
+        columns = fetch_columns(
+            cursor, dataset_id, channels,
+            start=int(chunk[0]) - pre_us, end=int(chunk[-1]) + post_us + 1,
+        )
+        times = columns["time"]
+        if fs is None:
+            fs = estimate_sample_rate(times)
+            if fs is None:
+                continue
+            pre = int(round(pre_ms * fs / 1000))
+            length = pre + int(round(post_ms * fs / 1000))
+            accumulator = _Accumulator(channels, length)
+        if len(times) < length:
+            continue
+
+        # Sample index of each R peak and of the first sample of its window
+        first_sample = np.searchsorted(times, chunk) - pre
+        ok = (first_sample >= 0) & (first_sample + length <= len(times))
+        first_sample = first_sample[ok]
+        # Drop windows that straddle a gap in the recording
+        span = times[first_sample + length - 1] - times[first_sample]
+        first_sample = first_sample[span <= MAX_GAP_RATIO * (length - 1) * 1_000_000 / fs]
+        if len(first_sample) == 0:
+            continue
+
+        for name in channels:
+            windows = sliding_window_view(columns[name], length)  # (samples - length + 1, length) view
+            accumulator.add(name, windows[first_sample])
+        used += len(first_sample)
+
+    if used == 0:
+        return None
+
+    offsets_ms = (np.arange(length) - pre) * 1000 / fs
+    result = {}
+    for name in channels:
+        mean, std = accumulator.result(name)
+        result[name] = {"mean": _json_floats(mean), "std": _json_floats(std)}
+    return {
+        "beats_total": int(len(beat_times)),
+        "beats_used": used,
+        "sample_rate_hz": round(fs, 3),
+        "offsets_ms": np.round(offsets_ms, 3).tolist(),
+        "channels": result,
+    }
+
+
+def _json_floats(values: np.ndarray) -> list:
+    return [None if v != v else v for v in values.tolist()]
+
+
+def cached_ensemble_average(
+    cursor,
+    dataset_id: int,
+    channels: list,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pre_ms: float = 200,
+    post_ms: float = 600,
+):
+    """
+    ensemble_average() cached per (dataset version, channels, window, pre/post).
+    Returns (result or None, dataset_found).
+    """
+    version = get_dataset_version(cursor, dataset_id)
+    if version is None:
+        return None, False
+
+    key = (version, tuple(channels), start, end, pre_ms, post_ms)
+    cached = _ensemble_cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}, True
+
+    result = ensemble_average(cursor, dataset_id, channels, start, end, pre_ms, post_ms)
+    if result is None:
+        return None, True
+    result = {
+        "dataset_id": dataset_id,
+        "start": start,
+        "end": end,
+        "pre_ms": pre_ms,
+        "post_ms": post_ms,
+        **result,
+    }
+    _ensemble_cache.put(key, result)
+    return {**result, "cached": False}, True
+
+
+def clear_cache():
+    """Forget cached ensembles (dev reset reuses dataset ids)."""
+    _ensemble_cache.clear()
@@ -0,0 +1,259 @@
+"""
+Parquet export of whole recordings and the archive tier built on it.
+
+export_batches() keyset-pages through a dataset with binary COPY (every batch an
+index seek, no row objects) and write_parquet() turns each batch into one Parquet
+row group, so memory stays constant however long the recording is. The same
+writer feeds the /api/datasets/{id}/export download and the archive files.
+
+    python -m services.export archive 3 7 12      # move datasets to ARCHIVE_DIR
+    python -m services.export archive --cold      # uploaded more than ARCHIVE_AFTER_DAYS ago
+    python -m services.export restore 3           # back into the hypertable
+    python -m services.export export 3 out.parquet
+"""
+import argparse
+import io
+import os
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from services import archive
+from services.columnar import SIGNAL_CHANNELS, copy_columns
+from services.ingest import COPY_COLUMNS
+from services.storage import compress_after_ingest, drop_dataset_chunks
+
+# Rows per COPY batch = rows per Parquet row group
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "250000"))
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Integer columns travel as int8 with this value standing in for NULL
+INT_COLUMNS = ["header", "frame_separator"]
+_NULL_INT = np.iinfo(np.int64).min
+
+
+def parquet_schema(channels: list) -> pa.Schema:
+    fields = [pa.field("time", pa.int64(), nullable=False), pa.field("header", pa.int64())]
+    fields += [pa.field(name, pa.float64()) for name in channels]
+    fields.append(pa.field("frame_separator", pa.int32()))
+    return pa.schema(fields)
+
+
+def export_batches(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+):
+    """
+    Yield the dataset's rows (time, header, channels, frame_separator) as Arrow record batches.
+    Archived datasets are read row group by row group from their Parquet file.
+    """
+    schema = parquet_schema(channels)
+    if archive.is_archived(dataset_id):
+        for table in archive.iter_row_groups(dataset_id, schema.names, start, end):
+            yield from table.select(schema.names).to_batches()
+        return
+
+    null_int = f"'{_NULL_INT}'::int8"
+    select_list = ["time", f"COALESCE(header, {null_int})"]
+    select_list += [f"COALESCE({name}, 'NaN'::float8)" for name in channels]
+    select_list.append(f"COALESCE(frame_separator::int8, {null_int})")
+    columns = ["header"] + channels + ["frame_separator"]
+
+    after_time = None
+    while True:
+        conditions = ["dataset_id = %s"]
+        params = [dataset_id]
+        for condition, value in (("time >= %s", start), ("time < %s", end), ("time > %s", after_time)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        batch = copy_columns(cursor, f"""
+            SELECT {", ".join(select_list)}
+            FROM signals
+            WHERE {" AND ".join(conditions)}
+            ORDER BY time
+            LIMIT %s
+        """, params + [batch_rows], columns, int_columns=INT_COLUMNS)
+        count = len(batch["time"])
+        if count == 0:
+            return
+
+        arrays = [pa.array(batch["time"])]
+        for name in columns:
+            values = batch[name]
+            if name in INT_COLUMNS:
+                arrays.append(pa.array(values, mask=values == _NULL_INT, type=schema.field(name).type))
+            else:
+                arrays.append(pa.array(values, from_pandas=True))  # NaN -> null
+        yield pa.record_batch(arrays, schema=schema)
+
+        if count < batch_rows:
+            return
+        after_time = int(batch["time"][-1])
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter that hands out what was written so far."""
+
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Absolute offset: the Parquet footer records column chunk positions
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def write_parquet(cursor, dataset_id: int, sink, channels: list = SIGNAL_CHANNELS,
+                  start: Optional[int] = None, end: Optional[int] = None) -> int:
+    """Write a dataset (or a window of it) to a file object as Parquet. Returns the number of rows."""
+    rows = 0
+    with pq.ParquetWriter(sink, parquet_schema(channels), compression=PARQUET_COMPRESSION) as writer:
+        for batch in export_batches(cursor, dataset_id, channels, start, end):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def stream_parquet(cursor, dataset_id: int, channels: list, start: Optional[int], end: Optional[int]):
+    """Yield a Parquet file one row group at a time (constant memory, for StreamingResponse)."""
+    sink = _ChunkSink()
+    try:
+        with pq.ParquetWriter(sink, parquet_schema(channels), compression=PARQUET_COMPRESSION) as writer:
+            for batch in export_batches(cursor, dataset_id, channels, start, end):
+                writer.write_batch(batch)
+                yield sink.drain()
+        yield sink.drain()  # footer
+    finally:
+        cursor.close()
+
+
+def archive_dataset(conn, dataset_id: int) -> Optional[dict]:
+    """
+    Move a dataset's signals into ARCHIVE_DIR/<id>.parquet and drop its chunks.
+    The file is complete (and checked against row_count) before anything is dropped;
+    if the database step fails the file is removed again. None if already archived.
+    """
+    path = archive.archive_path(dataset_id)
+    if os.path.exists(path):
+        return None
+    os.makedirs(archive.ARCHIVE_DIR, exist_ok=True)
+    partial = f"{path}.partial"
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT row_count FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Dataset {dataset_id} not found")
+        with open(partial, "wb") as f:
+            rows = write_parquet(cursor, dataset_id, f)
+        if row["row_count"] is not None and rows != row["row_count"]:
+            os.remove(partial)
+            raise ValueError(f"Dataset {dataset_id}: wrote {rows} rows, expected {row['row_count']}")
+        os.replace(partial, path)
+
+        try:
+            chunks = drop_dataset_chunks(cursor, dataset_id)
+            cursor.execute("UPDATE datasets SET archived_at = now() WHERE dataset_id = %s;", (dataset_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            os.remove(path)
+            raise
+
+    size = os.path.getsize(path)
+    print(f"🧊 [Archive] dataset_id={dataset_id}: {rows} rows → {path} ({size} bytes), {chunks} chunk(s) dropped")
+    return {"rows": rows, "bytes": size, "chunks_dropped": chunks}
+
+
+def restore_dataset(conn, dataset_id: int) -> Optional[dict]:
+    """Load an archived dataset back into signals (then compress it and delete the file)."""
+    path = archive.archive_path(dataset_id)
+    if not os.path.exists(path):
+        return None
+
+    archived = archive.open_archive(dataset_id)
+    copy_sql = f"COPY signals ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT CSV)"
+    names = [name for name in COPY_COLUMNS if name != "dataset_id"]
+    rows = 0
+    with conn.cursor() as cursor:
+        for index in range(archived.parquet.metadata.num_row_groups):
+            table = archived.read_row_group(index, names)
+            table = table.add_column(0, "dataset_id", pa.array(np.full(table.num_rows, dataset_id, dtype=np.int32)))
+            buffer = io.BytesIO()
+            pacsv.write_csv(table, buffer, pacsv.WriteOptions(include_header=False))
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            rows += table.num_rows
+        cursor.execute("UPDATE datasets SET archived_at = NULL WHERE dataset_id = %s;", (dataset_id,))
+    conn.commit()
+
+    os.remove(path)
+    archive.clear_cache()
+    compress_after_ingest(conn, dataset_id)
+    print(f"🔥 [Archive] dataset_id={dataset_id}: {rows} rows restored from {path}")
+    return {"rows": rows}
+
+
+def cold_dataset_ids(cursor, days: int = ARCHIVE_AFTER_DAYS) -> list:
+    cursor.execute("""
+        SELECT dataset_id FROM datasets
+        WHERE archived_at IS NULL AND live_since IS NULL
+          AND uploaded_at < now() - make_interval(days => %s)
+        ORDER BY dataset_id;
+    """, (days,))
+    return [row["dataset_id"] for row in cursor.fetchall()]
+
+
+def main():
+    from db import close_pool, pooled_connection
+
+    parser = argparse.ArgumentParser(description="Archive / restore / export datasets as Parquet.")
+    parser.add_argument("action", choices=["archive", "restore", "export"])
+    parser.add_argument("args", nargs="*")
+    parser.add_argument("--cold", action="store_true", help="archive datasets uploaded more than --days ago")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        if args.action == "export":
+            dataset_id, out = int(args.args[0]), args.args[1]
+            with conn.cursor() as cursor, open(out, "wb") as f:
+                print(f"📦 dataset_id={dataset_id}: {write_parquet(cursor, dataset_id, f)} rows → {out}")
+        else:
+            dataset_ids = [int(value) for value in args.args]
+            if args.cold:
+                with conn.cursor() as cursor:
+                    dataset_ids = cold_dataset_ids(cursor, args.days)
+            for dataset_id in dataset_ids:
+                if args.action == "archive":
+                    archive_dataset(conn, dataset_id)
+                else:
+                    restore_dataset(conn, dataset_id)
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
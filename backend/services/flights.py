@@ -0,0 +1,153 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from db import pooled_connection
+from services import archive
+from services.columnar import copy_columns, fetch_columns
+
+# Datasets of one flight fetched at the same time (each holds a pooled connection)
+FLIGHT_FETCH_WORKERS = int(os.getenv("FLIGHT_FETCH_WORKERS", "4"))
+# Raw samples read per dataset before switching to SQL bucket means
+RAW_OVERSAMPLE = 4
+
+_fetch_pool = ThreadPoolExecutor(max_workers=FLIGHT_FETCH_WORKERS, thread_name_prefix="flight-fetch")
+
+
+def flight_datasets(flight_code: str, parabola: Optional[int] = None) -> list:
+    """
+    Datasets recorded on one flight, with the zero-g start of parabola N when
+    aligning on it (NULL for datasets where that parabola was not found).
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT d.dataset_id, d.file_name, d.box_name, d.box_color, d.role, d.person_name,
+                       p.zero_g_start AS anchor
+                FROM datasets d
+                LEFT JOIN parabolas p
+                       ON p.dataset_id = d.dataset_id AND p.parabola_no = %s
+                WHERE d.flight_code = %s
+                ORDER BY d.dataset_id;
+            """, (parabola, flight_code))
+            return cursor.fetchall()
+
+
+def _bucket_means(cursor, dataset_id: int, channels: list, start: int, end: int, step: int) -> dict:
+    """Mean of each channel per `step` bucket, buckets aligned to `start` (computed in SQL)."""
+    if archive.is_archived(dataset_id):
+        means = archive.bucket_aggregates(dataset_id, channels, start, end, step, ["mean"])
+        return {"time": means["time"], **{name: means[f"{name}_mean"] for name in channels}}
+    averages = [f"COALESCE(AVG({name}), 'NaN'::float8)" for name in channels]
+    return copy_columns(cursor, f"""
+        SELECT time_bucket(%s::bigint, time, %s::bigint) AS bucket, {", ".join(averages)}
+        FROM signals
+        WHERE dataset_id = %s AND time >= %s AND time < %s
+        GROUP BY bucket
+        ORDER BY bucket
+    """, (step, start % step, dataset_id, start, end), channels)
+
+
+def fetch_on_grid(dataset_id: int, channels: list, grid: np.ndarray, step: int, offset: int) -> dict:
+    """
+    One dataset's channels sampled on the shared grid (recording time = grid + offset).
+    Short windows are read raw and linearly interpolated onto the grid; long ones are
+    averaged per grid step in SQL, so the transfer never exceeds a few grid lengths.
+    Grid points outside the recording (or inside gaps longer than two steps) are NaN.
+    """
+    start, end = int(grid[0]) + offset, int(grid[-1]) + step + offset
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            limit = RAW_OVERSAMPLE * len(grid)
+            columns = fetch_columns(cursor, dataset_id, channels, start=start, end=end, limit=limit + 1)
+            if len(columns["time"]) > limit:
+                columns = _bucket_means(cursor, dataset_id, channels, start, end, step)
+                columns["time"] = columns["time"] + step // 2  # bucket centre
+
+    times = columns["time"] - offset
+    if len(times) == 0:
+        return {name: np.full(len(grid), np.nan) for name in channels}
+
+    # Grid points beyond the recorded span, or between samples further apart than a gap allows
+    spacing = float(np.median(np.diff(times))) if len(times) > 1 else float(step)
+    tolerance = max(step, spacing)
+    outside = (grid < times[0] - tolerance / 2) | (grid > times[-1] + tolerance / 2)
+    if len(times) > 1:
+        right = np.clip(np.searchsorted(times, grid), 1, len(times) - 1)
+        outside |= times[right] - times[right - 1] > 2 * tolerance
+    result = {}
+    for name in channels:
+        values = columns[name]
+        valid = ~np.isnan(values)
+        if valid.sum() == 0:
+            result[name] = np.full(len(grid), np.nan)
+            continue
+        resampled = np.interp(grid, times[valid], values[valid])
+        resampled[outside] = np.nan
+        result[name] = resampled
+    return result
+
+
+def flight_window(
+    flight_code: str,
+    channels: list,
+    start: int,
+    end: int,
+    points: int,
+    align_parabola: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Selected channels of every dataset of a flight on one common time grid of `points` samples.
+
+    Recordings start their clocks independently, so by default the grid is the
+    recorders' own relative time. With align_parabola=N every dataset is shifted
+    so that the zero-g start of parabola N (the same physical event for every
+    box on board) is t = 0; datasets without that parabola are returned unaligned.
+    Datasets are fetched concurrently, each over its own pooled connection.
+    """
+    datasets = flight_datasets(flight_code, align_parabola)
+    if not datasets:
+        return None
+
+    step = max(1, math.ceil((end - start) / points))
+    grid = start + np.arange(points, dtype=np.int64) * step
+
+    offsets = []
+    for ds in datasets:
+        aligned = align_parabola is not None and ds["anchor"] is not None
+        offsets.append(int(ds["anchor"]) if aligned else 0)
+
+    futures = [
+        _fetch_pool.submit(fetch_on_grid, ds["dataset_id"], channels, grid, step, offset)
+        for ds, offset in zip(datasets, offsets)
+    ]
+
+    entries = []
+    for ds, offset, future in zip(datasets, offsets, futures):
+        values = future.result()
+        entries.append({
+            "dataset_id": ds["dataset_id"],
+            "file_name": ds["file_name"],
+            "box_name": ds["box_name"],
+            "box_color": ds["box_color"],
+            "role": ds["role"],
+            "person_name": ds["person_name"],
+            "aligned": align_parabola is not None and ds["anchor"] is not None,
+            "offset_us": offset,
+            "channels": {
+                name: [None if v != v else v for v in values[name].tolist()] for name in channels
+            },
+        })
+
+    return {
+        "flight_code": flight_code,
+        "start": start,
+        "end": end,
+        "step_us": step,
+        "align_parabola": align_parabola,
+        "time": grid.tolist(),
+        "datasets": entries,
+    }
@@ -0,0 +1,125 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+# Total body bytes kept by the dataset-rows response cache (per process)
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(256 * 1024 * 1024)))
+# Bodies above this size are served but never cached, so one huge page can't flush the rest
+RESPONSE_CACHE_MAX_ENTRY = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY", str(RESPONSE_CACHE_BYTES // 8)))
+
+# Versioned URLs (?v=<version>) never change content; unversioned ones must revalidate,
+# because dev reset restarts dataset ids and the same URL can then mean another recording.
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+# Entity tags in an If-None-Match list: "*", "tag" or W/"tag"
+_ETAG_LIST = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def dataset_version(dataset_id: int, uploaded_at: datetime) -> str:
+    """
+    Identity of one ingested recording. Signals are never modified after ingest,
+    so id + upload time pins down the content even across dev resets.
+    """
+    return f"{dataset_id}-{int(uploaded_at.timestamp() * 1_000_000)}"
+
+
+def make_etag(version: str, *variant) -> str:
+    """Strong ETag for one representation (format, page, channels...) of a dataset version."""
+    tag = "-".join([version, *(str(v) for v in variant if v is not None)])
+    return f'"{tag}"'
+
+
+def is_not_modified(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Conditional GET: If-None-Match wins when present (RFC 9110),
+    otherwise If-Modified-Since is compared at one-second resolution
+    (never matches without a last_modified: the ETag alone decides).
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Whole quoted tags: ours contain commas (channel lists), so no naive split
+        candidates = _ETAG_LIST.findall(if_none_match)
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(last_modified.timestamp()) <= int(since.timestamp())
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], immutable: bool = False) -> dict:
+    """Validator headers; last_modified=None leaves Last-Modified out (ETag-only revalidation)."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Vary": "Accept",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+class ByteLRU:
+    """
+    Thread-safe LRU of encoded responses, bounded by total body size rather than entry count
+    (a 200-row JSON page and a full binary export differ by orders of magnitude).
+    Values are (body: bytes, media_type: str, headers: dict).
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "skipped": 0}
+
+    def get(self, key) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key, body: bytes, media_type: str, headers: dict):
+        if len(body) > self.max_entry_bytes:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (body, media_type, headers)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+# Shared by /api/dataset-rows; keys include the dataset version, so entries never go stale
+rows_cache = ByteLRU(RESPONSE_CACHE_BYTES, RESPONSE_CACHE_MAX_ENTRY)
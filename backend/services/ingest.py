@@ -0,0 +1,409 @@
+import time
+
+import psycopg2
+from fastapi import HTTPException
+
+from db import get_pool
+from services import live_tail, stats
+from services.beats import run_beat_detection
+from services.parabolas import run_parabola_segmentation
+from services.columnar import SIGNAL_CHANNELS
+from services.csv_validation import CSV_VALIDATE, CsvBlockValidator, check_header
+from services.jobs import JobCancelled
+from services.pyramid import build_pyramid
+from services.storage import compress_after_ingest
+
+# Matching signals columns for COPY; the CSV typo maps onto frame_separator
+COPY_COLUMNS = ["dataset_id", "time", "header"] + SIGNAL_CHANNELS + ["frame_separator"]
+COPY_SIGNALS_SQL = f"COPY signals ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT CSV)"
+
+READ_BLOCK_SIZE = 1 << 20  # 1 MiB per read from the upload
+
+
+class SignalCsvTransformer:
+    """
+    File-like adapter that turns a recorder CSV into COPY-ready rows for `signals`,
+    one block at a time (constant memory, no temp file, no staging table):
+
+    - drops the header line
+    - converts `time` from seconds to integer microseconds
+      (round-half-even, same as PostgreSQL's CAST(time * 1000000 AS BIGINT))
+    - prepends dataset_id
+
+    Pass it to cursor.copy_expert(COPY_SIGNALS_SQL, transformer).
+    Exceptions raised while reading are kept in `.error` because psycopg2
+    reports them only as a generic COPY failure.
+    `on_progress(bytes_in, rows)` is called after every block; raising from it aborts the COPY.
+    `on_block(rows_csv)` gets each transformed block (used by the live tail).
+    `validator` (services/csv_validation.CsvBlockValidator) checks the header and
+    every block before it is transformed, and the whole file at the end of read().
+    Live streams (services/live_ingest.py) push pieces through feed() instead of read(),
+    with header=False.
+    """
+
+    def __init__(self, source, dataset_id: int, block_size: int = READ_BLOCK_SIZE, on_progress=None,
+                 on_block=None, header: bool = True, validator=None):
+        self.source = source
+        self.on_progress = on_progress
+        self.on_block = on_block
+        self.validator = validator
+        self.nan_ratio = None
+        self.block_size = block_size
+        self.prefix = f"{dataset_id},".encode()
+        self.bytes_in = 0
+        self.rows = 0
+        self.error = None
+        self.started = time.perf_counter()
+        self._carry = b""
+        self._buffer = b""
+        self._pos = 0
+        self._header_skipped = not header
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            while self._pos >= len(self._buffer) and not self._eof:
+                self._buffer = self._fill()
+                self._pos = 0
+        except Exception as e:
+            self.error = e
+            raise
+        end = len(self._buffer) if size < 0 else min(len(self._buffer), self._pos + size)
+        chunk = self._buffer[self._pos:end]
+        self._pos = end
+        return chunk
+
+    def readline(self, size: int = -1) -> bytes:
+        # copy_expert only calls read(); provided for file-like completeness
+        return self.read(size)
+
+    def _fill(self) -> bytes:
+        block = self.source.read(self.block_size)
+        if not block:
+            self._eof = True
+        transformed = self.feed(block)
+        if self._eof and self.validator is not None:
+            self.nan_ratio = self.validator.finish()
+        return transformed
+
+    def feed(self, block: bytes) -> bytes:
+        """
+        Transform the next piece of CSV (b"" = end of input) into COPY rows.
+        A trailing incomplete line is kept until the next piece.
+        """
+        if not block:
+            text, self._carry = self._carry, b""
+        else:
+            self.bytes_in += len(block)
+            text = self._carry + block
+            cut = text.rfind(b"\n") + 1
+            text, self._carry = text[:cut], text[cut:]  # last piece may be an incomplete line
+
+        if not self._header_skipped and text:
+            header, _, text = text.partition(b"\n")
+            if self.validator is not None:
+                check_header(header)
+            self._header_skipped = True
+
+        if self.validator is not None and text:
+            self.validator.validate(text)
+
+        try:
+            transformed = self.transform_lines(text.split(b"\n"))
+        except (ValueError, OverflowError):
+            if self.validator is not None:
+                self.validator.wait()  # a background check of this block names the row and column
+            raise
+        if self.on_block is not None:
+            self.on_block(transformed)
+        if self.on_progress is not None:
+            self.on_progress(self.bytes_in, self.rows)
+        return transformed
+
+    def transform_lines(self, lines: list) -> bytes:
+        out = []
+        prefix = self.prefix
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if not line:
+                continue
+            seconds, _, rest = line.partition(b",")
+            try:
+                micros = round(float(seconds) * 1_000_000)
+            except (ValueError, OverflowError):  # "abc", "nan" / "inf"
+                raise ValueError(f"Row {self.rows + 1}: invalid time value {seconds.decode(errors='replace')!r}")
+            out.append(prefix + str(micros).encode() + b"," + rest)
+            self.rows += 1
+        if not out:
+            return b""
+        return b"\n".join(out) + b"\n"
+
+    def throughput_mb_s(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return round(self.bytes_in / 1_000_000 / elapsed, 2) if elapsed > 0 else 0.0
+
+
+# ============================================================
+# Ingest pipeline (shared by /upload-csv, bulk import and benchmarks)
+# ============================================================
+
+def insert_dataset(cursor, filename: str, metadata: dict) -> int:
+    print("🗂 [Dataset Insert] Inserting dataset row...")
+    """
+    Insert the datasets row.
+    Returns the new dataset_id.
+    """
+    sql_dataset = """
+        INSERT INTO datasets (
+            file_name,
+            file_date,
+            flight_code,
+            box_name,
+            box_color,
+            role,
+            person_name
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        RETURNING dataset_id;
+    """
+    
+    cursor.execute(
+        sql_dataset,
+        (
+            filename,
+            metadata.get("file_date"),
+            metadata.get("flight_code"),
+            metadata.get("box_name"),
+            metadata.get("box_color"),
+            metadata.get("role"),
+            metadata.get("person_name"),
+        ),
+    )
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to create dataset entry in database."
+        )
+
+    return row["dataset_id"]
+
+
+def upsert_related(cursor, metadata: dict):
+    """
+    Upsert into persons + flights + boxes.
+    Called at the very end of the ingest transaction: these rows are shared by
+    every file of a flight, and ON CONFLICT DO UPDATE keeps them locked until
+    commit, so doing it before the COPY would serialise parallel uploads.
+    """
+    # 1) Upsert into persons
+    person_name = metadata.get("person_name")
+    role = metadata.get("role")
+    if person_name:
+        cursor.execute(
+            """
+            INSERT INTO persons (person_name, role)
+            VALUES (%s, %s)
+            ON CONFLICT (person_name)
+            DO UPDATE SET role = EXCLUDED.role;
+            """,
+            (person_name, role),
+        )
+
+    # 2) Upsert into flights
+    flight_code = metadata.get("flight_code")
+    file_date = metadata.get("file_date")
+    if flight_code and file_date:
+        cursor.execute(
+            """
+            INSERT INTO flights (flight_code, flight_date)
+            VALUES (%s, %s)
+            ON CONFLICT (flight_code)
+            DO UPDATE SET flight_date = EXCLUDED.flight_date;
+            """,
+            (flight_code, file_date),
+        )
+#zaeem
+    box_name = metadata.get("box_name")
+    color = metadata.get("box_color")
+    if color and box_name:
+        cursor.execute(
+            """
+            INSERT INTO boxes (box_name, color)
+            VALUES (%s, %s)
+            ON CONFLICT (box_name,color)
+            DO NOTHING;
+            """,
+            (box_name,color),
+        )
+
+
+def ingest_signals(cursor, dataset_id: int, source, job=None) -> dict:
+    """
+    Stream the CSV straight into the signals hypertable with one COPY.
+    `source` is any binary file-like object (the upload itself); it is read
+    block by block and transformed on the fly (seconds -> microseconds,
+    dataset_id injected, frame_seperator -> frame_separator), so nothing is
+    written to disk or to a staging table.
+    If a background `job` is given, its progress counters are updated per block
+    and each block is published to its live-tail viewers (/api/jobs/{id}/live).
+    With CSV_VALIDATE=1 the rows are checked block by block on the way
+    (services/csv_validation.py); the first bad block aborts the COPY with a
+    ValueError naming the row and column.
+    Returns rows inserted, bytes read, throughput and the channels' empty/NaN share.
+    """
+    print(f"📤 [COPY] Streaming CSV → signals for dataset_id={dataset_id}...")
+    transformer = SignalCsvTransformer(
+        source, dataset_id,
+        on_progress=job.update if job is not None else None,
+        on_block=live_tail.copy_block_publisher(job.id, COPY_COLUMNS) if job is not None else None,
+        validator=CsvBlockValidator(background=True) if CSV_VALIDATE else None,
+    )
+    try:
+        cursor.copy_expert(COPY_SIGNALS_SQL, transformer, size=transformer.block_size)
+    except Exception:
+        # psycopg2 hides errors raised inside read(); surface the real one
+        if transformer.error is not None:
+            raise transformer.error
+        raise
+
+    stats = {
+        "rows_inserted": transformer.rows,
+        "bytes_read": transformer.bytes_in,
+        "throughput_mb_s": transformer.throughput_mb_s(),
+    }
+    if transformer.nan_ratio:
+        stats["nan_ratio"] = transformer.nan_ratio
+    print(f"✔ [COPY] {stats['rows_inserted']} rows, {stats['throughput_mb_s']} MB/s")
+    return stats
+
+
+def derive_dataset(cursor, dataset_id: int, metadata: dict, phase=lambda name: None):
+    """
+    Everything computed from a dataset's signals once they are all in place
+    (after the upload COPY, or when a live stream is finished).
+    Returns (beat count, parabola count).
+    """
+    # D) Materialise the downsampling pyramid for fast overview/zoom reads
+    phase("building_pyramid")
+    print(f"🔺 [Pyramid] Building aggregate levels for dataset_id={dataset_id}...")
+    build_pyramid(cursor, dataset_id)
+
+    # E) Heartbeats from the ecg channel (R-peak times into beats)
+    phase("detecting_beats")
+    beat_count = run_beat_detection(cursor, dataset_id)
+
+    # F) Parabola phases from the 100 ms pyramid (also sets datasets.parabola_count)
+    phase("segmenting_parabolas")
+    parabola_count = run_parabola_segmentation(cursor, dataset_id)
+
+    # G) Shared lookup rows last, so their locks are held only until commit
+    upsert_related(cursor=cursor, metadata=metadata)
+    return beat_count, parabola_count
+
+
+def after_commit(conn, dataset_id: int, job=None) -> dict:
+    """
+    Post-commit steps of an ingest: refresh the cached /api/stats counts and compress
+    the dataset's chunks (their own transaction). The dataset is final by now (a retry
+    would only get 409), so a failure here is logged and returned as a warning.
+    """
+    if job is not None:
+        job.attach_connection(None)
+        job.phase = "compressing"  # not set_phase(): a committed job can no longer be cancelled
+    result = {"compression": None}
+    try:
+        stats.invalidate()
+        result["compression"] = compress_after_ingest(conn, dataset_id)
+    except Exception as e:
+        print(f"⚠️ [Ingest] dataset_id={dataset_id} is committed, but a post-commit step failed: {e}")
+        result["warning"] = f"Dataset stored; post-commit step failed: {e}"
+    return result
+
+
+def run_ingest(source, filename: str, metadata: dict, job=None) -> dict:
+    """
+    The blocking part of an upload (runs in a worker thread or background job).
+    In ONE DB transaction:
+        - insert into datasets
+        - stream the CSV into signals via COPY
+        - store the row count on the datasets row
+        - build the min/max/mean pyramid used by /datasets/{id}/signal
+        - detect R peaks on ecg and store them in beats
+        - segment parabolas (micro-gravity phases) into parabolas
+        - upsert persons, flights, boxes
+    After the commit the cached /api/stats counts are invalidated and the
+    dataset's signals chunks are compressed (services/storage.py); a failure
+    there no longer fails the upload, it is returned as `warning`.
+    Nothing here touches shared staging tables, so any number of uploads can run at once.
+    With a `job`, the phase is reported as it goes and cancel() aborts the transaction.
+    """
+    def phase(name: str):
+        if job is not None:
+            job.set_phase(name)
+
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    if job is not None:
+        job.attach_connection(conn)
+    try:
+        conn.autocommit = False  # manual transaction
+        with conn.cursor() as cursor:
+            phase("copying")
+            # A) Insert the datasets row
+            dataset_id = insert_dataset(
+                cursor=cursor,
+                filename=filename,
+                metadata=metadata,
+            )
+
+            # B) Stream signals from the upload into TimescaleDB
+            ingest_stats = ingest_signals(
+                cursor=cursor,
+                dataset_id=dataset_id,
+                source=source,
+                job=job,
+            )
+
+            # C) Cache the row count so paging never needs COUNT(*)
+            cursor.execute(
+                "UPDATE datasets SET row_count = %s WHERE dataset_id = %s;",
+                (ingest_stats["rows_inserted"], dataset_id),
+            )
+
+            # D) - G) Pyramid, beats, parabolas, shared lookup rows
+            beat_count, parabola_count = derive_dataset(cursor, dataset_id, metadata, phase)
+
+        phase("committing")
+        conn.commit()
+    except (HTTPException, JobCancelled):
+        conn.rollback()
+        raise
+    except psycopg2.errors.UniqueViolation:
+        # Lost a race with a concurrent upload of the same file
+        conn.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"File '{filename}' already exists in database."
+        )
+    except ValueError as e:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    else:
+        # H) Outside the handlers above: nothing after the commit may roll back or fail the upload
+        post_commit = after_commit(conn, dataset_id, job)
+    finally:
+        if job is not None:
+            job.attach_connection(None)
+        db_pool.putconn(conn)
+
+    return {
+        "dataset_id": dataset_id,
+        "beats": beat_count,
+        "parabolas": parabola_count,
+        **post_commit,
+        **ingest_stats,
+    }
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+
+# Uploads running at the same time; each one holds a pooled connection while it runs
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+# Finished jobs kept around for polling before the oldest are forgotten
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+
+FINISHED_PHASES = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker thread once cancellation was requested."""
+
+
+class Job:
+    """
+    One background task (e.g. a CSV ingest) plus the progress counters
+    /api/jobs/{id} reports. Workers update the counters; readers only copy them.
+    """
+
+    def __init__(self, kind: str, file_name: Optional[str] = None, bytes_total: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.file_name = file_name
+        self.phase = "queued"
+        self.bytes_total = bytes_total
+        self.bytes_read = 0
+        self.rows = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self._cancel = threading.Event()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._done = threading.Event()
+
+    # -------- called from the worker --------
+
+    def set_phase(self, phase: str):
+        self.check_cancelled()
+        self.phase = phase
+
+    def update(self, bytes_read: int, rows: int):
+        self.bytes_read = bytes_read
+        self.rows = rows
+        self.check_cancelled()
+
+    def attach_connection(self, conn):
+        """
+        Remember the running connection so cancel() can interrupt a long query.
+        Detach (conn=None) before the connection goes back to the pool.
+        """
+        with self._conn_lock:
+            self._conn = conn
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled("Job was cancelled")
+
+    # -------- called from request handlers --------
+
+    @property
+    def finished(self) -> bool:
+        return self.phase in FINISHED_PHASES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finished (True) or the timeout passed (False)."""
+        return self._done.wait(timeout)
+
+    def cancel(self) -> bool:
+        if self.finished:
+            return False
+        self._cancel.set()
+        with self._conn_lock:
+            if self._conn is not None and not self._conn.closed:
+                self._conn.cancel()  # aborts the COPY / aggregate currently running
+        return True
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "file_name": self.file_name,
+            "phase": self.phase,
+            "bytes_total": self.bytes_total,
+            "bytes_read": self.bytes_read,
+            "rows": self.rows,
+            "progress": round(self.bytes_read / self.bytes_total, 4) if self.bytes_total else None,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_mb_s": round(self.bytes_read / 1_000_000 / elapsed, 2) if elapsed > 0 else 0.0,
+            "rows_per_s": round(self.rows / elapsed) if elapsed > 0 else 0,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload-job")
+_other_executors = []
+
+
+def _run(job: Job, fn, args, kwargs):
+    if job._cancel.is_set():
+        job.phase = "cancelled"
+        job.finished_at = time.time()
+        job._done.set()
+        return
+    job.started_at = time.time()
+    job.phase = "running"
+    try:
+        job.result = fn(*args, job=job, **kwargs)
+        job.phase = "done"
+    except Exception as e:
+        if job._cancel.is_set():
+            # Either JobCancelled or the QueryCanceled error caused by conn.cancel()
+            job.phase = "cancelled"
+        elif isinstance(e, HTTPException):
+            job.phase = "failed"
+            job.error = e.detail
+            job.status_code = e.status_code
+        else:
+            job.phase = "failed"
+            job.error = str(e)
+            job.status_code = 500
+    finally:
+        job.attach_connection(None)
+        job.finished_at = time.time()
+        job._done.set()
+        print(f"📋 [Job {job.id[:8]}] {job.kind} {job.file_name or ''} → {job.phase}")
+
+
+def submit(job: Job, fn, *args, **kwargs) -> Job:
+    """Queue fn(*args, job=job, **kwargs) on the worker pool."""
+    return submit_to(_executor, job, fn, *args, **kwargs)
+
+
+def submit_to(executor: ThreadPoolExecutor, job: Job, fn, *args, **kwargs) -> Job:
+    """submit() on a pool of its own (see make_executor())."""
+    with _jobs_lock:
+        _jobs[job.id] = job
+        _prune()
+    executor.submit(_run, job, fn, args, kwargs)
+    return job
+
+
+def make_executor(max_workers: int, thread_name_prefix: str) -> ThreadPoolExecutor:
+    """
+    A separate worker pool for jobs that hold their thread for long (e.g. chunked
+    upload sessions waiting for parts), so they never queue ahead of uploads.
+    Shut down together with the shared pool.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    _other_executors.append(executor)
+    return executor
+
+
+def _prune():
+    finished = [j for j in _jobs.values() if j.finished]
+    if len(finished) > JOB_HISTORY:
+        finished.sort(key=lambda j: j.finished_at)
+        for job in finished[: len(finished) - JOB_HISTORY]:
+            del _jobs[job.id]
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> list:
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+
+def shutdown():
+    """Cancel whatever is still queued/running and wait for workers (app shutdown)."""
+    for job in list_jobs():
+        job.cancel()
+    for executor in [_executor] + _other_executors:
+        executor.shutdown(wait=True, cancel_futures=False)
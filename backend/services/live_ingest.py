@@ -0,0 +1,292 @@
+"""
+Live ingest: sensor boxes (or a simulator replaying recorder CSVs) stream rows
+into a pre-registered dataset while it is being recorded.
+
+1) register_live_dataset() creates the datasets row (row_count 0, live_since set).
+2) Each stream connection feeds a LiveBatcher with CSV rows in the recorder
+   layout (no header line). Rows are transformed like an upload
+   (SignalCsvTransformer), gathered into micro-batches of LIVE_BATCH_BYTES or
+   LIVE_BATCH_SECONDS, whichever comes first, and every batch is one COPY +
+   row_count update in its own short transaction, so it is readable at once.
+3) finish_live_dataset() (a background job) builds the pyramid, beats and
+   parabolas, clears live_since and compresses the chunks, like the end of an upload.
+
+The transform and the CSV checks of each piece run in the threadpool, so
+parsing never blocks the event loop every connection (and the async read
+routes) share.
+
+Backpressure: a connection may run at most LIVE_QUEUE_PIECES received pieces
+ahead of the COPY; after that feed() waits, the server stops reading the
+socket and TCP / WebSocket flow control slows the box down. Memory per
+connection stays around LIVE_QUEUE_PIECES pieces plus one batch.
+"""
+import asyncio
+import io
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from db import get_pool, pooled_connection
+from services import live_tail
+from services.csv_validation import CSV_VALIDATE, CsvBlockValidator
+from services.ingest import COPY_COLUMNS, COPY_SIGNALS_SQL, SignalCsvTransformer, after_commit, derive_dataset
+from services.jobs import JobCancelled
+
+# A micro-batch is copied once it holds this many bytes of COPY rows...
+LIVE_BATCH_BYTES = int(os.getenv("LIVE_BATCH_BYTES", str(1 << 20)))
+# ...or once its first row has waited this long (bounds how stale the table is)
+LIVE_BATCH_SECONDS = float(os.getenv("LIVE_BATCH_SECONDS", "0.5"))
+# Received pieces (HTTP chunks / WebSocket messages) buffered ahead of the COPY
+LIVE_QUEUE_PIECES = int(os.getenv("LIVE_QUEUE_PIECES", "16"))
+
+REGISTER_SQL = """
+    INSERT INTO datasets (
+        file_name, file_date, flight_code, box_name, box_color, role, person_name,
+        row_count, live_since
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 0, now())
+    RETURNING dataset_id;
+"""
+# Bumping uploaded_at changes the dataset version, so cached pages of a growing dataset go stale
+APPEND_SQL = """
+    UPDATE datasets SET row_count = row_count + %s, uploaded_at = clock_timestamp()
+    WHERE dataset_id = %s AND live_since IS NOT NULL;
+"""
+
+# Per-dataset counters of this process, reported to live-tail viewers
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def tail_key(dataset_id: int) -> str:
+    """live_tail stream key of a live dataset."""
+    return f"live-{dataset_id}"
+
+
+def stream_status(dataset_id: int) -> dict:
+    with _streams_lock:
+        state = dict(_streams.get(dataset_id, {"connections": 0, "rows": 0, "finished": False}))
+    state["phase"] = "finished" if state["finished"] else "streaming" if state["connections"] else "waiting"
+    return state
+
+
+def _track(dataset_id: int, connections: int = 0, rows: int = 0, finished: bool = False):
+    with _streams_lock:
+        state = _streams.setdefault(dataset_id, {"connections": 0, "rows": 0, "finished": False})
+        state["connections"] += connections
+        state["rows"] += rows
+        state["finished"] = state["finished"] or finished
+
+
+def register_live_dataset(cursor, file_name: str, metadata: dict) -> int:
+    """Insert the datasets row a box will stream into. Returns the new dataset_id."""
+    cursor.execute(
+        REGISTER_SQL,
+        (
+            file_name,
+            metadata.get("file_date"),
+            metadata.get("flight_code"),
+            metadata.get("box_name"),
+            metadata.get("box_color"),
+            metadata.get("role"),
+            metadata.get("person_name"),
+        ),
+    )
+    dataset_id = cursor.fetchone()["dataset_id"]
+    print(f"📡 [Live] Registered dataset_id={dataset_id} ({file_name})")
+    return dataset_id
+
+
+def check_live(cursor, dataset_id: int):
+    """404 if the dataset does not exist, 409 if it is not accepting live rows."""
+    cursor.execute("SELECT live_since FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if row["live_since"] is None:
+        raise HTTPException(status_code=409, detail=f"Dataset {dataset_id} is not streaming.")
+
+
+def copy_batch(dataset_id: int, batch: bytes, rows: int):
+    """COPY one micro-batch and count it on the datasets row, in one short transaction."""
+    with pooled_connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(COPY_SIGNALS_SQL, io.BytesIO(batch), size=len(batch))
+                cursor.execute(APPEND_SQL, (rows, dataset_id))
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=409, detail=f"Dataset {dataset_id} was finished.")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+class LiveBatcher:
+    """
+    One stream connection. The request handler awaits feed() with whatever it
+    received; a consumer task gathers the transformed rows into micro-batches and
+    copies them in the threadpool. close() flushes the rest and returns the counters.
+    """
+
+    def __init__(self, dataset_id: int, batch_bytes: int = LIVE_BATCH_BYTES,
+                 batch_seconds: float = LIVE_BATCH_SECONDS, queue_pieces: int = LIVE_QUEUE_PIECES):
+        self.dataset_id = dataset_id
+        self.batch_bytes = batch_bytes
+        self.batch_seconds = batch_seconds
+        self.transformer = SignalCsvTransformer(
+            None, dataset_id, header=False,
+            on_block=live_tail.copy_block_publisher(tail_key(dataset_id), COPY_COLUMNS),
+            validator=CsvBlockValidator() if CSV_VALIDATE else None,
+        )
+        self.queue = asyncio.Queue(maxsize=queue_pieces)
+        self.rows = 0
+        self.batches = 0
+        self.copy_seconds = 0.0
+        self.max_copy_seconds = 0.0
+        self.error = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        _track(self.dataset_id, connections=1)
+        return self
+
+    async def feed(self, data: bytes):
+        """Queue received CSV bytes; waits while the COPY is LIVE_QUEUE_PIECES pieces behind."""
+        if self.error is not None:
+            raise self.error
+        if not data:
+            return  # empty HTTP chunks are not the end of the stream; close() is
+        # Off the event loop; pieces of one connection are still transformed in order
+        rows = await run_in_threadpool(self.transformer.feed, data)  # ValueError on a malformed row
+        if rows:
+            await self.queue.put(rows)
+
+    async def close(self, complete: bool = True) -> dict:
+        """
+        Flush every queued row and return the connection's counters. A last line
+        without newline is kept only for a complete stream (not after a disconnect
+        or a bad line, where it is most likely cut off).
+        """
+        try:
+            if self.error is None and complete:
+                rows = await run_in_threadpool(self.transformer.feed, b"")
+                if rows:
+                    await self.queue.put(rows)
+        finally:
+            await self.queue.put(None)
+            await self._task
+            _track(self.dataset_id, connections=-1)
+        if self.error is not None:
+            raise self.error
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {
+            "dataset_id": self.dataset_id,
+            "rows": self.rows,
+            "batches": self.batches,
+            "bytes_received": self.transformer.bytes_in,
+            "copy_seconds": round(self.copy_seconds, 3),
+            "max_copy_ms": round(self.max_copy_seconds * 1000, 1),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        done = False
+        try:
+            while not done:
+                pieces, size, deadline = [], 0, None
+                while size < self.batch_bytes:
+                    timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                    try:
+                        piece = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if piece is None:
+                        done = True
+                        break
+                    if deadline is None:
+                        deadline = loop.time() + self.batch_seconds
+                    pieces.append(piece)
+                    size += len(piece)
+                if pieces:
+                    await self._copy(b"".join(pieces))
+        except Exception as e:
+            # Keep taking pieces so feed()/close() never block on a dead consumer
+            self.error = e
+            while not done:
+                done = await self.queue.get() is None
+
+    async def _copy(self, batch: bytes):
+        rows = batch.count(b"\n")
+        started = time.perf_counter()
+        await run_in_threadpool(copy_batch, self.dataset_id, batch, rows)
+        seconds = time.perf_counter() - started
+        self.copy_seconds += seconds
+        self.max_copy_seconds = max(self.max_copy_seconds, seconds)
+        self.rows += rows
+        self.batches += 1
+        _track(self.dataset_id, rows=rows)
+
+
+def finish_live_dataset(dataset_id: int, job=None) -> dict:
+    """
+    Close a live dataset (background job): pyramid, beats, parabolas and the
+    shared lookup rows in one transaction with live_since cleared, then compression.
+    """
+    def phase(name: str):
+        if job is not None:
+            job.set_phase(name)
+
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    if job is not None:
+        job.attach_connection(conn)
+    try:
+        with conn.cursor() as cursor:
+            # Row lock: a flush committing right now finishes first, later ones get 409
+            cursor.execute("""
+                SELECT flight_code, box_name, box_color, role, person_name, file_date, row_count
+                FROM datasets
+                WHERE dataset_id = %s AND live_since IS NOT NULL
+                FOR UPDATE;
+            """, (dataset_id,))
+            metadata = cursor.fetchone()
+            if metadata is None:
+                raise HTTPException(status_code=409, detail=f"Dataset {dataset_id} is not streaming.")
+
+            beat_count, parabola_count = derive_dataset(cursor, dataset_id, metadata, phase)
+            cursor.execute(
+                "UPDATE datasets SET live_since = NULL, uploaded_at = clock_timestamp() WHERE dataset_id = %s;",
+                (dataset_id,),
+            )
+
+        phase("committing")
+        conn.commit()
+    except (HTTPException, JobCancelled):
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Finishing live dataset failed: {e}")
+    else:
+        _track(dataset_id, finished=True)
+        post_commit = after_commit(conn, dataset_id, job)
+    finally:
+        if job is not None:
+            job.attach_connection(None)
+        db_pool.putconn(conn)
+
+    print(f"🏁 [Live] dataset_id={dataset_id} finished ({metadata['row_count']} rows)")
+    return {
+        "dataset_id": dataset_id,
+        "rows": metadata["row_count"],
+        "beats": beat_count,
+        "parabolas": parabola_count,
+        **post_commit,
+    }
@@ -0,0 +1,154 @@
+"""
+Live tail: samples pushed to WebSocket viewers while they are being ingested.
+
+Producers (the ingest COPY, one block at a time) publish NumPy columns under a
+stream key (the job id); every subscribed viewer gets them on its own bounded
+queue, decimates them to the channels and point count it asked for and sends
+binary frames. Nothing is parsed when nobody is watching, and a slow viewer
+loses its oldest batches instead of slowing the ingest down.
+
+Frames use the binary rows layout of /dataset-rows (services/columnar.pack_columns):
+time int64 µs, then each selected channel float64, little-endian, back to back.
+"""
+import asyncio
+import io
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from services.columnar import SIGNAL_CHANNELS, pack_columns
+
+# Batches a viewer may fall behind before its oldest ones are dropped
+LIVE_TAIL_QUEUE = int(os.getenv("LIVE_TAIL_QUEUE", "16"))
+# Default points per frame (each published batch is decimated to at most this many rows)
+LIVE_TAIL_POINTS = int(os.getenv("LIVE_TAIL_POINTS", "500"))
+# Seconds between checks of the producer's state while no batch arrives
+LIVE_TAIL_POLL = float(os.getenv("LIVE_TAIL_POLL", "0.5"))
+
+_subscribers = {}
+_lock = threading.Lock()
+
+
+class Subscription:
+    """One viewer's queue; filled from producer threads, drained on the event loop."""
+
+    def __init__(self, key: str, loop: asyncio.AbstractEventLoop, maxsize: int = LIVE_TAIL_QUEUE):
+        self.key = key
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, columns: dict):
+        """Thread-safe: hand a batch to the viewer's event loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, columns)
+        except RuntimeError:
+            pass  # loop already closed; the viewer is gone
+
+    def _put(self, columns: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(columns)
+
+    async def get(self, timeout: float):
+        """Next batch, or None when nothing arrived within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+@contextmanager
+def subscribe(key: str, maxsize: int = LIVE_TAIL_QUEUE):
+    """Receive the batches published under key for the duration of the with block (call on the event loop)."""
+    subscription = Subscription(key, asyncio.get_running_loop(), maxsize)
+    with _lock:
+        _subscribers.setdefault(key, set()).add(subscription)
+    try:
+        yield subscription
+    finally:
+        with _lock:
+            viewers = _subscribers.get(key)
+            viewers.discard(subscription)
+            if not viewers:
+                del _subscribers[key]
+
+
+def has_subscribers(key: str) -> bool:
+    return key in _subscribers
+
+
+def publish(key: str, columns: dict):
+    """Fan a batch ({"time": int64, channel: float64, ...}) out to the viewers of key."""
+    with _lock:
+        viewers = list(_subscribers.get(key, ()))
+    for subscription in viewers:
+        subscription.push(columns)
+
+
+def parse_copy_block(block: bytes, column_names: list) -> dict:
+    """COPY-ready CSV rows (services/ingest.py) → time + signal channel arrays (NULL as NaN)."""
+    table = pacsv.read_csv(
+        io.BytesIO(block),
+        read_options=pacsv.ReadOptions(column_names=column_names),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=["time"] + SIGNAL_CHANNELS,
+            column_types={"time": pa.int64(), **{name: pa.float64() for name in SIGNAL_CHANNELS}},
+        ),
+    )
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def copy_block_publisher(key: str, column_names: list):
+    """
+    on_block callback for SignalCsvTransformer: publishes each COPY block under key.
+    Errors are reported and swallowed; the live view must never fail an ingest.
+    """
+    def on_block(block: bytes):
+        if not block or not has_subscribers(key):
+            return
+        try:
+            publish(key, parse_copy_block(block, column_names))
+        except Exception as e:
+            print(f"⚠️ [Live tail] {key[:8]}: could not publish block: {e}")
+
+    return on_block
+
+
+def decimate(columns: dict, channels: list, points: int) -> dict:
+    """Every n-th row of time + channels so at most `points` rows remain."""
+    step = max(1, math.ceil(len(columns["time"]) / points))
+    return {name: np.ascontiguousarray(columns[name][::step]) for name in ["time"] + channels}
+
+
+def encode_frame(columns: dict, channels: list, points: int = LIVE_TAIL_POINTS) -> bytes:
+    return pack_columns(decimate(columns, channels, points))
+
+
+async def serve_tail(websocket, key: str, channels: list, points: int, status, start: dict):
+    """
+    Send an accepted WebSocket everything published under key until status()["finished"].
+    `status()` returns {"phase", "rows", "finished", ...}; phase changes are sent as text
+    frames, batches as binary frames, and the last status as {"event": "end", ...}.
+    """
+    state = status()
+    with subscribe(key) as subscription:
+        await websocket.send_json({
+            "event": "start", **start, "columns": ["time"] + channels, "phase": state["phase"],
+        })
+        phase = state["phase"]
+        while not state["finished"]:
+            columns = await subscription.get(timeout=LIVE_TAIL_POLL)
+            if columns is not None:
+                await websocket.send_bytes(encode_frame(columns, channels, points))
+            state = status()
+            if state["phase"] != phase and not state["finished"]:
+                phase = state["phase"]
+                await websocket.send_json({"event": "phase", "phase": phase, "rows": state["rows"]})
+        await websocket.send_json({"event": "end", **state, "dropped": subscription.dropped})
@@ -0,0 +1,210 @@
+"""
+Parabola segmentation for parabolic-flight recordings.
+
+Each parabola is a micro-gravity (~0 g) phase, framed by the hyper-gravity
+pull-up before it and the pull-out after it. Runs as an ingest stage
+(services/ingest.run_ingest) and can be re-run for older datasets:
+
+    python -m services.parabolas 3 7 12     # specific datasets
+    python -m services.parabolas --all      # every dataset
+"""
+import argparse
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException
+from psycopg2.extras import execute_values
+from scipy.ndimage import uniform_filter1d
+
+from services.columnar import copy_columns
+
+# Accelerometer axes of the three IMUs (alpha / beta / gamma)
+SENSORS = ["alpha", "beta", "gamma"]
+ACCEL_CHANNELS = [f"a{axis}_{sensor}" for sensor in SENSORS for axis in "xyz"]
+
+SEGMENT_BUCKET_US = 100_000      # 100 ms resolution (a pyramid level)
+SMOOTHING_SECONDS = 1.0
+ZERO_G_BELOW = 0.3               # |a| / cruise |a| under this is micro-gravity
+HYPER_G_ABOVE = 1.3              # ... over this is pull-up / pull-out
+MIN_ZERO_G_SECONDS = 10.0        # shorter dips are turbulence, not a parabola
+MERGE_GAP_SECONDS = 2.0          # zero-g runs this close together are one parabola
+HYPER_G_SEARCH_SECONDS = 5.0     # how far from the zero-g edges the hyper-g phase may end/start
+
+
+def load_accel_buckets(cursor, dataset_id: int) -> dict:
+    """
+    100 ms means of every accelerometer axis. They come from the pyramid
+    (already aggregated at ingest); datasets without a pyramid are bucketed
+    from signals in SQL, so raw rows never leave the database either way.
+    """
+    means = [f"COALESCE({name}_mean, 'NaN'::float8)" for name in ACCEL_CHANNELS]
+    buckets = copy_columns(cursor, f"""
+        SELECT bucket, {", ".join(means)}
+        FROM signal_pyramid
+        WHERE dataset_id = %s AND bucket_width = %s
+        ORDER BY bucket
+    """, (dataset_id, SEGMENT_BUCKET_US), ACCEL_CHANNELS)
+    if len(buckets["time"]):
+        return buckets
+
+    averages = [f"COALESCE(AVG({name}), 'NaN'::float8)" for name in ACCEL_CHANNELS]
+    return copy_columns(cursor, f"""
+        SELECT time_bucket(%s::bigint, time) AS bucket, {", ".join(averages)}
+        FROM signals
+        WHERE dataset_id = %s
+        GROUP BY bucket
+        ORDER BY bucket
+    """, (SEGMENT_BUCKET_US, dataset_id), ACCEL_CHANNELS)
+
+
+def gravity_level(buckets: dict) -> np.ndarray:
+    """
+    Acceleration magnitude in units of the recording's cruise level.
+    The magnitude does not depend on how the boxes are mounted, and dividing
+    by the median (level flight dominates a campaign) makes it unit-free.
+    """
+    magnitudes = np.vstack([
+        np.sqrt(sum(buckets[f"a{axis}_{sensor}"] ** 2 for axis in "xyz"))
+        for sensor in SENSORS
+    ])
+    magnitude = np.nanmean(magnitudes, axis=0) if np.isfinite(magnitudes).any() else magnitudes[0]
+    cruise = np.nanmedian(magnitude) if np.isfinite(magnitude).any() else np.nan
+    if not cruise or cruise != cruise:
+        return np.full(len(magnitude), np.nan)
+    return magnitude / cruise
+
+
+def _runs(mask: np.ndarray):
+    """(start, stop) index pairs of consecutive True values."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def segment_parabolas(times: np.ndarray, g: np.ndarray, bucket_us: int = SEGMENT_BUCKET_US) -> list:
+    """
+    Find parabolas in a bucketed gravity-level series (vectorized run detection).
+    Returns dicts with start_time / end_time (pull-up start → pull-out end) and
+    zero_g_start / zero_g_end, all in microseconds, end exclusive.
+    """
+    if len(times) == 0:
+        return []
+    filled = np.where(np.isnan(g), 1.0, g)
+    smooth = uniform_filter1d(filled, size=max(1, int(SMOOTHING_SECONDS * 1_000_000 / bucket_us)))
+
+    zero_g = smooth < ZERO_G_BELOW
+    starts, stops = _runs(zero_g)
+    if len(starts) == 0:
+        return []
+    zs, ze = times[starts], times[stops - 1] + bucket_us
+    # Lowest level per run: samples outside runs are +inf, so each reduceat slice sees only its run
+    min_g = np.minimum.reduceat(np.where(zero_g, smooth, np.inf), starts)
+
+    # Merge runs split by a short blip
+    first_of_group = np.flatnonzero(np.concatenate([[True], zs[1:] - ze[:-1] > MERGE_GAP_SECONDS * 1_000_000]))
+    zs = zs[first_of_group]
+    ze = np.maximum.reduceat(ze, first_of_group)
+    min_g = np.minimum.reduceat(min_g, first_of_group)
+
+    keep = ze - zs >= MIN_ZERO_G_SECONDS * 1_000_000
+    zs, ze, min_g = zs[keep], ze[keep], min_g[keep]
+
+    # Attach the hyper-g phase that ends just before / starts just after each zero-g phase
+    hs, he = _runs(smooth > HYPER_G_ABOVE)
+    hyper_start, hyper_end = times[hs], times[np.maximum(he - 1, 0)] + bucket_us
+    search_us = HYPER_G_SEARCH_SECONDS * 1_000_000
+
+    parabolas = []
+    for zero_start, zero_end, lowest in zip(zs.tolist(), ze.tolist(), min_g.tolist()):
+        before = np.flatnonzero((hyper_end <= zero_start) & (hyper_end >= zero_start - search_us))
+        after = np.flatnonzero((hyper_start >= zero_end) & (hyper_start <= zero_end + search_us))
+        parabolas.append({
+            "start_time": int(hyper_start[before[-1]]) if len(before) else int(zero_start),
+            "zero_g_start": int(zero_start),
+            "zero_g_end": int(zero_end),
+            "end_time": int(hyper_end[after[0]]) if len(after) else int(zero_end),
+            "min_g": round(float(lowest), 4),
+        })
+    return parabolas
+
+
+def store_parabolas(cursor, dataset_id: int, parabolas: list) -> int:
+    """Replace the dataset's parabolas and keep datasets.parabola_count (used by /api/stats) in step."""
+    cursor.execute("DELETE FROM parabolas WHERE dataset_id = %s;", (dataset_id,))
+    if parabolas:
+        execute_values(cursor, """
+            INSERT INTO parabolas (dataset_id, parabola_no, start_time, end_time, zero_g_start, zero_g_end, min_g)
+            VALUES %s
+        """, [
+            (dataset_id, number, p["start_time"], p["end_time"], p["zero_g_start"], p["zero_g_end"], p["min_g"])
+            for number, p in enumerate(parabolas, start=1)
+        ])
+    cursor.execute(
+        "UPDATE datasets SET parabola_count = %s WHERE dataset_id = %s;",
+        (len(parabolas), dataset_id),
+    )
+    return len(parabolas)
+
+
+def run_parabola_segmentation(cursor, dataset_id: int) -> int:
+    """Segment and persist parabolas for one dataset (inside the caller's transaction)."""
+    print(f"🛩 [Parabolas] Segmenting dataset_id={dataset_id}...")
+    buckets = load_accel_buckets(cursor, dataset_id)
+    parabolas = segment_parabolas(buckets["time"], gravity_level(buckets))
+    count = store_parabolas(cursor, dataset_id, parabolas)
+    print(f"✔ [Parabolas] {count} parabola(s) stored")
+    return count
+
+
+def list_parabolas(cursor, dataset_id: int) -> list:
+    cursor.execute("""
+        SELECT parabola_no, start_time, end_time, zero_g_start, zero_g_end, min_g
+        FROM parabolas
+        WHERE dataset_id = %s
+        ORDER BY parabola_no;
+    """, (dataset_id,))
+    return cursor.fetchall()
+
+
+def parabola_window(cursor, dataset_id: int, parabola: int,
+                    start: Optional[int] = None, end: Optional[int] = None):
+    """
+    [start, end) of parabola N (primary-key lookup), intersected with an explicit
+    start/end if given. Raises 404 when the dataset has no such parabola.
+    """
+    cursor.execute(
+        "SELECT start_time, end_time FROM parabolas WHERE dataset_id = %s AND parabola_no = %s;",
+        (dataset_id, parabola),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Parabola {parabola} not found")
+    window_start = row["start_time"] if start is None else max(start, row["start_time"])
+    window_end = row["end_time"] if end is None else min(end, row["end_time"])
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="start/end lie outside the parabola")
+    return window_start, window_end
+
+
+def main():
+    from db import close_pool, pooled_connection
+
+    parser = argparse.ArgumentParser(description="(Re)segment parabolas for already ingested datasets.")
+    parser.add_argument("dataset_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            if args.all:
+                cursor.execute("SELECT dataset_id FROM datasets ORDER BY dataset_id;")
+                dataset_ids = [row["dataset_id"] for row in cursor.fetchall()]
+            else:
+                dataset_ids = args.dataset_ids
+            for dataset_id in dataset_ids:
+                run_parabola_segmentation(cursor, dataset_id)
+                conn.commit()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
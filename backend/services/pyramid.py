@@ -0,0 +1,134 @@
+import argparse
+import math
+from typing import Optional
+
+from services.columnar import SIGNAL_CHANNELS, copy_columns
+
+# Bucket widths in microseconds, finest first: 10 ms / 100 ms / 1 s.
+# Raw rows act as the finest level, so windows too short for 10 ms buckets read signals directly.
+PYRAMID_LEVELS = [10_000, 100_000, 1_000_000]
+
+# {channel}_count = the channel's non-null samples in the bucket (its mean's weight in rollups)
+_STATS = ("min", "max", "mean", "count")
+_PYRAMID_COLUMNS = [f"{name}_{stat}" for name in SIGNAL_CHANNELS for stat in _STATS]
+
+
+def build_pyramid(cursor, dataset_id: int) -> dict:
+    """
+    Materialise every pyramid level for one dataset (run inside the ingest transaction).
+    The first level aggregates raw signals; each coarser level is rolled up from the
+    previous one, so the whole pass reads the raw rows only once.
+    Returns {bucket_width: rows written}.
+    """
+    column_list = ", ".join(_PYRAMID_COLUMNS)
+    written = {}
+
+    raw_aggregates = []
+    for name in SIGNAL_CHANNELS:
+        raw_aggregates += [f"MIN({name})", f"MAX({name})", f"AVG({name})", f"COUNT({name})"]
+    cursor.execute(f"""
+        INSERT INTO signal_pyramid (dataset_id, bucket_width, bucket, samples, {column_list})
+        SELECT %s, %s, time_bucket(%s::bigint, time) AS bucket, COUNT(*), {", ".join(raw_aggregates)}
+        FROM signals
+        WHERE dataset_id = %s
+        GROUP BY bucket;
+    """, (dataset_id, PYRAMID_LEVELS[0], PYRAMID_LEVELS[0], dataset_id))
+    written[PYRAMID_LEVELS[0]] = cursor.rowcount
+
+    rollups = []
+    for name in SIGNAL_CHANNELS:
+        rollups += [
+            f"MIN({name}_min)",
+            f"MAX({name}_max)",
+            # Mean of means weighted by how many non-null samples of the channel each finer bucket holds
+            f"SUM({name}_mean * {name}_count) / NULLIF(SUM({name}_count), 0)",
+            f"SUM({name}_count)",
+        ]
+    for finer, coarser in zip(PYRAMID_LEVELS, PYRAMID_LEVELS[1:]):
+        cursor.execute(f"""
+            INSERT INTO signal_pyramid (dataset_id, bucket_width, bucket, samples, {column_list})
+            SELECT %s, %s, time_bucket(%s::bigint, bucket) AS coarse_bucket, SUM(samples), {", ".join(rollups)}
+            FROM signal_pyramid
+            WHERE dataset_id = %s AND bucket_width = %s
+            GROUP BY coarse_bucket;
+        """, (dataset_id, coarser, coarser, dataset_id, finer))
+        written[coarser] = cursor.rowcount
+
+    return written
+
+
+def rebuild_pyramid(cursor, dataset_id: int) -> dict:
+    """Drop and rebuild a dataset's pyramid from its signals (e.g. after a schema change)."""
+    cursor.execute("DELETE FROM signal_pyramid WHERE dataset_id = %s;", (dataset_id,))
+    return build_pyramid(cursor, dataset_id)
+
+
+def pick_level(start: int, end: int, buckets: int) -> Optional[int]:
+    """
+    Coarsest level that still gives at least `buckets` buckets over [start, end).
+    None means the window is too short for any level and raw rows should be used.
+    """
+    span = end - start
+    chosen = None
+    for width in PYRAMID_LEVELS:
+        if span / width >= buckets:
+            chosen = width
+    return chosen
+
+
+def minmax_from_pyramid(cursor, dataset_id: int, channels: list, start: int, end: int, buckets: int, level: int) -> dict:
+    """
+    Same output as downsample.minmax_buckets(), but re-buckets a precomputed level.
+    The chosen level has fewer than 10x `buckets` rows in the window, so the
+    cost depends on the point budget, not the recording length.
+    """
+    width = max(level, math.ceil((end - start) / buckets))
+    aggregates = []
+    columns = []
+    for name in channels:
+        aggregates.append(f"COALESCE(MIN({name}_min), 'NaN'::float8)")
+        aggregates.append(f"COALESCE(MAX({name}_max), 'NaN'::float8)")
+        columns += [f"{name}_min", f"{name}_max"]
+
+    sql = f"""
+        SELECT time_bucket(%s::bigint, GREATEST(bucket, %s), %s::bigint) AS target, {", ".join(aggregates)}
+        FROM signal_pyramid
+        WHERE dataset_id = %s AND bucket_width = %s AND bucket >= %s AND bucket < %s
+        GROUP BY target
+        ORDER BY target
+    """
+    # The level bucket straddling `start` is folded into the first target bucket
+    params = (width, start, start % width, dataset_id, level, start - start % level, end)
+    result = copy_columns(cursor, sql, params, columns)
+    result["bucket_width"] = width
+    return result
+
+
+def main():
+    from db import close_pool, pooled_connection
+
+    parser = argparse.ArgumentParser(description="Rebuild the downsampling pyramid of datasets.")
+    parser.add_argument("dataset_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            if args.all:
+                # Archived datasets have no signals rows left and live ones get theirs at finish
+                cursor.execute("""
+                    SELECT dataset_id FROM datasets
+                    WHERE archived_at IS NULL AND live_since IS NULL
+                    ORDER BY dataset_id;
+                """)
+                dataset_ids = [row["dataset_id"] for row in cursor.fetchall()]
+            else:
+                dataset_ids = args.dataset_ids
+            for dataset_id in dataset_ids:
+                print(f"🔺 dataset_id={dataset_id}: {rebuild_pyramid(cursor, dataset_id)}")
+                conn.commit()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Text exports of a whole recording (NDJSON / CSV) with flat memory.
+
+- NDJSON: a named (server-side) cursor; rows arrive STREAM_ITERSIZE at a time
+  as plain tuples, are encoded and sent, and the next batch is fetched only
+  when the client has taken the previous one.
+- CSV: `COPY (SELECT ...) TO STDOUT` passthrough. PostgreSQL formats the rows;
+  a producer thread runs the COPY into a bounded queue that the response drains,
+  so a slow client pauses the COPY instead of buffering it.
+
+Archived datasets (services/archive.py) are streamed from their Parquet file, one row group at a time.
+"""
+import io
+import json
+import math
+import os
+import queue
+import threading
+import uuid
+from typing import Optional
+
+import psycopg2.extensions
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from services import archive
+from services.columnar import SIGNAL_CHANNELS
+
+# Rows per FETCH from the server-side cursor
+STREAM_ITERSIZE = int(os.getenv("STREAM_ITERSIZE", "5000"))
+# Bytes of COPY output gathered before handing a chunk to the response
+COPY_STREAM_CHUNK = int(os.getenv("COPY_STREAM_CHUNK", str(256 * 1024)))
+# Chunks the COPY may run ahead of the client
+COPY_STREAM_QUEUE = int(os.getenv("COPY_STREAM_QUEUE", "8"))
+
+ROW_COLUMNS = ["dataset_id", "time", "header"] + SIGNAL_CHANNELS + ["frame_separator"]
+
+
+def json_safe(values: dict) -> dict:
+    """
+    NaN / ±Infinity samples (COPY stores them as written in the CSV) are not valid
+    JSON: send them as null, like NULL samples.
+    """
+    return {
+        name: None if isinstance(value, float) and not math.isfinite(value) else value
+        for name, value in values.items()
+    }
+
+
+def rows_sql(start: Optional[int], end: Optional[int]):
+    """SELECT of every column for one dataset / window, ordered by time, and its params (without dataset_id)."""
+    conditions = ["dataset_id = %s"]
+    params = []
+    if start is not None:
+        conditions.append("time >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("time < %s")
+        params.append(end)
+    sql = f"SELECT {', '.join(ROW_COLUMNS)} FROM signals WHERE {' AND '.join(conditions)} ORDER BY time"
+    return sql, params
+
+
+def iter_ndjson(conn, dataset_id: int, start: Optional[int] = None, end: Optional[int] = None,
+                itersize: int = STREAM_ITERSIZE):
+    """Yield NDJSON (one row object per line), one encoded batch per server-side FETCH."""
+    if archive.is_archived(dataset_id):
+        yield from _archived_ndjson(dataset_id, start, end)
+        return
+
+    sql, params = rows_sql(start, end)
+    # Named cursor = DECLARE ... CURSOR on the server; tuples instead of RealDictRow
+    cursor = conn.cursor(name=f"rows_{uuid.uuid4().hex}", cursor_factory=psycopg2.extensions.cursor)
+    cursor.itersize = itersize
+    try:
+        cursor.execute(sql, [dataset_id] + params)
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            yield "".join(
+                json.dumps(json_safe(dict(zip(ROW_COLUMNS, row))), allow_nan=False) + "\n" for row in rows
+            ).encode()
+    finally:
+        cursor.close()
+        conn.rollback()  # end the read transaction the cursor lived in
+
+
+def _archived_ndjson(dataset_id: int, start: Optional[int], end: Optional[int]):
+    names = ROW_COLUMNS[1:]
+    for table in archive.iter_row_groups(dataset_id, names, start, end):
+        yield "".join(
+            json.dumps(json_safe({"dataset_id": dataset_id, **row}), allow_nan=False) + "\n"
+            for row in table.select(names).to_pylist()
+        ).encode()
+
+
+class _QueueWriter:
+    """File object for copy_expert() that hands COPY output to the response in chunks."""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event, chunk_size: int = COPY_STREAM_CHUNK):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        if self.cancelled.is_set():
+            raise IOError("Client went away")
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self.chunks.put(bytes(self._buffer))  # blocks while the client is behind
+            self._buffer = bytearray()
+
+
+def iter_copy_csv(conn, dataset_id: int, start: Optional[int] = None, end: Optional[int] = None):
+    """Yield `COPY (SELECT ...) TO STDOUT WITH CSV HEADER` output as it is produced."""
+    if archive.is_archived(dataset_id):
+        yield from _archived_csv(dataset_id, start, end)
+        return
+
+    sql, params = rows_sql(start, end)
+    with conn.cursor() as cursor:
+        query = cursor.mogrify(sql, [dataset_id] + params).decode()
+    copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT CSV, HEADER)"
+
+    chunks = queue.Queue(maxsize=COPY_STREAM_QUEUE)
+    cancelled = threading.Event()
+
+    def produce():
+        writer = _QueueWriter(chunks, cancelled)
+        try:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(copy_sql, writer)
+            writer.flush()
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    producer = threading.Thread(target=produce, name=f"copy-csv-{dataset_id}", daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        if producer.is_alive():
+            # Client disconnected: stop the COPY, then unblock the producer until it exits
+            cancelled.set()
+            conn.cancel()
+            while producer.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        producer.join()
+        conn.rollback()
+
+
+def _archived_csv(dataset_id: int, start: Optional[int], end: Optional[int]):
+    names = ROW_COLUMNS[1:]
+    header = True
+    for table in archive.iter_row_groups(dataset_id, names, start, end):
+        table = table.select(names)
+        table = table.add_column(0, "dataset_id", pa.array([dataset_id] * table.num_rows, type=pa.int32()))
+        buffer = io.BytesIO()
+        pacsv.write_csv(table, buffer, pacsv.WriteOptions(include_header=header, quoting_style="none"))
+        header = False
+        yield buffer.getvalue()
+    if header:
+        yield (",".join(ROW_COLUMNS) + "\n").encode()  # empty window: header only, like COPY
@@ -0,0 +1,182 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from services import archive
+from services.columnar import SIGNAL_CHANNELS
+from services.http_cache import dataset_version
+
+DEFAULT_PERCENTILES = [5.0, 25.0, 50.0, 75.0, 95.0]
+# Full-dataset results kept in memory (they never change after ingest)
+SIGNAL_STATS_MEMO_SIZE = int(os.getenv("SIGNAL_STATS_MEMO_SIZE", "256"))
+
+
+class LRUCache:
+    """Small thread-safe LRU keyed by any hashable, bounded by entry count."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_stats_memo = LRUCache(SIGNAL_STATS_MEMO_SIZE)
+
+
+def parse_percentiles(percentiles: Optional[str]) -> list:
+    """Turn "5,50,95" into [5.0, 50.0, 95.0]; each must lie in [0, 100]."""
+    if not percentiles:
+        return list(DEFAULT_PERCENTILES)
+    values = []
+    for part in percentiles.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = float(part)
+        except ValueError:
+            raise ValueError(f"Invalid percentile '{part}'")
+        if not 0 <= value <= 100:
+            raise ValueError(f"Percentile {part} is outside 0..100")
+        values.append(value)
+    return values
+
+
+def get_dataset_version(cursor, dataset_id: int) -> Optional[str]:
+    """Version string of an ingested dataset (see http_cache.dataset_version), None if missing."""
+    cursor.execute("SELECT uploaded_at FROM datasets WHERE dataset_id = %s;", (dataset_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    if row["uploaded_at"] is None:
+        return str(dataset_id)
+    return dataset_version(dataset_id, row["uploaded_at"])
+
+
+def channel_stats_sql(channels: list) -> str:
+    """
+    One aggregate pass over the window for every channel. Each channel gets
+    count / mean / std / min / max / RMS plus percentile_cont over an array of
+    fractions, so PostgreSQL does the whole job and only one row comes back.
+    Channels are whitelisted by parse_channels() before they reach this SQL.
+    """
+    aggregates = []
+    for name in channels:
+        aggregates += [
+            f"COUNT({name}) AS {name}__count",
+            f"AVG({name}) AS {name}__mean",
+            f"STDDEV_SAMP({name}) AS {name}__std",
+            f"MIN({name}) AS {name}__min",
+            f"MAX({name}) AS {name}__max",
+            f"SQRT(AVG({name} * {name})) AS {name}__rms",
+            f"PERCENTILE_CONT(%(fractions)s::float8[]) WITHIN GROUP (ORDER BY {name}) AS {name}__pct",
+        ]
+    return f"""
+        SELECT COUNT(*) AS samples, MIN(time) AS first_time, MAX(time) AS last_time,
+               {", ".join(aggregates)}
+        FROM signals
+        WHERE dataset_id = %(dataset_id)s
+          AND (%(start)s::bigint IS NULL OR time >= %(start)s)
+          AND (%(end)s::bigint IS NULL OR time < %(end)s)
+    """
+
+
+def compute_channel_stats(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    percentiles: list = DEFAULT_PERCENTILES,
+) -> dict:
+    """Summary statistics per channel for a dataset or a [start, end) window (microseconds)."""
+    if archive.is_archived(dataset_id):
+        return archive.channel_stats(dataset_id, channels, start, end, percentiles)
+    cursor.execute(channel_stats_sql(channels), {
+        "dataset_id": dataset_id,
+        "start": start,
+        "end": end,
+        "fractions": [p / 100 for p in percentiles],
+    })
+    row = cursor.fetchone()
+
+    result = {}
+    for name in channels:
+        pct = row[f"{name}__pct"] or [None] * len(percentiles)
+        result[name] = {
+            "count": row[f"{name}__count"],
+            "mean": _as_float(row[f"{name}__mean"]),
+            "std": _as_float(row[f"{name}__std"]),
+            "min": _as_float(row[f"{name}__min"]),
+            "max": _as_float(row[f"{name}__max"]),
+            "rms": _as_float(row[f"{name}__rms"]),
+            "percentiles": {f"p{p:g}": _as_float(v) for p, v in zip(percentiles, pct)},
+        }
+    return {
+        "samples": row["samples"],
+        "first_time": row["first_time"],
+        "last_time": row["last_time"],
+        "channels": result,
+    }
+
+
+def _as_float(value) -> Optional[float]:
+    # AVG() returns Decimal for integer input and NaN must not reach the JSON encoder
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+def signal_stats(
+    cursor,
+    dataset_id: int,
+    channels: list = SIGNAL_CHANNELS,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    percentiles: list = DEFAULT_PERCENTILES,
+) -> Optional[dict]:
+    """
+    compute_channel_stats() with whole-dataset results memoized per
+    (dataset version, channels, percentiles). Returns None for an unknown dataset.
+    """
+    version = get_dataset_version(cursor, dataset_id)
+    if version is None:
+        return None
+
+    memo_key = None
+    if start is None and end is None:
+        memo_key = (version, tuple(channels), tuple(percentiles))
+        cached = _stats_memo.get(memo_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    stats = compute_channel_stats(cursor, dataset_id, channels, start, end, percentiles)
+    stats = {"dataset_id": dataset_id, "start": start, "end": end, **stats}
+    if memo_key is not None:
+        _stats_memo.put(memo_key, stats)
+    return {**stats, "cached": False}
+
+
+def clear_memo():
+    """Forget memoized results (dev reset reuses dataset ids)."""
+    _stats_memo.clear()
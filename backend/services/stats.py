@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+from db import pooled_connection
+from db_async import async_pooled_connection
+
+# Seconds a computed /api/stats answer is served from memory.
+# Ingest and dev reset invalidate it explicitly; the TTL only bounds staleness
+# for changes made by other processes (other uvicorn workers, psql, ...).
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+
+# One round-trip for every card on the upload page.
+# parabolas is the sum of the per-dataset count stored at ingest, so it never scans segments.
+STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM datasets)                        AS datasets,
+        (SELECT COUNT(*) FROM persons)                         AS persons,
+        (SELECT COUNT(*) FROM flights)                         AS flights,
+        (SELECT COUNT(*) FROM boxes)                           AS boxes,
+        (SELECT COALESCE(SUM(parabola_count), 0) FROM datasets) AS parabolas;
+"""
+
+_lock = threading.Lock()
+_cached = None
+_cached_at = 0.0
+_generation = 0
+
+
+def _query_stats() -> dict:
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(STATS_SQL)
+            row = cursor.fetchone()
+    return {key: int(value) for key, value in row.items()}
+
+
+async def _query_stats_async() -> dict:
+    async with async_pooled_connection() as conn:
+        cursor = await conn.execute(STATS_SQL)
+        row = await cursor.fetchone()
+    return {key: int(value) for key, value in row.items()}
+
+
+def _fresh():
+    """(cached counts or None, generation to store a new result under)."""
+    with _lock:
+        if _cached is not None and time.monotonic() - _cached_at < STATS_CACHE_TTL:
+            return dict(_cached), _generation
+        return None, _generation
+
+
+def _store(stats: dict, generation: int) -> dict:
+    global _cached, _cached_at
+    with _lock:
+        # Skip storing if an invalidation arrived while we were querying
+        if generation == _generation:
+            _cached, _cached_at = stats, time.monotonic()
+    return dict(stats)
+
+
+def get_stats() -> dict:
+    """Platform counts, from the in-process cache when it is fresh."""
+    cached, generation = _fresh()
+    if cached is not None:
+        return cached
+    return _store(_query_stats(), generation)
+
+
+async def get_stats_async() -> dict:
+    """get_stats() for the async route: same cache, the query is awaited on the async pool."""
+    cached, generation = _fresh()
+    if cached is not None:
+        return cached
+    return _store(await _query_stats_async(), generation)
+
+
+def invalidate():
+    """Drop the cached counts; call after anything that adds or removes datasets."""
+    global _cached, _generation
+    with _lock:
+        _cached = None
+        _generation += 1
@@ -0,0 +1,134 @@
+"""
+Native TimescaleDB compression of the signals hypertable.
+
+signals is partitioned by dataset_id first (every recording gets its own chunks),
+then by relative time in 1 h slices, so a dataset never shares a chunk with
+another one and its chunks are final as soon as the upload commits.
+run_ingest compresses them right after the commit; older datasets can be
+(de)compressed by hand:
+
+    python -m services.storage compress 3 7 12
+    python -m services.storage compress --all
+    python -m services.storage decompress 3
+    python -m services.storage sizes --all
+"""
+import argparse
+import os
+
+import psycopg2
+
+# Compress a dataset's chunks as the last step of every upload
+SIGNALS_COMPRESSION = os.getenv("SIGNALS_COMPRESSION", "1") == "1"
+
+# Chunks holding one dataset (primary dimension dataset_id, one id per chunk)
+DATASET_CHUNKS_SQL = """
+    SELECT format('%%I.%%I', chunk_schema, chunk_name) AS chunk, is_compressed
+    FROM timescaledb_information.chunks
+    WHERE hypertable_name = 'signals'
+      AND range_start_integer <= %s AND range_end_integer > %s
+    ORDER BY chunk_name;
+"""
+
+
+def dataset_chunks(cursor, dataset_id: int) -> list:
+    cursor.execute(DATASET_CHUNKS_SQL, (dataset_id, dataset_id))
+    return cursor.fetchall()
+
+
+def compress_dataset(cursor, dataset_id: int) -> int:
+    """Compress every not yet compressed chunk of one dataset. Returns the number compressed."""
+    chunks = [row["chunk"] for row in dataset_chunks(cursor, dataset_id) if not row["is_compressed"]]
+    for chunk in chunks:
+        cursor.execute("SELECT compress_chunk(%s::regclass, if_not_compressed => TRUE);", (chunk,))
+    return len(chunks)
+
+
+def decompress_dataset(cursor, dataset_id: int) -> int:
+    """Undo compress_dataset (e.g. before rewriting a dataset's rows). Returns the number decompressed."""
+    chunks = [row["chunk"] for row in dataset_chunks(cursor, dataset_id) if row["is_compressed"]]
+    for chunk in chunks:
+        cursor.execute("SELECT decompress_chunk(%s::regclass, if_compressed => TRUE);", (chunk,))
+    return len(chunks)
+
+
+def drop_dataset_chunks(cursor, dataset_id: int) -> int:
+    """
+    Delete a dataset's signals by dropping its chunks: no row-by-row DELETE,
+    and no decompression first when they are compressed.
+    """
+    chunks = dataset_chunks(cursor, dataset_id)
+    for row in chunks:
+        cursor.execute(f"DROP TABLE {row['chunk']};")
+    return len(chunks)
+
+
+def dataset_size(cursor, dataset_id: int) -> dict:
+    """On-disk bytes of one dataset's chunks (table + indexes + TOAST), compressed or not."""
+    chunks = dataset_chunks(cursor, dataset_id)
+    if not chunks:
+        return {"chunks": 0, "compressed_chunks": 0, "total_bytes": 0}
+    cursor.execute("""
+        SELECT COALESCE(SUM(total_bytes), 0)::bigint AS total_bytes
+        FROM chunks_detailed_size('signals')
+        WHERE format('%%I.%%I', chunk_schema, chunk_name) = ANY(%s);
+    """, ([row["chunk"] for row in chunks],))
+    return {
+        "chunks": len(chunks),
+        "compressed_chunks": sum(1 for row in chunks if row["is_compressed"]),
+        "total_bytes": cursor.fetchone()["total_bytes"],
+    }
+
+
+def compress_after_ingest(conn, dataset_id: int):
+    """
+    Post-commit ingest step: compress the new dataset's chunks in their own transaction.
+    The upload is already committed, so a failure here (e.g. a TimescaleDB build
+    without compression) is only logged; the dataset stays readable uncompressed.
+    """
+    if not SIGNALS_COMPRESSION:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            before = dataset_size(cursor, dataset_id)["total_bytes"]
+            compressed = compress_dataset(cursor, dataset_id)
+            after = dataset_size(cursor, dataset_id)["total_bytes"]
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️ [Compression] dataset_id={dataset_id} left uncompressed: {e}")
+        return None
+
+    ratio = round(before / after, 2) if after else None
+    print(f"🗜 [Compression] dataset_id={dataset_id}: {compressed} chunk(s), {before} → {after} bytes (x{ratio})")
+    return {"chunks": compressed, "bytes_before": before, "bytes_after": after}
+
+
+def main():
+    from db import close_pool, pooled_connection
+
+    parser = argparse.ArgumentParser(description="Compress / decompress / size the signals chunks of datasets.")
+    parser.add_argument("action", choices=["compress", "decompress", "sizes"])
+    parser.add_argument("dataset_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            if args.all:
+                cursor.execute("SELECT dataset_id FROM datasets ORDER BY dataset_id;")
+                dataset_ids = [row["dataset_id"] for row in cursor.fetchall()]
+            else:
+                dataset_ids = args.dataset_ids
+            for dataset_id in dataset_ids:
+                if args.action == "compress":
+                    print(f"🗜 dataset_id={dataset_id}: {compress_dataset(cursor, dataset_id)} chunk(s) compressed")
+                elif args.action == "decompress":
+                    print(f"📂 dataset_id={dataset_id}: {decompress_dataset(cursor, dataset_id)} chunk(s) decompressed")
+                else:
+                    print(f"💾 dataset_id={dataset_id}: {dataset_size(cursor, dataset_id)}")
+                conn.commit()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ export default function DatasetPage() {
   const [page, setPage] = useState(1);
   const limit = 200;
   const [totalRows, setTotalRows] = useState(0);
+  // Keyset cursors: cursors[n] is the after_time that loads page n + 1
+  const [cursors, setCursors] = useState<(number | null)[]>([null]);
 
   // Fetch metadata + rows
   // useEffect(() => {
@@ -66,21 +68,31 @@ export default function DatasetPage() {
 }, [id]);  // ONLY ID
 
 useEffect(() => {
-  if (!id) return;
+  // Wait for the metadata: its version pins the row URLs to this recording (browser-cacheable)
+  if (!id || !meta) return;
 
   async function loadRows() {
     try {
       setLoading(true);
-      const offset = (page - 1) * limit;
+      const afterTime = cursors[page - 1];
+      let query = afterTime == null ? "" : `&after_time=${afterTime}`;
+      if (meta.version) query += `&v=${meta.version}`;
 
       const res = await fetch(
-        `http://127.0.0.1:8000/api/dataset-rows/${id}?offset=${offset}&limit=${limit}`
+        `http://127.0.0.1:8000/api/dataset-rows/${id}?limit=${limit}${query}`
       );
 
       const json = await res.json();
       setRows(json.rows || []);
       setTotalRows(json.total_rows || 0);
 
+      // Remember where the next page starts
+      setCursors((prev) => {
+        const next = prev.slice(0, page);
+        next[page] = json.next_after_time ?? null;
+        return next;
+      });
+
     } catch (err) {
       console.error("Rows load error:", err);
     } finally {
@@ -89,7 +101,7 @@ useEffect(() => {
   }
 
   loadRows();
-}, [id, page]); // ID + PAGE
+}, [id, page, meta]); // ID + PAGE (+ META VERSION)
 
 
   if (!meta) {
@@ -118,6 +130,17 @@ useEffect(() => {
         <p><strong>Box:</strong> {meta.box_name}</p>
         <p><strong>Color:</strong> {meta.box_color}</p>
         <p><strong>File Date:</strong> {meta.file_date}</p>
+        {meta.archived_at && (
+          <p><strong>Archived:</strong> {new Date(meta.archived_at).toLocaleString()}</p>
+        )}
+
+        {/* Whole recording as one Parquet file (streamed by the backend) */}
+        <a
+          href={`http://127.0.0.1:8000/api/datasets/${id}/export?format=parquet`}
+          className="inline-block mt-4 px-4 py-2 bg-black text-white rounded-lg hover:bg-gray-800"
+        >
+          ⬇ Download Parquet
+        </a>
       </div>
 
       {/* Rows Table */}
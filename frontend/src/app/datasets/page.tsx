@@ -3,20 +3,48 @@
 import { useEffect, useState } from "react";
 
 
+const FILTERS = [
+  { key: "flight_code", label: "Flight" },
+  { key: "box_name", label: "Box" },
+  { key: "box_color", label: "Color" },
+  { key: "role", label: "Role" },
+  { key: "person_name", label: "Person" },
+  { key: "file_date_from", label: "From", type: "date" },
+  { key: "file_date_to", label: "To", type: "date" },
+];
+const PAGE_SIZE = 50;
+
 export default function DatasetsPage() {
 
-    const [datasets, setDatasets] = useState([]);
+    const [datasets, setDatasets] = useState<any[]>([]);
     const [loading, setLoading] = useState(true);
-    
+    const [filters, setFilters] = useState<Record<string, string>>({});
+    // Keyset cursor for the next page (null = no more pages)
+    const [nextBeforeId, setNextBeforeId] = useState<number | null>(null);
+
+    // Filtering and paging happen on the server; only one page is ever loaded at a time
+    const loadPage = (beforeId: number | null) => {
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      Object.entries(filters).forEach(([key, value]) => {
+        if (value) params.set(key, value);
+      });
+      if (beforeId != null) params.set("before_id", String(beforeId));
+
+      setLoading(true);
+      fetch(`http://127.0.0.1:8000/api/datasets?${params}`)
+        .then((res) => res.json())
+        .then((data) => {
+          setDatasets((prev) => (beforeId == null ? data.datasets : [...prev, ...data.datasets]));
+          setNextBeforeId(data.next_before_id ?? null);
+          setLoading(false);
+        })
+        .catch(() => setLoading(false));
+    };
+
     useEffect(() => {
-    fetch("http://127.0.0.1:8000/api/datasets")
-      .then((res) => res.json())
-      .then((data) => {
-        setDatasets(data);
-        setLoading(false);
-      })
-      .catch(() => setLoading(false));
-  }, []);
+      const timer = setTimeout(() => loadPage(null), 300);  // debounce typing
+      return () => clearTimeout(timer);
+    }, [filters]);
 
   return (
     <div className="min-h-screen bg-gray-900 p-8 flex justify-center">
@@ -31,7 +59,21 @@ export default function DatasetsPage() {
           (Phase 3 will fetch actual data from the backend.)
         </p>
 
-        {loading && (
+        <div className="grid grid-cols-2 md:grid-cols-4 gap-3 my-6">
+            {FILTERS.map((f) => (
+                <input
+                    key={f.key}
+                    type={f.type ?? "text"}
+                    placeholder={f.label}
+                    title={f.label}
+                    value={filters[f.key] ?? ""}
+                    onChange={(e) => setFilters({ ...filters, [f.key]: e.target.value })}
+                    className="border rounded-lg px-3 py-2 text-black"
+                />
+            ))}
+        </div>
+
+        {loading && datasets.length === 0 && (
             <div className="text-gray-600">Loading datasets...</div>
         )}
 
@@ -57,6 +99,16 @@ export default function DatasetsPage() {
                     </p>
                 </div>
                 ))}
+
+                {nextBeforeId != null && (
+                    <button
+                        disabled={loading}
+                        onClick={() => loadPage(nextBeforeId)}
+                        className="w-full py-2 border rounded-lg text-gray-700 hover:bg-gray-100 disabled:opacity-50"
+                    >
+                        {loading ? "Loading..." : "Load more"}
+                    </button>
+                )}
             </div>
             )}
 
@@ -4,6 +4,11 @@ import { useState } from "react";
 import StatsCards from "./StatsCards";
 import { useRouter } from "next/navigation";
 
+// Files above this size use the resumable chunked protocol
+const CHUNKED_THRESHOLD = 32 * 1024 * 1024;
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const PART_RETRIES = 5;
+
 export default function UploadPage() {
   const [file, setFile] = useState<File | null>(null);
   const [loading, setLoading] = useState(false);
@@ -11,33 +16,105 @@ export default function UploadPage() {
   const [refreshFlag, setRefreshFlag] = useState(0);
   const router = useRouter();
   const [datasetsCount, setDatasetsCount] = useState(0);
+  // Background ingest job (polled from /api/jobs/{id})
+  const [job, setJob] = useState<any>(null);
+
+  const pollJob = async (jobId: string) => {
+    while (true) {
+      const res = await fetch(`http://127.0.0.1:8000/api/jobs/${jobId}`);
+      const json = await res.json();
+      setJob(json);
+
+      if (json.phase === "done") return json.result;
+      if (json.phase === "failed") throw new Error(json.error);
+      if (json.phase === "cancelled") return null;
+
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
+  const handleCancel = async () => {
+    if (!job) return;
+    await fetch(`http://127.0.0.1:8000/api/jobs/${job.job_id}/cancel`, { method: "POST" });
+  };
+
+  // Resumable upload for big recordings: each part is retried on its own
+  const putPart = async (uploadId: string, part: number, blob: Blob) => {
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const res = await fetch(
+          `http://127.0.0.1:8000/api/uploads/${uploadId}/parts/${part}`,
+          { method: "PUT", body: blob }
+        );
+        const json = await res.json();
+        if (res.ok) {
+          setJob(json.job);
+          return;
+        }
+        if (res.status !== 503 || attempt >= PART_RETRIES) throw new Error(json.detail);
+      } catch (error) {
+        if (attempt >= PART_RETRIES) throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+    }
+  };
+
+  const uploadChunked = async (file: File) => {
+    const init = await fetch(
+      `http://127.0.0.1:8000/api/uploads?file_name=${encodeURIComponent(file.name)}&total_size=${file.size}`,
+      { method: "POST" }
+    );
+    const session = await init.json();
+    if (!init.ok) throw new Error(session.detail);
+    setJob(session.job);
+
+    const parts = Math.ceil(file.size / CHUNK_SIZE);
+    for (let part = 1; part <= parts; part++) {
+      const blob = file.slice((part - 1) * CHUNK_SIZE, part * CHUNK_SIZE);
+      await putPart(session.upload_id, part, blob);
+    }
+
+    const res = await fetch(
+      `http://127.0.0.1:8000/api/uploads/${session.upload_id}/finalize`,
+      { method: "POST" }
+    );
+    const json = await res.json();
+    if (!res.ok) throw new Error(json.detail);
+    if (json.job.phase === "done") return json.job.result;
+    return pollJob(session.upload_id);
+  };
+
+  const uploadSingle = async (file: File) => {
+    const formData = new FormData();
+    formData.append("file", file);
+
+    const res = await fetch("http://127.0.0.1:8000/api/upload-csv", {
+      method: "POST",
+      body: formData,
+    });
+
+    const accepted = await res.json();
+    if (!res.ok) throw new Error(accepted.detail);
+    return pollJob(accepted.job_id);
+  };
 
   const handleUpload = async () => {
     if (!file) return;
 
     setLoading(true);
+    setJob(null);
 
     try {
-      const formData = new FormData();
-      formData.append("file", file);
-
-      const res = await fetch("http://127.0.0.1:8000/api/upload-csv", {
-        method: "POST",
-        body: formData,
-      });
-
-      if (!res.ok) {
-        const err = await res.json();
-        alert("Upload failed: " + err.detail);
-        return;
+      const finished = file.size > CHUNKED_THRESHOLD
+        ? await uploadChunked(file)
+        : await uploadSingle(file);
+      if (finished) {
+        setResult(finished);
+        setRefreshFlag((prev) => prev + 1);
       }
 
-      const json = await res.json();
-      setResult(json);
-      setRefreshFlag((prev) => prev + 1);
-
     } catch (error) {
-      alert("Network error: " + error);
+      alert("Upload failed: " + error);
     } finally {
       setLoading(false);
     }
@@ -122,6 +199,29 @@ export default function UploadPage() {
             {loading ? "Uploading..." : "Upload"}
         </button>
 
+        {/* Job Progress */}
+        {loading && job && (
+          <div className="mt-4 p-4 border border-gray-300 rounded-xl bg-gray-50 text-gray-700">
+            <p><strong>Phase:</strong> {job.phase}</p>
+            <p><strong>Rows:</strong> {job.rows}</p>
+            {job.progress !== null && (
+              <div className="w-full bg-gray-200 rounded-full h-2 my-2">
+                <div
+                  className="bg-purple-600 h-2 rounded-full"
+                  style={{ width: `${Math.round(job.progress * 100)}%` }}
+                />
+              </div>
+            )}
+            <p><strong>Throughput:</strong> {job.throughput_mb_s} MB/s</p>
+            <button
+              onClick={handleCancel}
+              className="mt-2 px-4 py-2 rounded-lg text-white bg-red-500 hover:bg-red-600"
+            >
+              Cancel
+            </button>
+          </div>
+        )}
+
 
 
         {/* Upload Summary */}
@@ -140,6 +240,7 @@ export default function UploadPage() {
               <p><strong>Color:</strong> {result.metadata.box_color}</p>
               <p><strong>Rows Inserted:</strong> {result.rows_inserted}</p>
               <p><strong>Duration:</strong> {result.duration_seconds}s</p>
+              <p><strong>Throughput:</strong> {result.throughput_mb_s} MB/s</p>
             </div>
 
             {/* <button